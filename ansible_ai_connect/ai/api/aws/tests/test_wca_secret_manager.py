@@ -12,9 +12,13 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-from unittest.mock import Mock
+from unittest.mock import ANY, Mock, patch
 
+import boto3
 from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from rest_framework.test import APITestCase
 
 from ansible_ai_connect.ai.api.aws.exceptions import (
@@ -24,6 +28,8 @@ from ansible_ai_connect.ai.api.aws.exceptions import (
 from ansible_ai_connect.ai.api.aws.wca_secret_manager import (
     SECRET_KEY_PREFIX,
     AWSSecretManager,
+    CachingSecretManager,
+    OrgCredentials,
     Suffixes,
 )
 from ansible_ai_connect.test_utils import WisdomServiceLogAwareTestCase
@@ -147,7 +153,236 @@ class TestWcaApiKeyClient(APITestCase, WisdomServiceLogAwareTestCase):
                 self.c.delete_secret(ORG_ID, Suffixes.API_KEY)
                 self.assertInLog(f"Error removing Secret for org_id '{ORG_ID}'", log)
 
+    def test_get_org_credentials(self):
+        self.m_boto3_client.batch_get_secret_value.return_value = {
+            "SecretValues": [
+                {"Name": f"{SECRET_KEY_PREFIX}/{ORG_ID}/api_key", "SecretString": "key"},
+                {"Name": f"{SECRET_KEY_PREFIX}/{ORG_ID}/model_id", "SecretString": "model"},
+            ],
+            "Errors": [],
+        }
+        credentials = self.c.get_org_credentials(ORG_ID)
+        self.assertEqual(credentials.api_key["SecretString"], "key")
+        self.assertEqual(credentials.model_id["SecretString"], "model")
+        self.m_boto3_client.batch_get_secret_value.assert_called_once_with(
+            SecretIdList=[
+                f"{SECRET_KEY_PREFIX}/{ORG_ID}/api_key",
+                f"{SECRET_KEY_PREFIX}/{ORG_ID}/model_id",
+            ]
+        )
+        self.m_boto3_client.get_secret_value.assert_not_called()
+
+    def test_get_org_credentials_not_found(self):
+        self.m_boto3_client.batch_get_secret_value.return_value = {
+            "SecretValues": [
+                {"Name": f"{SECRET_KEY_PREFIX}/{ORG_ID}/api_key", "SecretString": "key"},
+            ],
+            "Errors": [
+                {
+                    "SecretId": f"{SECRET_KEY_PREFIX}/{ORG_ID}/model_id",
+                    "ErrorCode": "ResourceNotFoundException",
+                    "Message": "Secrets Manager can't find the specified secret.",
+                }
+            ],
+        }
+        credentials = self.c.get_org_credentials(ORG_ID)
+        self.assertEqual(credentials.api_key["SecretString"], "key")
+        self.assertIsNone(credentials.model_id)
+
+    def test_get_org_credentials_error(self):
+        self.m_boto3_client.batch_get_secret_value.return_value = {
+            "SecretValues": [],
+            "Errors": [
+                {
+                    "SecretId": f"{SECRET_KEY_PREFIX}/{ORG_ID}/api_key",
+                    "ErrorCode": "DecryptionFailure",
+                    "Message": "Boom",
+                }
+            ],
+        }
+        with self.assertRaises(WcaSecretManagerError):
+            self.c.get_org_credentials(ORG_ID)
+
+    def test_get_org_credentials_client_error(self):
+        self.m_boto3_client.batch_get_secret_value.side_effect = ClientError({}, "raah")
+        with self.assertRaises(WcaSecretManagerError):
+            self.c.get_org_credentials(ORG_ID)
+
+    def test_get_org_credentials_with_botocore_stub(self):
+        client = boto3.client(
+            "secretsmanager",
+            aws_access_key_id="dummy",
+            aws_secret_access_key="dummy",
+            region_name="us-east-1",
+        )
+        self.c._client = client
+        with Stubber(client) as stubber:
+            stubber.add_response(
+                "batch_get_secret_value",
+                {
+                    "SecretValues": [
+                        {"Name": f"{SECRET_KEY_PREFIX}/{ORG_ID}/model_id", "SecretString": "m"},
+                    ],
+                    "Errors": [
+                        {
+                            "SecretId": f"{SECRET_KEY_PREFIX}/{ORG_ID}/api_key",
+                            "ErrorCode": "ResourceNotFoundException",
+                            "Message": "Not found",
+                        }
+                    ],
+                },
+                {
+                    "SecretIdList": [
+                        f"{SECRET_KEY_PREFIX}/{ORG_ID}/api_key",
+                        f"{SECRET_KEY_PREFIX}/{ORG_ID}/model_id",
+                    ]
+                },
+            )
+            credentials = self.c.get_org_credentials(ORG_ID)
+            stubber.assert_no_pending_responses()
+        self.assertEqual(
+            credentials, OrgCredentials(api_key=None, model_id={"Name": ANY, "SecretString": "m"})
+        )
+
     def test_missing_creds_exception(self):
         c = AWSSecretManager("dummy", None, "dummy", "dummy", [])
         with self.assertRaises(WcaSecretManagerMissingCredentialsError):
             c.get_client()
+
+
+class TestCachingSecretManager(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.delegate = Mock(spec=AWSSecretManager)
+        self.delegate.get_secret.return_value = {"SecretString": SECRET_VALUE}
+        self.c = CachingSecretManager(self.delegate, timeout=300, negative_timeout=60)
+
+    def test_get_secret_cached(self):
+        self.assertEqual(self.c.get_secret(ORG_ID, Suffixes.API_KEY)["SecretString"], SECRET_VALUE)
+        self.assertEqual(self.c.get_secret(ORG_ID, Suffixes.API_KEY)["SecretString"], SECRET_VALUE)
+        self.assertTrue(self.c.secret_exists(ORG_ID, Suffixes.API_KEY))
+        self.delegate.get_secret.assert_called_once_with(ORG_ID, Suffixes.API_KEY)
+
+    def test_get_secret_cached_per_suffix(self):
+        self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.c.get_secret(ORG_ID, Suffixes.MODEL_ID)
+        self.assertEqual(self.delegate.get_secret.call_count, 2)
+
+    def test_missing_secret_cached(self):
+        self.delegate.get_secret.return_value = None
+        self.assertFalse(self.c.secret_exists(ORG_ID, Suffixes.API_KEY))
+        self.assertFalse(self.c.secret_exists(ORG_ID, Suffixes.API_KEY))
+        self.delegate.get_secret.assert_called_once()
+
+    def test_missing_secret_not_cached(self):
+        self.c = CachingSecretManager(self.delegate, timeout=300, negative_timeout=0)
+        self.delegate.get_secret.return_value = None
+        self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.assertEqual(self.delegate.get_secret.call_count, 2)
+
+    def test_expired_secret(self):
+        with patch(
+            "ansible_ai_connect.ai.api.aws.wca_secret_manager.time.monotonic", return_value=1000
+        ):
+            self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+            self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        with patch(
+            "ansible_ai_connect.ai.api.aws.wca_secret_manager.time.monotonic", return_value=1301
+        ):
+            self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.assertEqual(self.delegate.get_secret.call_count, 2)
+
+    @override_settings(WCA_SECRET_MANAGER_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_secret_evicted(self):
+        self.c.get_secret("1", Suffixes.API_KEY)
+        self.c.get_secret("2", Suffixes.API_KEY)
+        self.c.get_secret("1", Suffixes.API_KEY)
+        self.c.get_secret("3", Suffixes.API_KEY)
+        self.assertEqual(len(self.c._entries), 2)
+        self.assertEqual(self.delegate.get_secret.call_count, 3)
+
+        self.c.get_secret("1", Suffixes.API_KEY)
+        self.assertEqual(self.delegate.get_secret.call_count, 3)
+        self.c.get_secret("2", Suffixes.API_KEY)
+        self.assertEqual(self.delegate.get_secret.call_count, 4)
+
+    @override_settings(WCA_SECRET_MANAGER_CACHE_MAX_ENTRIES=2)
+    def test_expired_secret_evicted_first(self):
+        monotonic = "ansible_ai_connect.ai.api.aws.wca_secret_manager.time.monotonic"
+        self.delegate.get_secret.side_effect = [{"SecretString": SECRET_VALUE}, None, None]
+        with patch(monotonic, return_value=1000):
+            self.c.get_secret("1", Suffixes.API_KEY)
+            self.c.get_secret("2", Suffixes.API_KEY)
+        with patch(monotonic, return_value=1061):
+            self.c.get_secret("1", Suffixes.API_KEY)
+            self.c.get_secret("3", Suffixes.API_KEY)
+        self.assertEqual(list(self.c._entries), [("1", Suffixes.API_KEY), ("3", Suffixes.API_KEY)])
+
+    def test_expired_secret_removed_on_lookup(self):
+        monotonic = "ansible_ai_connect.ai.api.aws.wca_secret_manager.time.monotonic"
+        self.delegate.get_secret.side_effect = [
+            {"SecretString": SECRET_VALUE},
+            WcaSecretManagerError,
+        ]
+        with patch(monotonic, return_value=1000):
+            self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        with patch(monotonic, return_value=1301), self.assertRaises(WcaSecretManagerError):
+            self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.assertEqual(len(self.c._entries), 0)
+
+    def test_error_not_cached(self):
+        self.delegate.get_secret.side_effect = [
+            WcaSecretManagerError("boom"),
+            {"SecretString": SECRET_VALUE},
+        ]
+        with self.assertRaises(WcaSecretManagerError):
+            self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.assertEqual(self.c.get_secret(ORG_ID, Suffixes.API_KEY)["SecretString"], SECRET_VALUE)
+
+    def test_save_secret_invalidates(self):
+        self.delegate.save_secret.return_value = "wisdom"
+        self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.assertEqual(self.c.save_secret(ORG_ID, Suffixes.API_KEY, SECRET_VALUE), "wisdom")
+        self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.assertEqual(self.delegate.get_secret.call_count, 2)
+
+    def test_delete_secret_invalidates_other_workers(self):
+        other_worker = CachingSecretManager(self.delegate, timeout=300, negative_timeout=60)
+        other_worker.get_secret(ORG_ID, Suffixes.API_KEY)
+        other_worker.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.assertEqual(self.delegate.get_secret.call_count, 1)
+
+        self.c.delete_secret(ORG_ID, Suffixes.API_KEY)
+        self.delegate.delete_secret.assert_called_once_with(ORG_ID, Suffixes.API_KEY)
+
+        other_worker.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.assertEqual(self.delegate.get_secret.call_count, 2)
+
+    def test_secret_not_stored_in_shared_cache(self):
+        self.c.get_secret(ORG_ID, Suffixes.API_KEY)
+        self.c.save_secret(ORG_ID, Suffixes.API_KEY, SECRET_VALUE)
+        version = cache.get(CachingSecretManager.get_version_key(ORG_ID, Suffixes.API_KEY))
+        self.assertIsNotNone(version)
+        self.assertNotEqual(version, SECRET_VALUE)
+
+    def test_get_org_credentials_cached(self):
+        self.delegate.get_org_credentials.return_value = OrgCredentials(
+            api_key={"SecretString": "key"}, model_id=None
+        )
+        credentials = self.c.get_org_credentials(ORG_ID)
+        self.assertEqual(self.c.get_org_credentials(ORG_ID), credentials)
+        self.assertEqual(self.c.get_secret(ORG_ID, Suffixes.API_KEY)["SecretString"], "key")
+        self.assertIsNone(self.c.get_secret(ORG_ID, Suffixes.MODEL_ID))
+        self.delegate.get_org_credentials.assert_called_once_with(ORG_ID)
+        self.delegate.get_secret.assert_not_called()
+
+    def test_get_org_credentials_invalidated(self):
+        self.delegate.get_org_credentials.return_value = OrgCredentials(
+            api_key={"SecretString": "key"}, model_id={"SecretString": "model"}
+        )
+        self.c.get_org_credentials(ORG_ID)
+        self.c.save_secret(ORG_ID, Suffixes.MODEL_ID, "another-model")
+        self.c.get_org_credentials(ORG_ID)
+        self.assertEqual(self.delegate.get_org_credentials.call_count, 2)
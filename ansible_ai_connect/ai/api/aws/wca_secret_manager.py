@@ -13,13 +13,21 @@
 #  limitations under the License.
 
 import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
 from enum import Enum
 from typing import Any, Optional
 
 import boto3
 from botocore.exceptions import ClientError
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter
 
 from .exceptions import WcaSecretManagerError, WcaSecretManagerMissingCredentialsError
 
@@ -27,12 +35,36 @@ SECRET_KEY_PREFIX = "wca"
 
 logger = logging.getLogger(__name__)
 
+wca_secret_manager_cache_hit_counter = Counter(
+    "wca_secret_manager_cache_hits",
+    "Counter of WCA secret lookups served from the secret manager cache",
+    ["suffix"],
+    namespace=NAMESPACE,
+)
+wca_secret_manager_cache_miss_counter = Counter(
+    "wca_secret_manager_cache_misses",
+    "Counter of WCA secret lookups not found in the secret manager cache",
+    ["suffix"],
+    namespace=NAMESPACE,
+)
+
 
 class Suffixes(Enum):
     API_KEY = "api_key"
     MODEL_ID = "model_id"
 
 
+@dataclass(frozen=True)
+class OrgCredentials:
+    """Snapshot of the WCA secrets of an organization, None when a secret is not set."""
+
+    api_key: Optional[dict[str, Any]] = None
+    model_id: Optional[dict[str, Any]] = None
+
+    def get(self, suffix: Suffixes) -> Optional[dict[str, Any]]:
+        return self.api_key if suffix == Suffixes.API_KEY else self.model_id
+
+
 class BaseSecretManager:
     def save_secret(self, org_id: int, suffix: Suffixes, secret):
         raise NotImplementedError
@@ -46,6 +78,15 @@ class BaseSecretManager:
     def secret_exists(self, org_id: int, suffix: Suffixes) -> bool:
         raise NotImplementedError
 
+    def get_org_credentials(self, org_id: int) -> OrgCredentials:
+        """
+        Returns both the API Key and the Model ID Secrets of the given org_id.
+        """
+        return OrgCredentials(
+            api_key=self.get_secret(org_id, Suffixes.API_KEY),
+            model_id=self.get_secret(org_id, Suffixes.MODEL_ID),
+        )
+
 
 class DummySecretEntry(dict):
     @staticmethod
@@ -222,3 +263,151 @@ class AWSSecretManager(BaseSecretManager):
         Returns True if a Secret exists for the given org_id and suffix.
         """
         return self.get_secret(org_id, suffix) is not None
+
+    def get_org_credentials(self, org_id: int) -> OrgCredentials:
+        """
+        Returns both the API Key and the Model ID Secrets of the given org_id
+        with a single BatchGetSecretValue request.
+        """
+        secret_ids = {self.get_secret_id(org_id, suffix): suffix for suffix in Suffixes}
+        try:
+            response = self.get_client().batch_get_secret_value(SecretIdList=list(secret_ids))
+        except ClientError as e:
+            logger.error("Error reading Secrets for org_id '%s'.", org_id)
+            raise WcaSecretManagerError(e)
+
+        for error in response.get("Errors", []):
+            if error.get("ErrorCode") == "ResourceNotFoundException":
+                logger.info(
+                    "No Secret exists for org with id '%s' and suffix '%s'.",
+                    org_id,
+                    secret_ids.get(error.get("SecretId")),
+                )
+                continue
+            logger.error(
+                "Error reading Secret for org_id '%s' with suffix '%s'.",
+                org_id,
+                secret_ids.get(error.get("SecretId")),
+            )
+            raise WcaSecretManagerError(error.get("Message"))
+
+        secrets = {
+            secret_ids[value["Name"]]: value
+            for value in response.get("SecretValues", [])
+            if value.get("Name") in secret_ids
+        }
+        return OrgCredentials(
+            api_key=secrets.get(Suffixes.API_KEY),
+            model_id=secrets.get(Suffixes.MODEL_ID),
+        )
+
+
+class CachingSecretManager(BaseSecretManager):
+    """
+    Read-through cache in front of another secret manager.
+
+    Secrets are kept in the memory of the worker only. Found and missing secrets are
+    cached with separate TTLs. The shared Django cache only holds a version per
+    (org_id, suffix) that is changed by save_secret and delete_secret so that the
+    other workers drop their stale entries.
+
+    At most WCA_SECRET_MANAGER_CACHE_MAX_ENTRIES entries are kept. Once the limit
+    is reached, the expired entries are dropped first, then the least recently used.
+    """
+
+    def __init__(self, delegate: BaseSecretManager, timeout: int, negative_timeout: int):
+        self.delegate = delegate
+        self.timeout = timeout
+        self.negative_timeout = negative_timeout
+        self._entries: OrderedDict[tuple[str, Suffixes], tuple[str, float, Optional[dict]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_version_key(org_id, suffix: Suffixes) -> str:
+        return f"{SECRET_KEY_PREFIX}_secret_version_{org_id}_{suffix.value}"
+
+    def _get_version(self, org_id, suffix: Suffixes) -> str:
+        return cache.get(self.get_version_key(org_id, suffix)) or ""
+
+    def invalidate(self, org_id, suffix: Suffixes) -> None:
+        with self._lock:
+            self._entries.pop((str(org_id), suffix), None)
+        cache.set(self.get_version_key(org_id, suffix), uuid.uuid4().hex, None)
+
+    def save_secret(self, org_id, suffix: Suffixes, secret):
+        try:
+            return self.delegate.save_secret(org_id, suffix, secret)
+        finally:
+            self.invalidate(org_id, suffix)
+
+    def delete_secret(self, org_id, suffix: Suffixes) -> None:
+        try:
+            self.delegate.delete_secret(org_id, suffix)
+        finally:
+            self.invalidate(org_id, suffix)
+
+    def _lookup(self, org_id, suffix: Suffixes, version: str) -> tuple[bool, Optional[dict]]:
+        key = (str(org_id), suffix)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry_version, expires_at, secret = entry
+                if entry_version == version and time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    wca_secret_manager_cache_hit_counter.labels(suffix=suffix.value).inc()
+                    return True, secret
+                del self._entries[key]
+        wca_secret_manager_cache_miss_counter.labels(suffix=suffix.value).inc()
+        return False, None
+
+    def _store(self, org_id, suffix: Suffixes, version: str, secret: Optional[dict]) -> None:
+        key = (str(org_id), suffix)
+        timeout = self.timeout if secret is not None else self.negative_timeout
+        with self._lock:
+            if timeout <= 0:
+                self._entries.pop(key, None)
+                return
+            now = time.monotonic()
+            self._entries[key] = (version, now + timeout, secret)
+            self._entries.move_to_end(key)
+            max_entries = settings.WCA_SECRET_MANAGER_CACHE_MAX_ENTRIES
+            if len(self._entries) > max_entries:
+                for expired_key in [k for k, e in self._entries.items() if e[1] <= now]:
+                    del self._entries[expired_key]
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def get_secret(self, org_id, suffix: Suffixes) -> Optional[dict[str, Any]]:
+        version = self._get_version(org_id, suffix)
+        found, secret = self._lookup(org_id, suffix, version)
+        if found:
+            return secret
+
+        secret = self.delegate.get_secret(org_id, suffix)
+        self._store(org_id, suffix, version, secret)
+        return secret
+
+    def get_org_credentials(self, org_id) -> OrgCredentials:
+        versions = cache.get_many([self.get_version_key(org_id, suffix) for suffix in Suffixes])
+        secrets: dict[Suffixes, Optional[dict]] = {}
+        for suffix in Suffixes:
+            version = versions.get(self.get_version_key(org_id, suffix)) or ""
+            found, secret = self._lookup(org_id, suffix, version)
+            if not found:
+                break
+            secrets[suffix] = secret
+        else:
+            return OrgCredentials(
+                api_key=secrets[Suffixes.API_KEY], model_id=secrets[Suffixes.MODEL_ID]
+            )
+
+        credentials = self.delegate.get_org_credentials(org_id)
+        for suffix in Suffixes:
+            version = versions.get(self.get_version_key(org_id, suffix)) or ""
+            self._store(org_id, suffix, version, credentials.get(suffix))
+        return credentials
+
+    def secret_exists(self, org_id, suffix: Suffixes) -> bool:
+        return self.get_secret(org_id, suffix) is not None
@@ -12,16 +12,52 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import copy
+import datetime
+import hashlib
+import json
 import logging
 import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from io import StringIO
+from typing import Any, Optional
 
 import yaml
-from ansible.playbook.task import Task
+from django.conf import settings
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter, Gauge
 from ruamel.yaml import YAML, scalarstring
+from yaml.emitter import Emitter
+from yaml.nodes import ScalarNode
+from yaml.resolver import Resolver
 
 logger = logging.getLogger(__name__)
 
+normalized_yaml_cache_lookup_counter = Counter(
+    "normalized_yaml_cache_lookups",
+    "Counter of normalized context cache lookups, per top-level YAML item",
+    ["result"],
+    namespace=NAMESPACE,
+)
+normalized_yaml_cache_size_gauge = Gauge(
+    "normalized_yaml_cache_size_bytes",
+    "Size of the normalized YAML held in the normalized context cache",
+    namespace=NAMESPACE,
+)
+parsed_vars_cache_size_gauge = Gauge(
+    "parsed_vars_cache_size_bytes",
+    "Size of the additional context vars YAML whose parsed vars are cached",
+    namespace=NAMESPACE,
+)
+parsed_vars_skipped_bytes_counter = Counter(
+    "additional_context_vars_skipped_bytes",
+    "Bytes of additional context vars YAML that weren't parsed thanks to the parsed vars cache",
+    ["ansible_file_type"],
+    namespace=NAMESPACE,
+)
+
 """
 The code below causes any yaml.dump calls to dump None
 as blank rather than "null"
@@ -89,25 +125,576 @@ class AnsibleDumper(yaml.Dumper):
         return True
 
 
+"""
+libyaml based YAML engine, used when PyYAML was built with libyaml.
+
+AnsibleDumper customizes the pure-Python emitter, which the libyaml emitter
+can't do, so AnsibleCDumper produces the same output differently:
+- the quote style is chosen when representing the strings, and
+- the sequences are indented and separated by a blank line once emitted.
+That only holds for the documents accepted by can_dump_with_libyaml(), the
+others are dumped with AnsibleDumper.
+"""
+
+LIBYAML_AVAILABLE = yaml.__with_libyaml__
+SafeLoader = yaml.CSafeLoader if LIBYAML_AVAILABLE else yaml.SafeLoader
+
+# Longer strings could be split by the emitter
+LIBYAML_MAX_SCALAR_LENGTH = 4096
+# Longer keys are emitted as complex keys ("? key")
+LIBYAML_MAX_KEY_LENGTH = 127
+LIBYAML_SCALAR_TYPES = (bool, int, float, datetime.date, type(None))
+
+STR_TAG = "tag:yaml.org,2002:str"
+
+
+class _ScalarAnalyzer(Emitter):
+    def __init__(self):
+        self.allow_unicode = True
+
+
+_scalar_analyzer = _ScalarAnalyzer()
+_resolver = Resolver()
+
+
+@lru_cache(maxsize=4096)
+def _is_quoted_scalar(value):
+    # Emitter.choose_scalar_style() for a single-line, printable ASCII string in a block
+    if '"' in value:
+        return False
+    analysis = _scalar_analyzer.analyze_scalar(value)
+    implicit = _resolver.resolve(ScalarNode, value, (True, False)) == STR_TAG
+    return not (implicit and analysis.allow_block_plain)
+
+
+def _is_simple_string(value):
+    return len(value) <= LIBYAML_MAX_SCALAR_LENGTH and value.isascii() and value.isprintable()
+
+
+def _is_libyaml_compatible(data):
+    if isinstance(data, str):
+        return _is_simple_string(data)
+    if isinstance(data, dict):
+        return all(
+            isinstance(key, str)
+            and 0 < len(key) <= LIBYAML_MAX_KEY_LENGTH
+            and _is_simple_string(key)
+            and _is_libyaml_compatible(value)
+            for key, value in data.items()
+        )
+    if isinstance(data, list):
+        return all(_is_libyaml_compatible(item) for item in data)
+    return isinstance(data, LIBYAML_SCALAR_TYPES)
+
+
+def _starts_with_sequence(item):
+    return isinstance(item, dict) and bool(item) and isinstance(next(iter(item.values())), list)
+
+
+def can_dump_with_libyaml(data):
+    """Whether AnsibleCDumper produces the same output as AnsibleDumper for data."""
+    if isinstance(data, list):
+        # AnsibleDumper doesn't separate the items following a nested top-level sequence
+        if any(isinstance(item, list) for item in data):
+            return False
+        # nor the top-level items whose first value is a sequence: the emitter
+        # looks ahead at it before writing the "-" of the item, which resets
+        # AnsibleDumper.first_item_
+        if any(_starts_with_sequence(item) for item in data[1:]):
+            return False
+    return _is_libyaml_compatible(data)
+
+
+class AnsibleCDumper(yaml.CDumper):
+    """
+    libyaml emitter counterpart of AnsibleDumper, see dump_yaml().
+    """
+
+    # The quotes AnsibleDumper.choose_scalar_style() would pick
+    def represent_str(self, data):
+        node = super().represent_str(data)
+        if _is_quoted_scalar(data):
+            node.style = '"'
+        return node
+
+    def ignore_aliases(self, data):
+        return True
+
+
+AnsibleCDumper.add_representer(type(None), represent_none)
+AnsibleCDumper.add_representer(str, AnsibleCDumper.represent_str)
+
+
+def _get_key_column(indent, content):
+    while content.startswith("- "):
+        content = content[2:]
+        indent += 2
+    return indent
+
+
+def _indent_sequences(text, top_level_sequence):
+    """
+    Indent the sequences that libyaml emits at the level of their parent mapping
+    key, and insert a blank line between the top-level sequence items.
+    """
+    lines = []
+    # Indentation of the enclosing sequences that need to be indented
+    sequences = []
+    previous = None
+    for line in text.split("\n"):
+        content = line.lstrip(" ")
+        indent = len(line) - len(content)
+        is_item = content.startswith("- ") or content == "-"
+        while sequences and (indent < sequences[-1] or (indent == sequences[-1] and not is_item)):
+            sequences.pop()
+        if (
+            is_item
+            and previous is not None
+            and previous[1].endswith(":")
+            and _get_key_column(*previous) == indent
+            and (not sequences or sequences[-1] != indent)
+        ):
+            sequences.append(indent)
+        if top_level_sequence and indent == 0 and is_item and lines:
+            lines.append("")
+        lines.append(" " * (indent + 2 * len(sequences)) + content if content else line)
+        previous = (indent, content)
+    return "\n".join(lines)
+
+
+_NOT_LOADED = object()
+
+
+class YamlDocument:
+    """
+    A YAML string and its parsed content.
+
+    The content is parsed on first access only, so that the completion stages
+    can share a document instead of parsing the same string again. A parse
+    error is raised on every access.
+    """
+
+    def __init__(self, text, data=_NOT_LOADED):
+        self.text = text
+        self._data = data
+        self._error = None
+
+    @property
+    def data(self):
+        if self._error is not None:
+            raise self._error
+        if self._data is _NOT_LOADED:
+            try:
+                self._data = load_yaml(self.text)
+            except Exception as exc:
+                self._error = exc
+                raise
+        return self._data
+
+    @property
+    def is_loaded(self):
+        return self._data is not _NOT_LOADED
+
+
+def load_yaml(yaml_str):
+    return yaml.load(yaml_str, Loader=SafeLoader)
+
+
+class _NameLinesLoader(SafeLoader):
+    """
+    SafeLoader recording the line of the "name" key of each mapping, by id() of
+    the constructed dict.
+    """
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.name_lines = {}
+
+    def construct_yaml_map(self, node):
+        data = {}
+        yield data
+        data.update(self.construct_mapping(node))
+        for key_node, _ in node.value:
+            if isinstance(key_node, ScalarNode) and key_node.value == "name":
+                self.name_lines[id(data)] = key_node.start_mark.line
+
+
+_NameLinesLoader.add_constructor("tag:yaml.org,2002:map", _NameLinesLoader.construct_yaml_map)
+
+
+def load_yaml_with_name_lines(yaml_str):
+    """
+    Return the data of yaml_str and the line of the name of its mappings. The
+    lines are only valid as long as the data is referenced.
+    """
+    loader = _NameLinesLoader(yaml_str)
+    try:
+        return loader.get_single_data(), loader.name_lines
+    finally:
+        loader.dispose()
+
+
+def dump_yaml(data):
+    if LIBYAML_AVAILABLE and isinstance(data, (dict, list)) and can_dump_with_libyaml(data):
+        text = yaml.dump(
+            data, Dumper=AnsibleCDumper, allow_unicode=True, sort_keys=False, width=10000
+        )
+        return _indent_sequences(text, isinstance(data, list))
+    return yaml.dump(data, Dumper=AnsibleDumper, allow_unicode=True, sort_keys=False, width=10000)
+
+
 """
 Normalize by loading and re-serializing
 """
 
 
-def normalize_yaml(yaml_str, ansible_file_type="playbook", additional_context=None):
-    data = yaml.load(yaml_str, Loader=yaml.SafeLoader)
+def normalize_document(
+    document, ansible_file_type="playbook", additional_context=None, organization_id=None
+):
+    """
+    Return the normalized YamlDocument, or None if the document is empty.
+    NOTE: the vars of the additional context are expanded in the document data.
+    """
+    data = document.data
     if data is None:
         return None
     if additional_context:
-        expand_vars_files(data, ansible_file_type, additional_context)
-    return yaml.dump(data, Dumper=AnsibleDumper, allow_unicode=True, sort_keys=False, width=10000)
+        expand_vars_files(data, ansible_file_type, additional_context, organization_id)
+    return YamlDocument(dump_yaml(data), data)
+
+
+def normalize_yaml(yaml_str, ansible_file_type="playbook", additional_context=None):
+    document = normalize_document(YamlDocument(yaml_str), ansible_file_type, additional_context)
+    return document.text if document else None
+
+
+class SizeBoundedCache:
+    """
+    Thread-safe LRU cache, the least recently used entries are evicted once the
+    total size of the entries exceeds get_max_size().
+    """
+
+    def __init__(self, size_gauge: Gauge):
+        self._entries: OrderedDict[tuple, tuple[int, Any]] = OrderedDict()
+        self._size = 0
+        self._size_gauge = size_gauge
+        self._lock = threading.Lock()
+
+    def get_max_size(self) -> int:
+        raise NotImplementedError
+
+    def _get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _set(self, key: tuple, value: Any, size: int):
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries[key][0]
+            self._entries[key] = (size, value)
+            self._entries.move_to_end(key)
+            self._size += size
+            while self._size > self.get_max_size():
+                _, (evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+            self._size_gauge.set(self._size)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._size_gauge.set(0)
+
+
+class NormalizedYamlCache(SizeBoundedCache):
+    """
+    Per-worker LRU cache of normalized top-level YAML items and their parsed
+    data, keyed by a digest of the item text. The cache holds at most
+    NORMALIZED_YAML_CACHE_MAX_BYTES bytes of normalized YAML.
+
+    NOTE: the cached data is shared by the requests and must not be modified.
+    """
+
+    def __init__(self):
+        super().__init__(normalized_yaml_cache_size_gauge)
+
+    def get_max_size(self) -> int:
+        return settings.NORMALIZED_YAML_CACHE_MAX_BYTES
+
+    def get(self, key: tuple) -> Optional[tuple[str, Any]]:
+        entry = self._get(key)
+        normalized_yaml_cache_lookup_counter.labels(result="miss" if entry is None else "hit").inc()
+        return entry
+
+    def set(self, key: tuple, text: str, data: Any):
+        self._set(key, (text, data), len(text))
+
+
+normalized_yaml_cache = NormalizedYamlCache()
+
+play_tasks_pattern = re.compile(r"^  tasks:[ \t]*$", re.MULTILINE)
+# The dumper splits the lines beyond its width, the tasks of a play are indented further
+MAX_INCREMENTAL_LINE_LENGTH = 9000
+
+
+class _Fallback(Exception):
+    pass
+
+
+def split_sequence_items(yaml_str, indent=0):
+    """
+    Split a YAML string at the lines starting a block sequence item at the given
+    indentation. Return the text preceding the first item and the text of each item.
+    """
+    pattern = re.compile(rf"^ {{{indent}}}-(?: |$)", re.MULTILINE)
+    starts = [match.start() for match in pattern.finditer(yaml_str)]
+    if not starts:
+        return yaml_str, []
+    ends = starts[1:] + [len(yaml_str)]
+    return yaml_str[: starts[0]], [yaml_str[start:end] for start, end in zip(starts, ends)]
+
+
+def _is_empty_prefix(prefix):
+    # Comments and a document start marker only, no directive, node or anchor
+    return all(
+        not line.strip() or line.lstrip().startswith("#") or line.rstrip() == "---"
+        for line in prefix.split("\n")
+    )
+
+
+def _load_single_item(item_text):
+    try:
+        data = load_yaml(item_text)
+    except yaml.YAMLError:
+        raise _Fallback()
+    if not isinstance(data, list) or len(data) != 1 or isinstance(data[0], list):
+        # AnsibleDumper doesn't separate the items following a nested sequence
+        raise _Fallback()
+    return data
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _IncrementalItem:
+    """
+    A top-level item, normalized as a whole or as a play header and the normalized
+    text and data of its tasks.
+    """
+
+    def __init__(self, key, entry=None, data=None):
+        self.key = key
+        self.entry = entry
+        self.data = data
+        self.tasks = None
+
+    def normalize(self, ansible_file_type, additional_context, expand, organization_id=None):
+        if self.entry is None:
+            if expand:
+                expand_vars_files(self.data, ansible_file_type, additional_context, organization_id)
+            self.entry = (dump_yaml(self.data), self.data[0])
+            normalized_yaml_cache.set(self.key, *self.entry)
+        if self.tasks is None:
+            return self.entry
+        header_text, header = self.entry
+        # The tasks of a play are indented by 4 spaces
+        text = header_text + "".join(
+            "".join(f"    {line}" if line.strip() else line for line in task_text.splitlines(True))
+            for task_text, _ in self.tasks
+        )
+        return text, {**header, "tasks": [task for _, task in self.tasks]}
+
+
+def _get_play_tasks(item_text):
+    """Split a play whose last key is tasks into its header and the text of its tasks."""
+    matches = list(play_tasks_pattern.finditer(item_text))
+    if len(matches) != 1:
+        return None
+    header_end = matches[0].end() + 1
+    tasks_text = item_text[header_end:]
+    first_line = next(
+        (
+            line
+            for line in tasks_text.splitlines()
+            if line.strip() and not line.lstrip().startswith("#")
+        ),
+        "",
+    )
+    indent = len(first_line) - len(first_line.lstrip(" "))
+    if indent < 2:
+        return None
+    prefix, tasks = split_sequence_items(tasks_text, indent)
+    if not tasks or not _is_empty_prefix(prefix):
+        return None
+
+    dedented_tasks = []
+    for task in tasks:
+        lines = []
+        for line in task.splitlines(True):
+            stripped = line.lstrip(" ")
+            if len(line) - len(stripped) >= indent:
+                line = line[indent:]
+            elif not stripped.strip() or stripped.startswith("#"):
+                line = stripped
+            else:
+                # Not part of the tasks, e.g. another key of the play
+                return None
+            if len(line) > MAX_INCREMENTAL_LINE_LENGTH:
+                return None
+            lines.append(line)
+        dedented_tasks.append("".join(lines))
+    return item_text[:header_end], dedented_tasks
+
+
+def _get_incremental_item(item_text, ansible_file_type, context_key):
+    play = _get_play_tasks(item_text) if ansible_file_type == "playbook" else None
+    if play is None:
+        key = ("item", _digest(item_text), context_key)
+        entry = normalized_yaml_cache.get(key)
+        return _IncrementalItem(key, entry, None if entry else _load_single_item(item_text))
+
+    header_text, task_texts = play
+    key = ("play", _digest(header_text), context_key)
+    entry = normalized_yaml_cache.get(key)
+    item = _IncrementalItem(key, entry, None if entry else _load_single_item(header_text))
+    if item.data is not None and (
+        not isinstance(item.data[0], dict) or item.data[0].get("tasks", False) is not None
+    ):
+        raise _Fallback()
+    item.tasks = []
+    for task_text in task_texts:
+        key = ("task", _digest(task_text))
+        entry = normalized_yaml_cache.get(key)
+        if entry is None:
+            # The tasks aren't expanded, they can be dumped before the others are parsed
+            data = _load_single_item(task_text)
+            entry = (dump_yaml(data), data[0])
+            if any(len(line) > MAX_INCREMENTAL_LINE_LENGTH for line in entry[0].splitlines()):
+                raise _Fallback()
+            normalized_yaml_cache.set(key, *entry)
+        item.tasks.append(entry)
+    return item
+
+
+def normalize_document_incrementally(
+    document, ansible_file_type="playbook", additional_context=None, organization_id=None
+):
+    """
+    normalize_document() of a top-level sequence, item by item.
+
+    Successive requests of an editor session share most of their context, so
+    the items, and the tasks of the plays, are normalized once and cached. Only
+    the ones that changed (typically the last task, where the prompt is) are
+    normalized again. The whole document is normalized instead when its items
+    can't be parsed on their own, e.g. when an alias refers to an anchor of
+    another item.
+    """
+    prefix, item_texts = split_sequence_items(document.text)
+    if not item_texts or not _is_empty_prefix(prefix):
+        return normalize_document(document, ansible_file_type, additional_context, organization_id)
+
+    # Only the plays are expanded with the additional context vars, the vars
+    # of tasks are set by a task inserted before them.
+    expand = bool(additional_context) and ansible_file_type == "playbook"
+    context_key = None
+    if expand:
+        context_key = _digest(json.dumps(additional_context, sort_keys=True, default=str))
+
+    # Parse all the items that aren't cached before expanding and dumping any of them
+    try:
+        items = [
+            _get_incremental_item(item_text, ansible_file_type, context_key)
+            for item_text in item_texts
+        ]
+    except _Fallback:
+        return normalize_document(document, ansible_file_type, additional_context, organization_id)
+
+    texts = []
+    data = []
+    if additional_context and not expand:
+        expand_vars_files(data, ansible_file_type, additional_context, organization_id)
+        texts.extend(dump_yaml([item]) for item in data)
+    for item in items:
+        text, item_data = item.normalize(
+            ansible_file_type, additional_context, expand, organization_id
+        )
+        texts.append(text)
+        data.append(item_data)
+    # AnsibleDumper doesn't separate the items whose first value is a sequence
+    text = "".join(
+        text if index == 0 or _starts_with_sequence(item_data) else "\n" + text
+        for index, (text, item_data) in enumerate(zip(texts, data))
+    )
+    return YamlDocument(text, data)
+
+
+class ParsedVarsCache(SizeBoundedCache):
+    """
+    Per-worker LRU cache of the vars parsed from the additional context, keyed by
+    organization and a digest of the vars YAML. The clients send the same vars
+    files with each completion request. The cache holds the vars of at most
+    PARSED_VARS_CACHE_MAX_BYTES bytes of YAML.
+
+    NOTE: the cached vars are shared by the requests and must not be modified,
+    load_vars() returns copies.
+    """
+
+    def __init__(self):
+        super().__init__(parsed_vars_cache_size_gauge)
+
+    def get_max_size(self) -> int:
+        return settings.PARSED_VARS_CACHE_MAX_BYTES
+
+    def get(self, key: tuple) -> Optional[dict]:
+        return self._get(key)
+
+    def set(self, key: tuple, yaml_str: str, data: dict):
+        self._set(key, data, len(yaml_str))
+
+
+parsed_vars_cache = ParsedVarsCache()
 
 
-def load_and_merge_vars_in_context(vars_in_context):
+def _copy_vars(data):
+    # Only the mutable values need to be copied, the scalars are immutable
+    return {
+        key: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+        for key, value in data.items()
+    }
+
+
+def load_vars(yaml_str, ansible_file_type=None, organization_id=None):
+    """
+    Load a vars string of the additional context, through the parsed vars cache
+    when ENABLE_PARSED_VARS_CACHE is set. The vars are only shared within an
+    organization, the vars of users without one are never cached.
+    """
+    if not settings.ENABLE_PARSED_VARS_CACHE or organization_id is None:
+        return load_yaml(yaml_str)
+    key = (organization_id, _digest(yaml_str))
+    data = parsed_vars_cache.get(key)
+    if data is not None:
+        parsed_vars_skipped_bytes_counter.labels(ansible_file_type=ansible_file_type).inc(
+            len(yaml_str)
+        )
+        return _copy_vars(data)
+    data = load_yaml(yaml_str)
+    if not isinstance(data, dict):
+        return data
+    parsed_vars_cache.set(key, yaml_str, data)
+    return _copy_vars(data)
+
+
+def load_and_merge_vars_in_context(vars_in_context, ansible_file_type=None, organization_id=None):
     merged_vars = {}
     for v in vars_in_context:
         # Merge the vars element and the dict loaded from a vars string
-        merged_vars |= yaml.load(v, Loader=yaml.SafeLoader)
+        merged_vars |= load_vars(v, ansible_file_type, organization_id)
     return merged_vars
 
 
@@ -120,11 +707,13 @@ def insert_set_fact_task(data, merged_vars):
         data.insert(0, vars_task)
 
 
-def expand_vars_playbook(data, additional_context):
+def expand_vars_playbook(data, additional_context, organization_id=None):
     playbook_context = additional_context.get("playbookContext", {})
     var_infiles = list(playbook_context.get("varInfiles", {}).values())
     include_vars = list(playbook_context.get("includeVars", {}).values())
-    merged_vars = load_and_merge_vars_in_context(var_infiles + include_vars)
+    merged_vars = load_and_merge_vars_in_context(
+        var_infiles + include_vars, "playbook", organization_id
+    )
     if len(merged_vars) > 0:
         for d in data:
             # last key ("tasks", "handlers", ...) needs to stay last
@@ -140,25 +729,27 @@ def expand_vars_playbook(data, additional_context):
                     del d["vars_files"]
 
 
-def expand_vars_tasks_in_role(data, additional_context):
+def expand_vars_tasks_in_role(data, additional_context, organization_id=None):
     role_context = additional_context.get("roleContext", {})
     role_vars = list(role_context.get("roleVars", {}).get("vars", {}).values())
     role_vars_defaults = list(role_context.get("roleVars", {}).get("defaults", {}).values())
     include_vars = list(role_context.get("includeVars", {}).values())
-    merged_vars = load_and_merge_vars_in_context(role_vars_defaults + role_vars + include_vars)
+    merged_vars = load_and_merge_vars_in_context(
+        role_vars_defaults + role_vars + include_vars, "tasks_in_role", organization_id
+    )
     if len(merged_vars) > 0:
         insert_set_fact_task(data, merged_vars)
 
 
-def expand_vars_tasks(data, additional_context):
+def expand_vars_tasks(data, additional_context, organization_id=None):
     standalone_task_context = additional_context.get("standaloneTaskContext", {})
     include_vars = list(standalone_task_context.get("includeVars", {}).values())
-    merged_vars = load_and_merge_vars_in_context(include_vars)
+    merged_vars = load_and_merge_vars_in_context(include_vars, "tasks", organization_id)
     if len(merged_vars) > 0:
         insert_set_fact_task(data, merged_vars)
 
 
-def expand_vars_files(data, ansible_file_type, additional_context):
+def expand_vars_files(data, ansible_file_type, additional_context, organization_id=None):
     """Expand the vars_files element by loading each file and add/update the vars element"""
     expand_vars_files = {
         "playbook": expand_vars_playbook,
@@ -166,7 +757,7 @@ def expand_vars_files(data, ansible_file_type, additional_context):
         "tasks": expand_vars_tasks,
     }
     if ansible_file_type in expand_vars_files:
-        expand_vars_files[ansible_file_type](data, additional_context)
+        expand_vars_files[ansible_file_type](data, additional_context, organization_id)
 
 
 def preprocess(
@@ -174,6 +765,20 @@ def preprocess(
     prompt,
     ansible_file_type="playbook",
     additional_context=None,
+    organization_id=None,
+):
+    context, prompt, _ = preprocess_document(
+        context, prompt, ansible_file_type, additional_context, organization_id
+    )
+    return context, prompt
+
+
+def preprocess_document(
+    context,
+    prompt,
+    ansible_file_type="playbook",
+    additional_context=None,
+    organization_id=None,
 ):
     """
     Formatting and normalization performed in this function is redundant in WCA case because
@@ -183,21 +788,35 @@ def preprocess(
     We call normalize_yaml regardless of single or multi in order to process the
     additional_context content. We need to hold the original multi-task prompt because
     pyyaml does not preserve comments.
+
+    For multi-task prompts, the normalized context is also returned as a YamlDocument
+    so that the later stages don't parse it again. It is None otherwise.
     """
     multi_task = is_multi_task_prompt(prompt)
     original_multi_task_prompt = prompt
+    context_document = None
 
     """
     Add a newline between the input context and prompt in case context doesn't end with one
     """
-    formatted = normalize_yaml(f"{context}\n{prompt}", ansible_file_type, additional_context)
+    normalize = (
+        normalize_document_incrementally
+        if settings.ENABLE_NORMALIZED_YAML_CACHE
+        else normalize_document
+    )
+    document = normalize(
+        YamlDocument(f"{context}\n{prompt}"), ansible_file_type, additional_context, organization_id
+    )
+    formatted = document.text if document else None
 
     if formatted is not None:
         logger.debug(f"initial user input {context}\n{prompt}")
 
         if multi_task:
+            # The multi-task prompt is a comment, the document is the normalized context
             context = formatted
             prompt = original_multi_task_prompt
+            context_document = document
         else:
             """
             Format and split off the last line as the prompt
@@ -216,7 +835,7 @@ def preprocess(
             prompt = handle_spaces(prompt)
 
         logger.debug(f"preprocessed user input {context}\n{prompt}")
-    return context, prompt
+    return context, prompt, context_document
 
 
 def handle_spaces(prompt):
@@ -352,7 +971,7 @@ def get_task_names_from_prompt(prompt):
 
 
 def get_task_names_from_tasks(tasks):
-    task_list = yaml.load(tasks, Loader=yaml.SafeLoader)
+    task_list = load_yaml(tasks)
     if (
         not isinstance(task_list, list)
         or not isinstance(task_list[0], dict)
@@ -366,12 +985,30 @@ def get_task_names_from_tasks(tasks):
     return names
 
 
-def restore_original_task_names(output_yaml, prompt, payload_context=""):
+def restore_original_task_names(
+    output_yaml, prompt, payload_context="", payload_context_document=None
+):
     if output_yaml and is_multi_task_prompt(prompt):
-        full_yaml = payload_context + output_yaml
+        # The output can only be parsed on its own when appended to a normalized context
+        normalized = (
+            payload_context_document is not None
+            and payload_context_document.text == payload_context
+        )
+        if not normalized:
+            payload_context_document = YamlDocument(payload_context)
         try:
-            payload_context_data = yaml.safe_load(payload_context)
-            full_data = yaml.safe_load(full_yaml)
+            payload_context_data = payload_context_document.data
+            suggested_tasks = None
+            if normalized:
+                suggested_tasks = get_suggested_task_list(output_yaml, payload_context_data)
+            if suggested_tasks is None:
+                full_data, name_lines = load_yaml_with_name_lines(payload_context + output_yaml)
+                full_task_list = get_task_list_from_yaml_data_obj(full_data)
+                payload_context_task_list = get_task_list_from_yaml_data_obj(payload_context_data)
+                # Skip the first N tasks, to process only the suggested tasks
+                suggested_task_list = full_task_list[len(payload_context_task_list) :]
+                line_offset = payload_context.count("\n")
+                suggested_tasks = suggested_task_list, name_lines, line_offset
         except Exception as exc:
             logger.exception(
                 f"Error while loading the result role/playbook YAML:{exc} "
@@ -379,27 +1016,75 @@ def restore_original_task_names(output_yaml, prompt, payload_context=""):
             )
             return output_yaml
         prompt_task_names = get_task_names_from_prompt(prompt)
+        output_yaml = replace_task_names(output_yaml, *suggested_tasks, prompt_task_names)
 
-        full_task_list = get_task_list_from_yaml_data_obj(full_data)
-        payload_context_task_list = get_task_list_from_yaml_data_obj(payload_context_data)
-        context_task_list_length = len(payload_context_task_list)
+    return output_yaml
 
-        # We enumerate starting with an index that equals to the length of the context task list.
-        # We are doing this to skip the first N tasks, then start with the Nth index
-        # to process only the suggested tasks
-        for i, task in enumerate(full_task_list[context_task_list_length:]):
-            try:
-                task_name = task.get("name", "")
-                task_line = "- name:  " + task_name
-                restored_task_line = task_line.replace(task_name, prompt_task_names[i])
-                output_yaml = output_yaml.replace(task_line, restored_task_line)
-            except IndexError:
-                logger.error(
-                    "There is no match for the enumerated prompt task in the suggestion yaml"
-                )
-                break
 
-    return output_yaml
+def replace_task_names(output_yaml, task_list, name_lines, line_offset, task_names):
+    """
+    Replace the name of each task of task_list by the task name of the same
+    index, on the "- name:  " line the name was parsed from. Only these lines
+    are looked at and the output is joined once.
+    """
+    lines = output_yaml.splitlines(keepends=True)
+    for i, task in enumerate(task_list):
+        if i >= len(task_names):
+            logger.error("There is no match for the enumerated prompt task in the suggestion yaml")
+            break
+        line_number = name_lines.get(id(task), -1) - line_offset
+        if not 0 <= line_number < len(lines) or not isinstance(task["name"], str):
+            continue
+        line = lines[line_number]
+        indent = len(line) - len(line.lstrip(" "))
+        task_line = "- name:  " + task["name"]
+        if line.startswith(task_line, indent):
+            lines[line_number] = (
+                f"{line[:indent]}- name:  {task_names[i]}{line[indent + len(task_line):]}"
+            )
+    return "".join(lines)
+
+
+def get_suggested_task_list(output_yaml, payload_context_data):
+    """
+    Return the tasks of output_yaml, the lines of their names and the line offset
+    of the output when it can be parsed without the normalized context it is
+    appended to, or None if both must be parsed together.
+
+    That's the case when the context is empty, a task list the output is appended
+    to, or a single play whose tasks are the last key.
+    """
+    lines = [line for line in output_yaml.splitlines() if line.strip()]
+    indent = len(lines[0]) - len(lines[0].lstrip(" "))
+    if not lines[0][indent:].startswith("- ") or any(
+        len(line) - len(line.lstrip(" ")) < indent for line in lines
+    ):
+        return None
+
+    data = payload_context_data
+    if data is None:
+        expected_indent = indent
+    elif not isinstance(data, list) or len(data) == 0 or not isinstance(data[0], dict):
+        return None
+    elif "tasks" not in data[0]:
+        # A task list, the output tasks are appended to it
+        expected_indent = 0
+    elif (
+        len(data) == 1
+        and list(data[0])[-1] == "tasks"
+        and (data[0]["tasks"] is None or (isinstance(data[0]["tasks"], list) and data[0]["tasks"]))
+    ):
+        # The tasks of a play are indented by 4 spaces
+        expected_indent = 4
+    else:
+        return None
+    if indent != expected_indent:
+        return None
+
+    task_list, name_lines = load_yaml_with_name_lines(output_yaml)
+    if not isinstance(task_list, list) or not all(isinstance(task, dict) for task in task_list):
+        return None
+    return task_list, name_lines, 0
 
 
 def get_task_list_from_yaml_data_obj(data):
@@ -416,67 +1101,102 @@ def get_task_list_from_yaml_data_obj(data):
     return task_list
 
 
-# List of Task keywords to filter out during prediction results parsing.
-ansible_task_keywords = None
-# RegExp Pattern based on ARI sources, see ansible_risk_insight/finder.py
-ansible_fqcn_declaration_pattern = re.compile(r"(([a-z0-9_]+)\.([a-z0-9_]+)\.([a-z0-9_]+)):")
-ansible_module_declaration_pattern = re.compile(r"([a-z0-9_.]+):")
-
-
-def get_ansible_task_keywords() -> {}:
-    # Compute the keywords for Task, just once, shared across modules.
-    global ansible_task_keywords
-    if not ansible_task_keywords:
-        ansible_task_keywords = _get_class_keywords(Task)
-        for c in Task.__mro__:
-            ansible_task_keywords.update(_get_class_keywords(c))
-    return ansible_task_keywords
-
-
-def _get_class_keywords(c):
-    # Filter out callable objects (functions)
-    # Filter out "private" (_) fields
-    # Delete "<attr>_val" suffixes (eg: Task.async_val -> async)
-    return {
-        attr.replace("_val", "")
-        for attr in c.__dict__
-        if not callable(c.__dict__[attr]) and not attr.startswith("_")
+# Keywords of ansible.playbook.task.Task (ansible-core 2.16), filtered out during
+# prediction results parsing. The "<attr>_val" attributes are listed without the
+# suffix (eg: Task.async_val -> async). They are precomputed so that the Task
+# class isn't imported, nor introspected, when the first completion is served.
+ANSIBLE_TASK_KEYWORDS = frozenset(
+    {
+        "DEPRECATED_ATTRIBUTES",
+        "action",
+        "any_errors_fatal",
+        "args",
+        "async",
+        "become",
+        "become_exe",
+        "become_flags",
+        "become_method",
+        "become_user",
+        "changed_when",
+        "check_mode",
+        "collections",
+        "connection",
+        "debugger",
+        "delay",
+        "delegate_facts",
+        "delegate_to",
+        "diff",
+        "environment",
+        "failed_when",
+        "fattributes",
+        "finalized",
+        "ignore_errors",
+        "ignore_unreachable",
+        "loop",
+        "loop_control",
+        "loop_with",
+        "module_defaults",
+        "name",
+        "no_log",
+        "notify",
+        "play",
+        "poll",
+        "port",
+        "register",
+        "remote_user",
+        "retries",
+        "run_once",
+        "tags",
+        "throttle",
+        "timeout",
+        "untagged",
+        "until",
+        "vars",
+        "when",
     }
+)
+# The characters of a module or FQCN key, based on ARI sources, see ansible_risk_insight/finder.py
+MODULE_KEY_CHARACTERS = "abcdefghijklmnopqrstuvwxyz0123456789_."
 
 
-def _get_fqcn_from_prediction(prediction):
-    return _parse_module_from_prediction(
-        ansible_fqcn_declaration_pattern, prediction, lambda value: False
-    )
+def get_ansible_task_keywords() -> frozenset:
+    return ANSIBLE_TASK_KEYWORDS
 
 
-def _get_module_from_prediction(prediction):
-    return _parse_module_from_prediction(
-        ansible_module_declaration_pattern,
-        prediction,
-        lambda value: value in get_ansible_task_keywords(),
-    )
+def _get_module_key(line):
+    # The key of a "key:" or "- key:" line made of module key characters, if any
+    content = line.lstrip(" ")
+    if content.startswith("- "):
+        content = content[2:].lstrip(" ")
+    key, sep, value = content.partition(":")
+    if not sep or not key or key.strip(MODULE_KEY_CHARACTERS) or value[:1] not in ("", " ", "\t"):
+        return None
+    return key
 
 
-def _parse_module_from_prediction(re, prediction, predicate):
-    try:
-        iter = re.finditer(prediction)
-        item = next(iter)
-        while item:
-            item_value = item.group(1)
-            if predicate(item_value):
-                item = next(iter)
-                continue
-            return item_value
-    except StopIteration:
-        pass
-    return None
+def _get_fqcn(key):
+    # "namespace.collection.module", the last three parts of longer keys
+    parts = key.split(".")
+    if len(parts) < 3 or not all(parts[-3:]):
+        return None
+    return key if len(parts) == 3 else ".".join(parts[-3:])
 
 
 def get_fqcn_or_module_from_prediction(prediction):
+    """
+    Return the first FQCN key of the prediction or, if there is none, its first
+    key that isn't a task keyword. The prediction is scanned once, line by line.
+    """
     if prediction is None:
         return None
-    fqcn = _get_fqcn_from_prediction(prediction)
-    if fqcn is None:
-        fqcn = _get_module_from_prediction(prediction)
-    return fqcn
+    module = None
+    for line in prediction.splitlines():
+        key = _get_module_key(line)
+        if key is None:
+            continue
+        fqcn = _get_fqcn(key) if "." in key else None
+        if fqcn is not None:
+            return fqcn
+        if module is None and key not in ANSIBLE_TASK_KEYWORDS:
+            module = key
+    return module
@@ -0,0 +1,171 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter
+
+from ansible_ai_connect.ai.api.model_pipelines.pipelines import (
+    CompletionsParameters,
+    CompletionsResponse,
+    ModelPipelineCompletions,
+)
+
+logger = logging.getLogger(__name__)
+
+coalesced_requests_counter = Counter(
+    "model_prediction_coalesced_requests",
+    "Completion requests served from an identical in-flight request",
+    ["mode"],
+    namespace=NAMESPACE,
+)
+
+COALESCING_KEY_PREFIX = "completions_inflight"
+# How often a follower checks the shared cache for the leader's result
+COALESCING_POLL_INTERVAL_SEC = 0.05
+
+
+class InflightRequest:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[CompletionsResponse] = None
+        self.exception: Optional[BaseException] = None
+
+
+class CompletionsCoalescer:
+    """
+    Single-flight layer in front of ModelPipelineCompletions.invoke().
+
+    Identical requests (same user, model and model input, ignoring the
+    suggestion ID) that arrive whilst a first one is still in flight wait for
+    its result instead of calling the model server themselves. With
+    COMPLETION_COALESCING_CROSS_WORKER the leader publishes its result in the
+    shared cache so that followers in other workers can pick it up as well.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, InflightRequest] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(params: CompletionsParameters) -> str:
+        user = getattr(params.request, "user", None)
+        instances = [
+            {k: v for k, v in instance.items() if k != "suggestionId"}
+            for instance in params.model_input.get("instances", [])
+        ]
+        digest = hashlib.sha256(
+            json.dumps(
+                [str(getattr(user, "pk", "")), params.model_id or "", instances], sort_keys=True
+            ).encode("utf-8")
+        ).hexdigest()
+        return f"{COALESCING_KEY_PREFIX}_{digest}"
+
+    def invoke(
+        self, pipeline: ModelPipelineCompletions, params: CompletionsParameters
+    ) -> CompletionsResponse:
+        if not settings.ENABLE_COMPLETION_COALESCING:
+            return pipeline.invoke(params)
+
+        key = self.get_key(params)
+        with self._lock:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[key] = InflightRequest()
+
+        if not leader:
+            return self._follow(inflight, pipeline, params)
+
+        try:
+            if settings.COMPLETION_COALESCING_CROSS_WORKER:
+                inflight.result = self._invoke_shared(key, pipeline, params)
+            else:
+                inflight.result = pipeline.invoke(params)
+            return inflight.result
+        except BaseException as e:
+            inflight.exception = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.done.set()
+
+    def _follow(
+        self,
+        inflight: InflightRequest,
+        pipeline: ModelPipelineCompletions,
+        params: CompletionsParameters,
+    ) -> CompletionsResponse:
+        if not inflight.done.wait(settings.COMPLETION_COALESCING_TIMEOUT_SEC):
+            logger.warning("timed out waiting for an identical in-flight completion request")
+            return pipeline.invoke(params)
+        coalesced_requests_counter.labels(mode="local").inc()
+        if inflight.exception is not None:
+            raise inflight.exception
+        return copy.deepcopy(inflight.result)
+
+    def _invoke_shared(
+        self, key: str, pipeline: ModelPipelineCompletions, params: CompletionsParameters
+    ) -> CompletionsResponse:
+        timeout = settings.COMPLETION_COALESCING_TIMEOUT_SEC
+        lock_key = f"{key}_lock"
+        token = uuid.uuid4().hex
+
+        # cache.add() is atomic: only the first worker becomes the leader.
+        if not cache.add(lock_key, token, timeout):
+            result = self._wait_for_shared_result(key, lock_key, timeout)
+            if result is not None:
+                coalesced_requests_counter.labels(mode="shared").inc()
+                return result
+            return pipeline.invoke(params)
+
+        try:
+            result = pipeline.invoke(params)
+            cache.set(f"{key}_result_{token}", result, timeout)
+            return result
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    @staticmethod
+    def _wait_for_shared_result(key: str, lock_key: str, timeout: int) -> Optional[Any]:
+        deadline = time.monotonic() + timeout
+        token = None
+        while time.monotonic() < deadline:
+            token = cache.get(lock_key) or token
+            if token is None:
+                # The leader finished before we could read its token
+                return None
+            result = cache.get(f"{key}_result_{token}")
+            if result is not None:
+                return result
+            if cache.get(lock_key) != token:
+                # The leader has finished without publishing a result, i.e. it failed
+                return cache.get(f"{key}_result_{token}")
+            time.sleep(COALESCING_POLL_INTERVAL_SEC)
+        return None
+
+
+completions_coalescer = CompletionsCoalescer()
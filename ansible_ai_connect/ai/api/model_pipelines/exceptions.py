@@ -120,3 +120,10 @@ class WcaRequestIdCorrelationFailure(WcaException):
 @dataclass
 class WcaInstanceDeleted(WcaException):
     """WCA Instance associated with the Model ID has been deleted."""
+
+
+@dataclass
+class WcaCircuitOpen(WcaException):
+    """The circuit breaker of the WCA API endpoint is open."""
+
+    endpoint: str = ""
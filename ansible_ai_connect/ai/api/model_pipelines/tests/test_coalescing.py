@@ -0,0 +1,175 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ansible_ai_connect.ai.api.model_pipelines.coalescing import (
+    CompletionsCoalescer,
+    coalesced_requests_counter,
+)
+from ansible_ai_connect.ai.api.model_pipelines.pipelines import CompletionsParameters
+
+
+def get_params(user_pk=1, prompt="- name: Install Apache\n", suggestion_id="1"):
+    return CompletionsParameters.init(
+        request=Mock(user=Mock(pk=user_pk)),
+        model_input={
+            "instances": [{"prompt": prompt, "context": "", "suggestionId": suggestion_id}]
+        },
+        model_id="a-model",
+        suggestion_id=suggestion_id,
+    )
+
+
+def get_blocking_pipeline(side_effect=None):
+    started = threading.Event()
+    release = threading.Event()
+
+    def invoke(params):
+        started.set()
+        release.wait(5)
+        if side_effect:
+            raise side_effect
+        return {"model_id": "a-model", "predictions": ["ansible.builtin.apt:\n"]}
+
+    pipeline = Mock()
+    pipeline.invoke.side_effect = invoke
+    return pipeline, started, release
+
+
+@override_settings(ENABLE_COMPLETION_COALESCING=True)
+@override_settings(COMPLETION_COALESCING_CROSS_WORKER=False)
+@override_settings(COMPLETION_COALESCING_TIMEOUT_SEC=5)
+class TestCompletionsCoalescer(SimpleTestCase):
+
+    def run_concurrently(self, coalescer, pipeline, started, release, count=4):
+        follow = coalescer._follow
+        following = threading.Semaphore(0)
+
+        def _follow(*args):
+            following.release()
+            return follow(*args)
+
+        coalescer._follow = _follow
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            leader = executor.submit(coalescer.invoke, pipeline, get_params(suggestion_id="0"))
+            started.wait(5)
+            followers = [
+                executor.submit(coalescer.invoke, pipeline, get_params(suggestion_id=str(i)))
+                for i in range(1, count)
+            ]
+            # Wait for the followers to join the in-flight request before releasing the leader
+            for _ in followers:
+                following.acquire(timeout=5)
+            release.set()
+            return [leader] + followers
+
+    def test_get_key(self):
+        key = CompletionsCoalescer.get_key(get_params())
+        self.assertEqual(key, CompletionsCoalescer.get_key(get_params(suggestion_id="2")))
+        self.assertNotEqual(key, CompletionsCoalescer.get_key(get_params(user_pk=2)))
+        self.assertNotEqual(key, CompletionsCoalescer.get_key(get_params(prompt="- name: Foo\n")))
+
+    def test_followers_share_the_leader_result(self):
+        pipeline, started, release = get_blocking_pipeline()
+        before = coalesced_requests_counter.labels(mode="local")._value.get()
+
+        futures = self.run_concurrently(CompletionsCoalescer(), pipeline, started, release)
+
+        results = [f.result() for f in futures]
+        self.assertEqual(pipeline.invoke.call_count, 1)
+        self.assertTrue(all(r == results[0] for r in results))
+        self.assertEqual(coalesced_requests_counter.labels(mode="local")._value.get(), before + 3)
+
+    def test_followers_get_the_leader_exception(self):
+        pipeline, started, release = get_blocking_pipeline(side_effect=ValueError("boom"))
+
+        futures = self.run_concurrently(CompletionsCoalescer(), pipeline, started, release)
+
+        for f in futures:
+            with self.assertRaises(ValueError):
+                f.result()
+        self.assertEqual(pipeline.invoke.call_count, 1)
+
+    def test_sequential_requests_are_not_coalesced(self):
+        coalescer = CompletionsCoalescer()
+        pipeline = Mock()
+        coalescer.invoke(pipeline, get_params())
+        coalescer.invoke(pipeline, get_params())
+        self.assertEqual(pipeline.invoke.call_count, 2)
+
+    @override_settings(ENABLE_COMPLETION_COALESCING=False)
+    def test_disabled(self):
+        coalescer = CompletionsCoalescer()
+        pipeline, started, release = get_blocking_pipeline()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(coalescer.invoke, pipeline, get_params()) for _ in range(2)]
+            while pipeline.invoke.call_count < 2:
+                started.wait(0.01)
+            release.set()
+        [f.result() for f in futures]
+        self.assertEqual(pipeline.invoke.call_count, 2)
+
+
+@override_settings(ENABLE_COMPLETION_COALESCING=True)
+@override_settings(COMPLETION_COALESCING_CROSS_WORKER=True)
+@override_settings(COMPLETION_COALESCING_TIMEOUT_SEC=1)
+class TestCompletionsCoalescerCrossWorker(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.params = get_params()
+        self.key = CompletionsCoalescer.get_key(self.params)
+
+    def test_leader_publishes_result(self):
+        pipeline = Mock()
+        pipeline.invoke.return_value = {"predictions": ["a"]}
+
+        with patch(
+            "ansible_ai_connect.ai.api.model_pipelines.coalescing.uuid.uuid4",
+            return_value=Mock(hex="token"),
+        ):
+            CompletionsCoalescer().invoke(pipeline, self.params)
+
+        self.assertEqual(cache.get(f"{self.key}_result_token"), {"predictions": ["a"]})
+        self.assertIsNone(cache.get(f"{self.key}_lock"))
+
+    def test_follower_uses_result_from_another_worker(self):
+        cache.set(f"{self.key}_lock", "other-worker", 1)
+        cache.set(f"{self.key}_result_other-worker", {"predictions": ["a"]}, 1)
+        before = coalesced_requests_counter.labels(mode="shared")._value.get()
+        pipeline = Mock()
+
+        result = CompletionsCoalescer().invoke(pipeline, self.params)
+
+        self.assertEqual(result, {"predictions": ["a"]})
+        pipeline.invoke.assert_not_called()
+        self.assertEqual(coalesced_requests_counter.labels(mode="shared")._value.get(), before + 1)
+
+    def test_follower_falls_back_when_leader_fails(self):
+        cache.set(f"{self.key}_lock", "other-worker", 1)
+        pipeline = Mock()
+        pipeline.invoke.return_value = {"predictions": ["b"]}
+
+        # The other worker's lock expires without a result being published
+        result = CompletionsCoalescer().invoke(pipeline, self.params)
+
+        self.assertEqual(result, {"predictions": ["b"]})
+        pipeline.invoke.assert_called_once()
@@ -29,6 +29,7 @@ from requests.exceptions import HTTPError, ReadTimeout
 from ansible_ai_connect.ai.api.aws.wca_secret_manager import (
     DummySecretEntry,
     DummySecretManager,
+    OrgCredentials,
     Suffixes,
     WcaSecretManagerError,
 )
@@ -58,6 +59,9 @@ from ansible_ai_connect.ai.api.model_pipelines.tests import mock_pipeline_config
 from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_base import (
     WCA_REQUEST_ID_HEADER,
     WCA_REQUEST_USER_UUID_HEADER,
+    ibm_cloud_identity_token_cache_hit_counter,
+    ibm_cloud_identity_token_cache_miss_counter,
+    ibm_cloud_identity_token_cache_refresh_counter,
     ibm_cloud_identity_token_hist,
     ibm_cloud_identity_token_retry_counter,
     wca_codegen_hist,
@@ -82,6 +86,7 @@ from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_saas import (
     WCASaaSRoleExplanationPipeline,
     WCASaaSRoleGenerationPipeline,
 )
+from ansible_ai_connect.ai.api.model_pipelines.wca.token_cache import token_cache
 from ansible_ai_connect.test_utils import (
     WisdomAppsBackendMocking,
     WisdomServiceAPITestCaseBaseOIDC,
@@ -188,11 +193,24 @@ class TestWCAClient(WisdomAppsBackendMocking, WisdomServiceAPITestCaseBaseOIDC):
 
     def test_get_api_key_from_aws_error(self):
         m = Mock()
-        m.get_secret.side_effect = WcaSecretManagerError
+        m.get_org_credentials.side_effect = WcaSecretManagerError
         self.mock_wca_secret_manager_with(m)
         with self.assertRaises(WcaSecretManagerError):
             self.model_client.get_api_key(self.user)
 
+    @override_settings(WCA_SECRET_DUMMY_SECRETS="1981:12345<sep>my-model")
+    def test_get_api_key_and_model_id_single_lookup(self):
+        m = Mock()
+        m.get_org_credentials.return_value = OrgCredentials(
+            api_key=DummySecretEntry.from_string("12345"),
+            model_id=DummySecretEntry.from_string("my-model"),
+        )
+        self.mock_wca_secret_manager_with(m)
+        self.assertEqual(self.model_client.get_api_key(self.user), "12345")
+        self.assertEqual(self.model_client.get_model_id(self.user, None), "my-model")
+        m.get_org_credentials.assert_called_once_with(1981)
+        m.get_secret.assert_not_called()
+
     def test_get_api_key_with_environment_override(self):
         self.config.api_key = "key"
         api_key = self.model_client.get_api_key(self.user)
@@ -497,7 +515,10 @@ class TestWCAClientRoleGeneration(WisdomAppsBackendMocking, WisdomServiceLogAwar
     @override_settings(ENABLE_ANSIBLE_LINT_POSTPROCESS=True)
     def test_role_gen_with_lint_mocked(self):
         fake_linter = Mock()
-        fake_linter.run_linter.return_value = "I'm super fake!"
+        fake_linter.run_linter_on_role.return_value = {
+            "roles/foo_bar/tasks/main.yml": "I'm super fake!",
+            "roles/foo_bar/defaults/main.yml": "Me too!",
+        }
         self.mock_ansible_lint_caller_with(fake_linter)
         name, files, outline, warnings = self.wca_client.invoke(
             RoleGenerationParameters.init(
@@ -507,10 +528,15 @@ class TestWCAClientRoleGeneration(WisdomAppsBackendMocking, WisdomServiceLogAwar
         self.assertEqual(name, "foo_bar")
         self.assertEqual(outline, "Ahh!")
         self.assertEqual(warnings, [])
-        for file in files:
-            if file["file_type"] != "task":
-                continue
-            self.assertEqual(file["content"], "I'm super fake!")
+        # The files are linted in a single call
+        fake_linter.run_linter_on_role.assert_called_once_with(
+            {
+                "roles/foo_bar/tasks/main.yml": "- package:\n    name: emacs",
+                "roles/foo_bar/defaults/main.yml": "my_var: some content",
+            }
+        )
+        fake_linter.run_linter.assert_not_called()
+        self.assertEqual([file["content"] for file in files], ["I'm super fake!", "Me too!"])
 
     @assert_call_count_metrics(metric=wca_codegen_role_hist)
     @override_settings(ENABLE_ANSIBLE_LINT_POSTPROCESS=False)
@@ -539,10 +565,10 @@ class TestWCAClientRoleGeneration(WisdomAppsBackendMocking, WisdomServiceLogAwar
         self.assertEqual(name, "foo_bar")
         self.assertEqual(outline, "Ahh!")
         self.assertEqual(warnings, [])
-        for file in files:
-            if file["file_type"] != "task":
-                continue
-            self.assertEqual(file["content"], "---\n- ansible.builtin.package:\n    name: emacs\n")
+        self.assertEqual(
+            [file["content"] for file in files],
+            ["---\n- ansible.builtin.package:\n    name: emacs\n", "---\nmy_var: some content\n"],
+        )
 
 
 @override_settings(WCA_SECRET_BACKEND_TYPE="dummy")
@@ -704,6 +730,8 @@ class TestWCACodegen(WisdomAppsBackendMocking, WisdomServiceLogAwareTestCase):
             verify_ssl=True,
         )
         self.config = config
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
 
     @assert_call_count_metrics(metric=ibm_cloud_identity_token_hist)
     def test_get_token(self):
@@ -735,6 +763,97 @@ class TestWCACodegen(WisdomAppsBackendMocking, WisdomServiceLogAwareTestCase):
             auth=None,
         )
 
+    @assert_call_count_metrics(metric=ibm_cloud_identity_token_cache_hit_counter)
+    def test_get_token_cached(self):
+        response = MockResponse(
+            json={"access_token": "access_token", "expires_in": 3600},
+            status_code=200,
+        )
+        model_client = WCASaaSCompletionsPipeline(self.config)
+        model_client.session.post = Mock(return_value=response)
+
+        first = model_client.get_token("abcdef")
+        second = model_client.get_token("abcdef")
+
+        self.assertEqual(first, second)
+        model_client.session.post.assert_called_once()
+
+    @assert_call_count_metrics(metric=ibm_cloud_identity_token_cache_hit_counter)
+    def test_get_token_cached_across_pipelines(self):
+        response = MockResponse(
+            json={"access_token": "access_token", "expires_in": 3600},
+            status_code=200,
+        )
+        completions_client = WCASaaSCompletionsPipeline(self.config)
+        completions_client.session.post = Mock(return_value=response)
+        content_match_client = WCASaaSContentMatchPipeline(self.config)
+        content_match_client.session.post = Mock(return_value=response)
+
+        completions_client.get_token("abcdef")
+        content_match_client.get_token("abcdef")
+
+        completions_client.session.post.assert_called_once()
+        content_match_client.session.post.assert_not_called()
+
+    def test_rejected_token_is_invalidated(self):
+        model_client = WCASaaSCompletionsPipeline(self.config)
+        model_client.session.post = Mock(
+            side_effect=[
+                MockResponse(json={"access_token": "a", "expires_in": 3600}, status_code=200),
+                MockResponse(json={}, status_code=401),
+                MockResponse(json={"access_token": "b", "expires_in": 3600}, status_code=200),
+            ]
+        )
+        headers = model_client.get_request_headers("abcdef", None)
+        wca_request = model_client.get_inference_request(
+            "model_id", "", "- name: install ffmpeg", headers=headers
+        )
+
+        self.assertEqual(model_client.post(wca_request).status_code, 401)
+
+        # The next request fetches a new token
+        self.assertEqual(model_client.get_token("abcdef")["access_token"], "b")
+        self.assertEqual(model_client.session.post.call_count, 3)
+
+    @assert_call_count_metrics(metric=ibm_cloud_identity_token_cache_miss_counter)
+    def test_get_token_cached_per_api_key(self):
+        response = MockResponse(
+            json={"access_token": "access_token", "expires_in": 3600},
+            status_code=200,
+        )
+        model_client = WCASaaSCompletionsPipeline(self.config)
+        model_client.session.post = Mock(return_value=response)
+
+        model_client.get_token("abcdef")
+        model_client.get_token("ghijkl")
+
+        self.assertEqual(model_client.session.post.call_count, 2)
+
+    @assert_call_count_metrics(metric=ibm_cloud_identity_token_cache_refresh_counter)
+    def test_get_token_refreshed_before_expiry(self):
+        response = MockResponse(
+            json={"access_token": "access_token", "expiration": 2000000000},
+            status_code=200,
+        )
+        model_client = WCASaaSCompletionsPipeline(self.config)
+        model_client.session.post = Mock(return_value=response)
+
+        with patch(
+            "ansible_ai_connect.ai.api.model_pipelines.wca.token_cache.time.time",
+            return_value=2000000000 - 3600,
+        ):
+            model_client.get_token("abcdef")
+            model_client.get_token("abcdef")
+        self.assertEqual(model_client.session.post.call_count, 1)
+
+        # Inside the refresh margin, the token is fetched again
+        with patch(
+            "ansible_ai_connect.ai.api.model_pipelines.wca.token_cache.time.time",
+            return_value=2000000000 - 60,
+        ):
+            model_client.get_token("abcdef")
+        self.assertEqual(model_client.session.post.call_count, 2)
+
     @assert_call_count_metrics(metric=ibm_cloud_identity_token_hist)
     def test_get_token_with_auth(self):
         self.config.idp_url = "http://some-different-idp"
@@ -1512,14 +1631,8 @@ class TestWCAOnPremCodegen(WisdomServiceLogAwareTestCase):
         )
 
 
-def mock_anonymize(x):
-    if isinstance(x, str):
-        return f"anonymized_{x}"
-    elif isinstance(x, dict):
-        return {k: mock_anonymize(v) for k, v in x.items()}
-    elif isinstance(x, list):
-        return [mock_anonymize(item) for item in x]
-    return x
+def mock_anonymize(value, key_name, value_template):
+    return f"anonymized_{value}"
 
 
 class TestWCAAnonymization(WisdomServiceAPITestCaseBaseOIDC, WisdomServiceLogAwareTestCase):
@@ -1531,11 +1644,9 @@ class TestWCAAnonymization(WisdomServiceAPITestCaseBaseOIDC, WisdomServiceLogAwa
         self.mock_request.user = self.user
 
         # Mock anonymizer for testing
-        self.anonymizer_patcher = patch(
-            "ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_base.anonymizer"
-        )
+        self.anonymizer_patcher = patch("ansible_ai_connect.ai.api.utils.anonymization.anonymizer")
         self.mock_anonymizer = self.anonymizer_patcher.start()
-        self.mock_anonymizer.anonymize_struct = mock_anonymize
+        self.mock_anonymizer.anonymize_field = mock_anonymize
 
     def tearDown(self):
         self.anonymizer_patcher.stop()
@@ -0,0 +1,92 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import asyncio
+import logging
+import weakref
+from typing import Any, Mapping, Optional
+
+import aiohttp
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from ansible_ai_connect.main.ssl_manager import ssl_manager
+
+logger = logging.getLogger(__name__)
+
+# One aiohttp session per event loop (and SSL verification mode). Each session owns a
+# connection pool keyed by host, shared by all the WCA pipelines running on that loop.
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[bool, aiohttp.ClientSession]]"
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_client_session(verify_ssl: bool = True) -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    sessions = _sessions.setdefault(loop, {})
+    session = sessions.get(verify_ssl)
+    if session is None or session.closed:
+        if verify_ssl:
+            connector = aiohttp.TCPConnector(ssl=ssl_manager.get_ssl_context())
+        else:
+            connector = aiohttp.TCPConnector(ssl=False)
+        session = sessions[verify_ssl] = aiohttp.ClientSession(connector=connector)
+    return session
+
+
+async def close_client_sessions():
+    """Close the sessions of the running event loop."""
+    sessions = _sessions.pop(asyncio.get_running_loop(), {})
+    for session in sessions.values():
+        await session.close()
+
+
+def to_requests_response(response: aiohttp.ClientResponse, content: bytes) -> requests.Response:
+    """
+    Convert an aiohttp response to a requests.Response, so that the WCA response
+    checks, raise_for_status() and the retry logic are shared with the sync path.
+    """
+    result = requests.Response()
+    result.status_code = response.status
+    result.reason = response.reason or ""
+    result.headers = CaseInsensitiveDict(response.headers)
+    result.url = str(response.url)
+    result.encoding = response.charset
+    result._content = content
+    return result
+
+
+async def post(
+    url: str,
+    headers: Mapping[str, Optional[str]],
+    json: Any,
+    timeout: Optional[float] = None,
+    verify_ssl: bool = True,
+) -> requests.Response:
+    """
+    POST a JSON payload. aiohttp errors are raised as their requests counterpart.
+    """
+    session = get_client_session(verify_ssl)
+    try:
+        async with session.post(
+            url,
+            headers={k: v for k, v in headers.items() if v is not None},
+            json=json,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            content = await response.read()
+            return to_requests_response(response, content)
+    except asyncio.TimeoutError as e:
+        raise requests.exceptions.ReadTimeout(str(e)) from e
+    except aiohttp.ClientError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
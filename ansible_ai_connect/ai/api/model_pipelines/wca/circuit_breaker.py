@@ -0,0 +1,188 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Optional
+
+from django.conf import settings
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter, Gauge
+
+from ansible_ai_connect.ai.api.model_pipelines.exceptions import WcaCircuitOpen
+
+logger = logging.getLogger(__name__)
+
+circuit_breaker_state_gauge = Gauge(
+    "wca_circuit_breaker_state",
+    "State of the WCA API circuit breakers (0: closed, 1: half-open, 2: open)",
+    ["endpoint"],
+    namespace=NAMESPACE,
+)
+circuit_breaker_rejection_counter = Counter(
+    "wca_circuit_breaker_rejections",
+    "Counter of WCA API calls rejected by an open circuit breaker",
+    ["endpoint"],
+    namespace=NAMESPACE,
+)
+
+
+class CircuitState(IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+def is_failure(status_code: Optional[int]) -> bool:
+    # Client errors (including rate limiting) say nothing about the health of the endpoint
+    return status_code is None or status_code >= 500
+
+
+class CallOutcome:
+    def __init__(self):
+        self.status_code: Optional[int] = None
+
+
+class CircuitBreaker:
+    """
+    Per-worker circuit breaker of a WCA API endpoint.
+
+    The outcome of the last WCA_CIRCUIT_BREAKER_WINDOW_SIZE calls is kept. The
+    circuit opens when either the failure rate or the slow call rate of the
+    window reaches its threshold, after which calls are rejected with
+    WcaCircuitOpen for WCA_CIRCUIT_BREAKER_OPEN_DURATION_SEC. The circuit then
+    becomes half-open and lets WCA_CIRCUIT_BREAKER_HALF_OPEN_CALLS probe calls
+    through: it closes if they all succeed and opens again otherwise.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._lock = threading.Lock()
+        self._window: deque[tuple[bool, bool]] = deque()
+        self._opened_at = 0.0
+        # Incremented on each state change, identifies the half-open period of a probe
+        self._period = 0
+        self._probes = 0
+        self._probe_successes = 0
+        self._set_state(CircuitState.CLOSED)
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _set_state(self, state: CircuitState):
+        self._state = state
+        self._period += 1
+        self._window.clear()
+        self._probes = 0
+        self._probe_successes = 0
+        if state == CircuitState.OPEN:
+            self._opened_at = time.monotonic()
+            logger.warning(f"Circuit breaker of the WCA {self.endpoint} API is open")
+        circuit_breaker_state_gauge.labels(endpoint=self.endpoint).set(state)
+
+    def _refresh_state(self):
+        if (
+            self._state == CircuitState.OPEN
+            and time.monotonic() - self._opened_at >= settings.WCA_CIRCUIT_BREAKER_OPEN_DURATION_SEC
+        ):
+            self._set_state(CircuitState.HALF_OPEN)
+
+    def before_call(self) -> Optional[int]:
+        """
+        Raise WcaCircuitOpen if the call is not permitted. Return the half-open
+        period of the call when it is a probe, to be passed to release().
+        """
+        if not settings.ENABLE_WCA_CIRCUIT_BREAKER:
+            return None
+        with self._lock:
+            self._refresh_state()
+            if self._state == CircuitState.HALF_OPEN:
+                if self._probes < settings.WCA_CIRCUIT_BREAKER_HALF_OPEN_CALLS:
+                    self._probes += 1
+                    return self._period
+            elif self._state == CircuitState.CLOSED:
+                return None
+        circuit_breaker_rejection_counter.labels(endpoint=self.endpoint).inc()
+        raise WcaCircuitOpen(endpoint=self.endpoint)
+
+    def release(self, probe: Optional[int]):
+        """Give back the slot of a probe that ended without an outcome."""
+        if probe is None:
+            return
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN and self._period == probe:
+                self._probes -= 1
+
+    def record(self, duration: float, failed: bool):
+        if not settings.ENABLE_WCA_CIRCUIT_BREAKER:
+            return
+        slow = duration >= settings.WCA_CIRCUIT_BREAKER_SLOW_CALL_DURATION_SEC
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN:
+                if failed or slow:
+                    self._set_state(CircuitState.OPEN)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= settings.WCA_CIRCUIT_BREAKER_HALF_OPEN_CALLS:
+                    self._set_state(CircuitState.CLOSED)
+            elif self._state == CircuitState.CLOSED:
+                self._window.append((failed, slow))
+                while len(self._window) > settings.WCA_CIRCUIT_BREAKER_WINDOW_SIZE:
+                    self._window.popleft()
+                if self._should_open():
+                    self._set_state(CircuitState.OPEN)
+
+    def _should_open(self) -> bool:
+        calls = len(self._window)
+        if calls < settings.WCA_CIRCUIT_BREAKER_MINIMUM_CALLS:
+            return False
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow_calls = sum(1 for _, slow in self._window if slow)
+        return (
+            failures / calls >= settings.WCA_CIRCUIT_BREAKER_FAILURE_RATE_THRESHOLD
+            or slow_calls / calls >= settings.WCA_CIRCUIT_BREAKER_SLOW_CALL_RATE_THRESHOLD
+        )
+
+    @contextmanager
+    def guard(self):
+        """
+        Wrap a single call of the endpoint. The status code of its response must be
+        set on the yielded CallOutcome; exceptions are recorded as failures unless
+        they carry a client error response.
+        """
+        probe = self.before_call()
+        outcome = CallOutcome()
+        start = time.monotonic()
+        try:
+            yield outcome
+        except Exception as e:
+            status_code = getattr(getattr(e, "response", None), "status_code", None)
+            self.record(time.monotonic() - start, is_failure(status_code))
+            raise
+        except BaseException:
+            # e.g. a cancelled call: it says nothing about the health of the endpoint
+            self.release(probe)
+            raise
+        self.record(time.monotonic() - start, is_failure(outcome.status_code))
+
+    def reset(self):
+        with self._lock:
+            self._set_state(CircuitState.CLOSED)
@@ -0,0 +1,237 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Optional
+
+from django.conf import settings
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+hedged_requests_fired_counter = Counter(
+    "wca_codegen_hedged_requests_fired",
+    "Counter of duplicate WCA codegen requests sent after the hedging delay",
+    namespace=NAMESPACE,
+)
+hedged_requests_won_counter = Counter(
+    "wca_codegen_hedged_requests_won",
+    "Counter of duplicate WCA codegen requests that returned before the original one",
+    namespace=NAMESPACE,
+)
+
+# Number of recent latencies the hedging delay is computed from
+LATENCY_WINDOW_SIZE = 1000
+# WCA_CODEGEN_HEDGING_DEFAULT_DELAY_SEC is used until this many latencies were observed
+LATENCY_MIN_SAMPLES = 100
+# Maximum number of hedges an organization can accumulate
+HEDGE_BUDGET_MAX_TOKENS = 10
+# Number of organizations whose budget is kept, the least recently used are dropped
+HEDGE_BUDGET_MAX_ORGANIZATIONS = 10000
+HEDGING_MAX_WORKERS = 16
+
+
+class LatencyTracker:
+    def __init__(self):
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW_SIZE)
+        self._lock = threading.Lock()
+
+    def observe(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def get_percentile(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < LATENCY_MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, math.ceil(percentile / 100 * len(latencies)) - 1)
+        return latencies[max(0, index)]
+
+
+class HedgeBudget:
+    """
+    Per-organization token bucket: each request deposits
+    WCA_CODEGEN_HEDGING_BUDGET_PERCENT / 100 tokens and each hedge withdraws one.
+    """
+
+    def __init__(self):
+        self._tokens: OrderedDict[Any, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def deposit(self, organization_id, tokens: Optional[float] = None):
+        if tokens is None:
+            tokens = settings.WCA_CODEGEN_HEDGING_BUDGET_PERCENT / 100
+        with self._lock:
+            tokens += self._tokens.pop(organization_id, 0.0)
+            self._tokens[organization_id] = min(float(HEDGE_BUDGET_MAX_TOKENS), tokens)
+            while len(self._tokens) > HEDGE_BUDGET_MAX_ORGANIZATIONS:
+                self._tokens.popitem(last=False)
+
+    def try_withdraw(self, organization_id) -> bool:
+        with self._lock:
+            tokens = self._tokens.get(organization_id, 0.0)
+            if tokens < 1:
+                return False
+            self._tokens[organization_id] = tokens - 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+class Hedger:
+    """
+    Hedged requests for the WCA codegen API.
+
+    When ENABLE_WCA_CODEGEN_HEDGING is set and a request hasn't returned after
+    the WCA_CODEGEN_HEDGING_PERCENTILE percentile of the recent latencies, an
+    identical request (same payload and X-Request-ID) is sent and whichever
+    returns first is used. Hedges are limited by a per-organization budget.
+
+    The requests are sent from a pool of HEDGING_MAX_WORKERS threads. Requests
+    never wait for a worker: when they are all busy, the request is sent from
+    the calling thread and isn't hedged. async_post() sends them as tasks of
+    the running event loop instead, and cancels the slower one.
+    """
+
+    def __init__(self):
+        self.latencies = LatencyTracker()
+        self.budget = HedgeBudget()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._free_workers = threading.BoundedSemaphore(HEDGING_MAX_WORKERS)
+
+    def get_delay(self) -> float:
+        delay = self.latencies.get_percentile(settings.WCA_CODEGEN_HEDGING_PERCENTILE)
+        return settings.WCA_CODEGEN_HEDGING_DEFAULT_DELAY_SEC if delay is None else delay
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=HEDGING_MAX_WORKERS, thread_name_prefix="wca-hedging"
+                )
+            return self._executor
+
+    def _run(self, post: Callable[[], Any]) -> Any:
+        start = time.monotonic()
+        try:
+            return post()
+        finally:
+            self.latencies.observe(time.monotonic() - start)
+
+    def _run_on_worker(self, post: Callable[[], Any]) -> Any:
+        try:
+            return self._run(post)
+        finally:
+            self._free_workers.release()
+
+    def _submit(self, post: Callable[[], Any]) -> Optional[Future]:
+        """Run post on a free worker, return None if they are all busy."""
+        if not self._free_workers.acquire(blocking=False):
+            return None
+        try:
+            return self._get_executor().submit(self._run_on_worker, post)
+        except BaseException:
+            self._free_workers.release()
+            raise
+
+    @staticmethod
+    def _get_winner(done: set, pending: set):
+        # A successful response wins, an error only once the other request failed too
+        for future in done:
+            if future.exception() is None:
+                return future
+        return None if pending else next(iter(done))
+
+    def post(self, post: Callable[[], Any], organization_id=None) -> Any:
+        if not settings.ENABLE_WCA_CODEGEN_HEDGING:
+            return post()
+
+        self.budget.deposit(organization_id)
+        primary = self._submit(post)
+        if primary is None:
+            logger.debug("No free hedging worker, the WCA codegen request isn't hedged")
+            return self._run(post)
+
+        done, _ = wait([primary], timeout=self.get_delay())
+        if done or not self.budget.try_withdraw(organization_id):
+            return primary.result()
+
+        hedge = self._submit(post)
+        if hedge is None:
+            logger.debug("No free hedging worker, the WCA codegen request isn't hedged")
+            self.budget.deposit(organization_id, 1)
+            return primary.result()
+
+        hedged_requests_fired_counter.inc()
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # The slower request can't be interrupted and runs to completion.
+            future = self._get_winner(done, pending)
+            if future is not None:
+                if future is hedge:
+                    hedged_requests_won_counter.inc()
+                return future.result()
+
+    async def _async_run(self, post: Callable[[], Awaitable[Any]]) -> Any:
+        start = time.monotonic()
+        try:
+            result = await post()
+        except asyncio.CancelledError:
+            # The slower request of a hedge, its latency is unknown
+            raise
+        except Exception:
+            self.latencies.observe(time.monotonic() - start)
+            raise
+        self.latencies.observe(time.monotonic() - start)
+        return result
+
+    async def async_post(self, post: Callable[[], Awaitable[Any]], organization_id=None) -> Any:
+        if not settings.ENABLE_WCA_CODEGEN_HEDGING:
+            return await post()
+
+        self.budget.deposit(organization_id)
+        primary = asyncio.ensure_future(self._async_run(post))
+        done, _ = await asyncio.wait({primary}, timeout=self.get_delay())
+        if done or not self.budget.try_withdraw(organization_id):
+            return await primary
+
+        hedged_requests_fired_counter.inc()
+        hedge = asyncio.ensure_future(self._async_run(post))
+        pending = {primary, hedge}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                task = self._get_winner(done, pending)
+                if task is not None:
+                    if task is hedge:
+                        hedged_requests_won_counter.inc()
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+codegen_hedger = Hedger()
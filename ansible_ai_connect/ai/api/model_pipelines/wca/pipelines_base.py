@@ -16,11 +16,23 @@ import json
 import logging
 import sys
 from abc import ABCMeta, abstractmethod
-from typing import TYPE_CHECKING, Any, Generic, Mapping, Optional, TypeVar, cast
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generic,
+    Mapping,
+    Optional,
+    TypeVar,
+    cast,
+)
 
 import backoff
 import requests
-from ansible_anonymizer import anonymizer
+from asgiref.sync import sync_to_async
+from attrs import define, field
+from backoff.types import Details
 from django.apps import apps
 from django.conf import settings
 from django_prometheus.conf import NAMESPACE
@@ -36,6 +48,7 @@ from ansible_ai_connect.ai.api.formatter import (
 )
 from ansible_ai_connect.ai.api.model_pipelines.exceptions import (
     ModelTimeoutError,
+    WcaCircuitOpen,
     WcaCodeMatchFailure,
     WcaInferenceFailure,
     WcaRequestIdCorrelationFailure,
@@ -64,14 +77,19 @@ from ansible_ai_connect.ai.api.model_pipelines.pipelines import (
     RoleGenerationParameters,
     RoleGenerationResponse,
 )
+from ansible_ai_connect.ai.api.model_pipelines.wca import async_client
+from ansible_ai_connect.ai.api.model_pipelines.wca.circuit_breaker import CircuitBreaker
 from ansible_ai_connect.ai.api.model_pipelines.wca.configuration_base import (
     WCABaseConfiguration,
 )
+from ansible_ai_connect.ai.api.model_pipelines.wca.hedging import codegen_hedger
 from ansible_ai_connect.ai.api.model_pipelines.wca.wca_utils import (
     ContentMatchResponseChecks,
     Context,
     InferenceResponseChecks,
 )
+from ansible_ai_connect.ai.api.utils.anonymization import get_request_anonymizer
+from ansible_ai_connect.main.retry_budget import RetryBudget
 from ansible_ai_connect.main.ssl_manager import (
     AllowBrokenSSLContextHTTPAdapter,
     ssl_manager,
@@ -88,6 +106,9 @@ WCA_REQUEST_ID_HEADER = "X-Request-ID"
 
 WCA_REQUEST_USER_UUID_HEADER = "X-Request-LightspeedUser"
 
+# The generated role files linted by ansible-lint
+LINTED_ROLE_FILE_TYPES = ("task", "handler", "default")
+
 # from django_prometheus.middleware.DEFAULT_LATENCY_BUCKETS
 DEFAULT_LATENCY_BUCKETS = (
     0.01,
@@ -155,6 +176,21 @@ ibm_cloud_identity_token_hist = Histogram(
     namespace=NAMESPACE,
     buckets=DEFAULT_LATENCY_BUCKETS,
 )
+ibm_cloud_identity_token_cache_hit_counter = Counter(
+    "wca_ibm_identity_token_cache_hits",
+    "Counter of IBM Cloud identity tokens served from the token cache",
+    namespace=NAMESPACE,
+)
+ibm_cloud_identity_token_cache_miss_counter = Counter(
+    "wca_ibm_identity_token_cache_misses",
+    "Counter of IBM Cloud identity token cache misses",
+    namespace=NAMESPACE,
+)
+ibm_cloud_identity_token_cache_refresh_counter = Counter(
+    "wca_ibm_identity_token_cache_refreshes",
+    "Counter of IBM Cloud identity tokens refreshed before or after their expiry",
+    namespace=NAMESPACE,
+)
 wca_codegen_retry_counter = Counter(
     "wca_codegen_retries",
     "Counter of WCA codegen API invocation retries",
@@ -191,6 +227,17 @@ ibm_cloud_identity_token_retry_counter = Counter(
     namespace=NAMESPACE,
 )
 
+wca_retry_budget = RetryBudget("wca")
+ibm_cloud_identity_token_retry_budget = RetryBudget("ibm_cloud_identity_token")
+
+wca_codegen_circuit_breaker = CircuitBreaker("codegen")
+wca_codematch_circuit_breaker = CircuitBreaker("codematch")
+wca_codegen_playbook_circuit_breaker = CircuitBreaker("codegen_playbook")
+wca_codegen_role_circuit_breaker = CircuitBreaker("codegen_role")
+wca_explain_playbook_circuit_breaker = CircuitBreaker("explain_playbook")
+wca_explain_role_circuit_breaker = CircuitBreaker("explain_role")
+ibm_cloud_identity_token_circuit_breaker = CircuitBreaker("ibm_cloud_identity_token")
+
 
 class WcaTokenRequestException(ServiceUnavailable):
     """There was an error trying to get a WCA token."""
@@ -200,6 +247,24 @@ class WcaModelRequestException(ServiceUnavailable):
     """There was an error trying to invoke a WCA Model."""
 
 
+@define
+class WCARequest:
+    """A WCA API request, shared by the sync and async invocation paths."""
+
+    url: str
+    headers: dict[str, Optional[str]]
+    data: dict[str, Any]
+    model_id: str
+    hist: Histogram
+    circuit_breaker: CircuitBreaker
+    on_backoff: Callable[[Details], None]
+    # Expected value of the X-Request-ID response header
+    request_id: Optional[str] = None
+    is_multi_task_prompt: bool = False
+    # Additional keyword arguments of requests.Session.post(), e.g. timeout
+    options: dict[str, Any] = field(factory=dict)
+
+
 class WCABaseMetaData(
     MetaData[WCA_PIPELINE_CONFIGURATION], Generic[WCA_PIPELINE_CONFIGURATION], metaclass=ABCMeta
 ):
@@ -233,7 +298,10 @@ class WCABaseMetaData(
     @staticmethod
     def fatal_exception(exc) -> bool:
         """Determine if an exception is fatal or not"""
-        if isinstance(exc, requests.RequestException):
+        if isinstance(exc, WcaCircuitOpen):
+            # don't wait for the circuit to close
+            return True
+        elif isinstance(exc, requests.RequestException):
             status_code = getattr(getattr(exc, "response", None), "status_code", None)
             # retry on server errors and client errors
             # with 429 status code (rate limited),
@@ -335,6 +403,93 @@ class WCABasePipeline(
         WCABasePipeline.log_backoff_exception(details)
         wca_explain_role_retry_counter.inc()
 
+    def invoke(self, params: PIPELINE_PARAMETERS) -> PIPELINE_RETURN:
+        wca_request = self.prepare_request(params)
+        return self.process_response(wca_request, self.post(wca_request))
+
+    async def async_invoke(self, params: PIPELINE_PARAMETERS) -> PIPELINE_RETURN:
+        # Only the WCA call itself runs on the event loop, the preparation and
+        # processing steps may access the database or run ansible-lint.
+        wca_request = await sync_to_async(self.prepare_request)(params)
+        result = await self.async_post(wca_request)
+        return await sync_to_async(self.process_response)(wca_request, result)
+
+    def prepare_request(self, params: PIPELINE_PARAMETERS) -> WCARequest:
+        raise NotImplementedError
+
+    def process_response(self, wca_request: WCARequest, result: requests.Response) -> Any:
+        raise NotImplementedError
+
+    def post(self, wca_request: WCARequest) -> requests.Response:
+        retries = wca_retry_budget.retries(self.fatal_exception, self.retries + 1)
+
+        @backoff.on_exception(
+            backoff.expo,
+            Exception,
+            max_tries=self.retries + 1,
+            jitter=backoff.full_jitter,
+            giveup=retries.giveup,
+            on_backoff=[retries.on_backoff, wca_request.on_backoff],
+            on_giveup=retries.on_giveup,
+            on_success=retries.on_success,
+        )
+        def post_request():
+            with wca_request.circuit_breaker.guard() as outcome, wca_request.hist.time():
+                response = self.session.post(
+                    wca_request.url,
+                    headers=cast(Mapping[str, str], wca_request.headers),
+                    json=wca_request.data,
+                    **wca_request.options,
+                )
+                outcome.status_code = response.status_code
+                return response
+
+        return post_request()
+
+    async def async_post(self, wca_request: WCARequest) -> requests.Response:
+        retries = wca_retry_budget.retries(self.fatal_exception, self.retries + 1)
+
+        @backoff.on_exception(
+            backoff.expo,
+            Exception,
+            max_tries=self.retries + 1,
+            jitter=backoff.full_jitter,
+            giveup=retries.giveup,
+            on_backoff=[retries.on_backoff, wca_request.on_backoff],
+            on_giveup=retries.on_giveup,
+            on_success=retries.on_success,
+        )
+        async def post_request():
+            with wca_request.circuit_breaker.guard() as outcome, wca_request.hist.time():
+                response = await async_client.post(
+                    wca_request.url,
+                    wca_request.headers,
+                    wca_request.data,
+                    timeout=wca_request.options.get("timeout"),
+                    verify_ssl=self.config.verify_ssl,
+                )
+                outcome.status_code = response.status_code
+                return response
+
+        return await post_request()
+
+    @staticmethod
+    def check_request_id(wca_request: WCARequest, result: requests.Response):
+        x_request_id = result.headers.get(WCA_REQUEST_ID_HEADER)
+        if wca_request.request_id and x_request_id:
+            # request/payload suggestion_id is a UUID not a string whereas
+            # HTTP headers are strings.
+            if x_request_id != str(wca_request.request_id):
+                raise WcaRequestIdCorrelationFailure(
+                    model_id=wca_request.model_id, x_request_id=x_request_id
+                )
+
+    def check_inference_response(self, wca_request: WCARequest, result: requests.Response):
+        self.check_request_id(wca_request, result)
+        context = Context(wca_request.model_id, result, wca_request.is_multi_task_prompt)
+        InferenceResponseChecks().run_checks(context)
+        result.raise_for_status()
+
     @abstractmethod
     def get_request_headers(
         self, api_key: str, identifier: Optional[str], lightspeed_user_uuid: Optional[str] = None
@@ -352,7 +507,7 @@ class WCABaseCompletionsPipeline(
     def __init__(self, config: WCA_PIPELINE_CONFIGURATION):
         super().__init__(config=config)
 
-    def invoke(self, params: CompletionsParameters) -> CompletionsResponse:
+    def get_inference_parameters(self, params: CompletionsParameters) -> tuple:
         request = params.request
         model_id = params.model_id
         model_input = params.model_input
@@ -368,28 +523,64 @@ class WCABaseCompletionsPipeline(
 
         prompt = unify_prompt_ending(prompt)
 
-        try:
-            api_key = self.get_api_key(request.user)
-            model_id = self.get_model_id(request.user, model_id)
+        api_key = self.get_api_key(request.user)
+        model_id = self.get_model_id(request.user, model_id)
+
+        headers = self._prepare_request_headers(request.user, api_key, suggestion_id)
+
+        if self.should_anonymize(request):
+            logger.debug("Anonymizing prompt and context")
+            request_anonymizer = get_request_anonymizer(request)
+            context = request_anonymizer.anonymize_struct(context, "wca_codegen")
+            prompt = "#".join(request_anonymizer.anonymize_struct(prompt.split("#"), "wca_codegen"))
 
-            headers = self._prepare_request_headers(request.user, api_key, suggestion_id)
+        organization_id = request.user.organization and request.user.organization.id
 
-            if self.should_anonymize(request):
-                logger.debug("Anonymizing prompt and context")
-                context = anonymizer.anonymize_struct(context)
-                prompt = "#".join(anonymizer.anonymize_struct(prompt.split("#")))
+        return model_id, context, prompt, suggestion_id, headers, organization_id
 
-            result = self.infer_from_parameters(model_id, context, prompt, suggestion_id, headers)
+    @staticmethod
+    def get_inference_response(model_id, result: requests.Response) -> CompletionsResponse:
+        response = result.json()
+        response["model_id"] = model_id
+        logger.debug(f"Inference API response: {response}")
+        return response
 
-            response = result.json()
-            response["model_id"] = model_id
-            logger.debug(f"Inference API response: {response}")
-            return response
+    def invoke(self, params: CompletionsParameters) -> CompletionsResponse:
+        model_id = params.model_id
+        try:
+            model_id, context, prompt, suggestion_id, headers, organization_id = (
+                self.get_inference_parameters(params)
+            )
+            result = self.infer_from_parameters(
+                model_id, context, prompt, suggestion_id, headers, organization_id
+            )
+            return self.get_inference_response(model_id, result)
 
         except requests.exceptions.Timeout:
             raise ModelTimeoutError(model_id=model_id)
 
-    def infer_from_parameters(self, model_id, context, prompt, suggestion_id=None, headers=None):
+    async def async_invoke(self, params: CompletionsParameters) -> CompletionsResponse:
+        model_id = params.model_id
+        try:
+            model_id, context, prompt, suggestion_id, headers, organization_id = (
+                await sync_to_async(self.get_inference_parameters)(params)
+            )
+            result = await self.async_infer_from_parameters(
+                model_id, context, prompt, suggestion_id, headers, organization_id
+            )
+            return self.get_inference_response(model_id, result)
+
+        except requests.exceptions.Timeout:
+            raise ModelTimeoutError(model_id=model_id)
+
+    def get_inference_request(
+        self,
+        model_id,
+        context,
+        prompt,
+        suggestion_id=None,
+        headers: Optional[dict[str, Optional[str]]] = None,
+    ) -> WCARequest:
         data = {
             "model_id": model_id,
             "prompt": f"{context}{prompt}",
@@ -397,39 +588,43 @@ class WCABaseCompletionsPipeline(
         logger.debug(f"Inference API request payload: {json.dumps(data)}")
 
         task_count = len(get_task_names_from_prompt(prompt))
-        prediction_url = f"{self.config.inference_url}/v1/wca/codegen/ansible"
-
-        @backoff.on_exception(
-            backoff.expo,
-            Exception,
-            max_tries=self.retries + 1,
-            giveup=self.fatal_exception,
+        return WCARequest(
+            url=f"{self.config.inference_url}/v1/wca/codegen/ansible",
+            headers=headers or {},
+            data=data,
+            model_id=model_id,
+            hist=wca_codegen_hist,
+            circuit_breaker=wca_codegen_circuit_breaker,
             on_backoff=self.on_backoff_inference,
+            request_id=suggestion_id,
+            is_multi_task_prompt=task_count > 1,
+            options={"timeout": self.task_gen_timeout(task_count)},
         )
-        @wca_codegen_hist.time()
-        def post_request():
-            return self.session.post(
-                prediction_url,
-                headers=cast(Mapping[str, str], headers),
-                json=data,
-                timeout=self.task_gen_timeout(task_count),
-            )
 
+    def infer_from_parameters(
+        self, model_id, context, prompt, suggestion_id=None, headers=None, organization_id=None
+    ):
+        wca_request = self.get_inference_request(model_id, context, prompt, suggestion_id, headers)
         try:
-            response = post_request()
+            # A hedged request reuses the same X-Request-ID, the winning response is checked
+            response = codegen_hedger.post(partial(self.post, wca_request), organization_id)
+            self.check_inference_response(wca_request, response)
 
-            x_request_id = response.headers.get(WCA_REQUEST_ID_HEADER)
-            if suggestion_id and x_request_id:
-                # request/payload suggestion_id is a UUID not a string whereas
-                # HTTP headers are strings.
-                if x_request_id != str(suggestion_id):
-                    raise WcaRequestIdCorrelationFailure(
-                        model_id=model_id, x_request_id=x_request_id
-                    )
+        except HTTPError as e:
+            logger.error(f"WCA inference failed for suggestion {suggestion_id} due to {e}.")
+            raise WcaInferenceFailure(model_id=model_id)
+
+        return response
 
-            context = Context(model_id, response, task_count > 1)
-            InferenceResponseChecks().run_checks(context)
-            response.raise_for_status()
+    async def async_infer_from_parameters(
+        self, model_id, context, prompt, suggestion_id=None, headers=None, organization_id=None
+    ):
+        wca_request = self.get_inference_request(model_id, context, prompt, suggestion_id, headers)
+        try:
+            response = await codegen_hedger.async_post(
+                partial(self.async_post, wca_request), organization_id
+            )
+            self.check_inference_response(wca_request, response)
 
         except HTTPError as e:
             logger.error(f"WCA inference failed for suggestion {suggestion_id} due to {e}.")
@@ -453,6 +648,32 @@ class WCABaseContentMatchPipeline(
         raise NotImplementedError
 
     def invoke(self, params: ContentMatchParameters) -> ContentMatchResponse:
+        model_id = params.model_id
+        try:
+            wca_request = self.prepare_request(params)
+            model_id = wca_request.model_id
+            return self.process_response(wca_request, self.post(wca_request))
+
+        except HTTPError:
+            raise WcaCodeMatchFailure(model_id=model_id)
+
+        except requests.exceptions.ReadTimeout:
+            raise ModelTimeoutError(model_id=model_id)
+
+    async def async_invoke(self, params: ContentMatchParameters) -> ContentMatchResponse:
+        model_id = params.model_id
+        try:
+            wca_request = await sync_to_async(self.prepare_request)(params)
+            model_id = wca_request.model_id
+            return self.process_response(wca_request, await self.async_post(wca_request))
+
+        except HTTPError:
+            raise WcaCodeMatchFailure(model_id=model_id)
+
+        except requests.exceptions.ReadTimeout:
+            raise ModelTimeoutError(model_id=model_id)
+
+    def prepare_request(self, params: ContentMatchParameters) -> WCARequest:
         request = params.request
         model_input = params.model_input
         model_id = params.model_id
@@ -467,42 +688,33 @@ class WCABaseContentMatchPipeline(
             "input": suggestions,
         }
 
-        try:
-            api_key = self.get_api_key(request.user)
-            headers = self.get_codematch_headers(api_key)
-            suggestion_count = len(suggestions)
-
-            @backoff.on_exception(
-                backoff.expo,
-                Exception,
-                max_tries=self.retries + 1,
-                giveup=self.fatal_exception,
-                on_backoff=self.on_backoff_codematch,
-            )
-            @wca_codematch_hist.time()
-            def post_request() -> requests.Response:
-                return self.session.post(
-                    self._search_url,
-                    headers=headers,
-                    json=data,
-                    timeout=self.task_gen_timeout(suggestion_count),
-                )
-
-            result: requests.Response = post_request()
-            context = Context(model_id, result, suggestion_count > 1)
-            ContentMatchResponseChecks().run_checks(context)
-            result.raise_for_status()
-
-            response = result.json()
-            logger.debug(f"Codematch API response: {response}")
+        api_key = self.get_api_key(request.user)
+        headers = self.get_codematch_headers(api_key)
+        suggestion_count = len(suggestions)
+
+        return WCARequest(
+            url=self._search_url,
+            headers=cast(dict[str, Optional[str]], headers),
+            data=data,
+            model_id=model_id,
+            hist=wca_codematch_hist,
+            circuit_breaker=wca_codematch_circuit_breaker,
+            on_backoff=self.on_backoff_codematch,
+            is_multi_task_prompt=suggestion_count > 1,
+            options={"timeout": self.task_gen_timeout(suggestion_count)},
+        )
 
-            return model_id, response
+    def process_response(
+        self, wca_request: WCARequest, result: requests.Response
+    ) -> ContentMatchResponse:
+        context = Context(wca_request.model_id, result, wca_request.is_multi_task_prompt)
+        ContentMatchResponseChecks().run_checks(context)
+        result.raise_for_status()
 
-        except HTTPError:
-            raise WcaCodeMatchFailure(model_id=model_id)
+        response = result.json()
+        logger.debug(f"Codematch API response: {response}")
 
-        except requests.exceptions.ReadTimeout:
-            raise ModelTimeoutError(model_id=model_id)
+        return wca_request.model_id, response
 
 
 class WCABasePlaybookGenerationPipeline(
@@ -517,7 +729,7 @@ class WCABasePlaybookGenerationPipeline(
     def __init__(self, config: WCA_PIPELINE_CONFIGURATION):
         super().__init__(config=config)
 
-    def invoke(self, params: PlaybookGenerationParameters) -> PlaybookGenerationResponse:
+    def prepare_request(self, params: PlaybookGenerationParameters) -> WCARequest:
         request = params.request
         text = params.text
         custom_prompt = params.custom_prompt
@@ -547,37 +759,28 @@ class WCABasePlaybookGenerationPipeline(
         # Apply anonymization if enabled for the organization
         if self.should_anonymize(request):
             logger.debug("Anonymizing text and custom prompt")
-            data["text"] = anonymizer.anonymize_struct(data["text"])
+            request_anonymizer = get_request_anonymizer(request)
+            data["text"] = request_anonymizer.anonymize_struct(data["text"], "wca_playbook_gen")
             if custom_prompt:
-                data["custom_prompt"] = anonymizer.anonymize_struct(data["custom_prompt"])
+                data["custom_prompt"] = request_anonymizer.anonymize_struct(
+                    data["custom_prompt"], "wca_playbook_gen"
+                )
 
-        @backoff.on_exception(
-            backoff.expo,
-            Exception,
-            max_tries=self.retries + 1,
-            giveup=self.fatal_exception,
+        return WCARequest(
+            url=f"{self.config.inference_url}/v1/wca/codegen/ansible/playbook",
+            headers=headers,
+            data=data,
+            model_id=model_id,
+            hist=wca_codegen_playbook_hist,
+            circuit_breaker=wca_codegen_playbook_circuit_breaker,
             on_backoff=self.on_backoff_codegen_playbook,
+            request_id=generation_id,
         )
-        @wca_codegen_playbook_hist.time()
-        def post_request():
-            return self.session.post(
-                f"{self.config.inference_url}/v1/wca/codegen/ansible/playbook",
-                headers=cast(Mapping[str, str], headers),
-                json=data,
-            )
-
-        result = post_request()
-
-        x_request_id = result.headers.get(WCA_REQUEST_ID_HEADER)
-        if generation_id and x_request_id:
-            # request/payload suggestion_id is a UUID not a string whereas
-            # HTTP headers are strings.
-            if x_request_id != str(generation_id):
-                raise WcaRequestIdCorrelationFailure(model_id=model_id, x_request_id=x_request_id)
 
-        context = Context(model_id, result, False)
-        InferenceResponseChecks().run_checks(context)
-        result.raise_for_status()
+    def process_response(
+        self, wca_request: WCARequest, result: requests.Response
+    ) -> PlaybookGenerationResponse:
+        self.check_inference_response(wca_request, result)
 
         response = json.loads(result.text)
 
@@ -604,7 +807,7 @@ class WCABaseRoleGenerationPipeline(
     def __init__(self, config: WCA_PIPELINE_CONFIGURATION):
         super().__init__(config=config)
 
-    def invoke(self, params: RoleGenerationParameters) -> RoleGenerationResponse:
+    def prepare_request(self, params: RoleGenerationParameters) -> WCARequest:
         if not settings.ANSIBLE_AI_ENABLE_ROLE_GEN_ENDPOINT:
             raise FeatureNotAvailable
 
@@ -634,37 +837,26 @@ class WCABaseRoleGenerationPipeline(
         # Apply anonymization if enabled for the organization
         if self.should_anonymize(request):
             logger.debug("Anonymizing text and name")
-            data["text"] = anonymizer.anonymize_struct(data["text"])
+            request_anonymizer = get_request_anonymizer(request)
+            data["text"] = request_anonymizer.anonymize_struct(data["text"], "wca_role_gen")
             if name:
-                data["name"] = anonymizer.anonymize_struct(data["name"])
-
-        @backoff.on_exception(
-            backoff.expo,
-            Exception,
-            max_tries=self.retries + 1,
-            giveup=self.fatal_exception,
+                data["name"] = request_anonymizer.anonymize_struct(data["name"], "wca_role_gen")
+
+        return WCARequest(
+            url=f"{self.config.inference_url}/v1/wca/codegen/ansible/roles",
+            headers=headers,
+            data=data,
+            model_id=model_id,
+            hist=wca_codegen_role_hist,
+            circuit_breaker=wca_codegen_role_circuit_breaker,
             on_backoff=self.on_backoff_codegen_role,
+            request_id=generation_id,
         )
-        @wca_codegen_role_hist.time()
-        def post_request():
-            return self.session.post(
-                f"{self.config.inference_url}/v1/wca/codegen/ansible/roles",
-                headers=cast(Mapping[str, str], headers),
-                json=data,
-            )
-
-        result = post_request()
 
-        x_request_id = result.headers.get(WCA_REQUEST_ID_HEADER)
-        if generation_id and x_request_id:
-            # request/payload suggestion_id is a UUID not a string whereas
-            # HTTP headers are strings.
-            if x_request_id != str(generation_id):
-                raise WcaRequestIdCorrelationFailure(model_id=model_id, x_request_id=x_request_id)
-
-        context = Context(model_id, result, False)
-        InferenceResponseChecks().run_checks(context)
-        result.raise_for_status()
+    def process_response(
+        self, wca_request: WCARequest, result: requests.Response
+    ) -> RoleGenerationResponse:
+        self.check_inference_response(wca_request, result)
 
         response = json.loads(result.text)
 
@@ -677,10 +869,17 @@ class WCABaseRoleGenerationPipeline(
 
         ai_config = cast(AiConfig, apps.get_app_config("ai"))
         if ansible_lint_caller := ai_config.get_ansible_lint_caller():
+            # The files are linted together, in a single ansible-lint run
+            linted_files = ansible_lint_caller.run_linter_on_role(
+                {
+                    file["path"]: file["content"]
+                    for file in files
+                    if file["file_type"] in LINTED_ROLE_FILE_TYPES
+                }
+            )
             for file in files:
-                if file["file_type"] != "task":
-                    continue
-                file["content"] = ansible_lint_caller.run_linter(file["content"])
+                if file["path"] in linted_files:
+                    file["content"] = linted_files[file["path"]]
 
         return name, files, outline, warnings
 
@@ -697,7 +896,7 @@ class WCABasePlaybookExplanationPipeline(
     def __init__(self, config: WCA_PIPELINE_CONFIGURATION):
         super().__init__(config=config)
 
-    def invoke(self, params: PlaybookExplanationParameters) -> PlaybookExplanationResponse:
+    def prepare_request(self, params: PlaybookExplanationParameters) -> WCARequest:
         request = params.request
         content = params.content
         custom_prompt = params.custom_prompt
@@ -721,37 +920,30 @@ class WCABasePlaybookExplanationPipeline(
         # Apply anonymization if enabled for the organization
         if self.should_anonymize(request):
             logger.debug("Anonymizing playbook content and custom prompt")
-            data["playbook"] = anonymizer.anonymize_struct(data["playbook"])
+            request_anonymizer = get_request_anonymizer(request)
+            data["playbook"] = request_anonymizer.anonymize_struct(
+                data["playbook"], "wca_playbook_explanation"
+            )
             if custom_prompt:
-                data["custom_prompt"] = anonymizer.anonymize_struct(data["custom_prompt"])
+                data["custom_prompt"] = request_anonymizer.anonymize_struct(
+                    data["custom_prompt"], "wca_playbook_explanation"
+                )
 
-        @backoff.on_exception(
-            backoff.expo,
-            Exception,
-            max_tries=self.retries + 1,
-            giveup=self.fatal_exception,
+        return WCARequest(
+            url=f"{self.config.inference_url}/v1/wca/explain/ansible/playbook",
+            headers=headers,
+            data=data,
+            model_id=model_id,
+            hist=wca_explain_playbook_hist,
+            circuit_breaker=wca_explain_playbook_circuit_breaker,
             on_backoff=self.on_backoff_explain_playbook,
+            request_id=explanation_id,
         )
-        @wca_explain_playbook_hist.time()
-        def post_request():
-            return self.session.post(
-                f"{self.config.inference_url}/v1/wca/explain/ansible/playbook",
-                headers=cast(Mapping[str, str], headers),
-                json=cast(Any, data),
-            )
 
-        result = post_request()
-
-        x_request_id = result.headers.get(WCA_REQUEST_ID_HEADER)
-        if explanation_id and x_request_id:
-            # request/payload suggestion_id is a UUID not a string whereas
-            # HTTP headers are strings.
-            if x_request_id != str(explanation_id):
-                raise WcaRequestIdCorrelationFailure(model_id=model_id, x_request_id=x_request_id)
-
-        context = Context(model_id, result, False)
-        InferenceResponseChecks().run_checks(context)
-        result.raise_for_status()
+    def process_response(
+        self, wca_request: WCARequest, result: requests.Response
+    ) -> PlaybookExplanationResponse:
+        self.check_inference_response(wca_request, result)
 
         response = json.loads(result.text)
         return response["explanation"]
@@ -767,7 +959,7 @@ class WCABaseRoleExplanationPipeline(
     def __init__(self, config: WCA_PIPELINE_CONFIGURATION):
         super().__init__(config=config)
 
-    def invoke(self, params: RoleExplanationParameters) -> RoleExplanationResponse:
+    def prepare_request(self, params: RoleExplanationParameters) -> WCARequest:
         request = params.request
         files = params.files
         model_id = params.model_id
@@ -787,36 +979,29 @@ class WCABaseRoleExplanationPipeline(
         # Apply anonymization if enabled for the organization
         if self.should_anonymize(request):
             logger.debug("Anonymizing role name and files content")
-            data["role_name"] = anonymizer.anonymize_struct(data["role_name"])
-            data["files"] = anonymizer.anonymize_struct(data["files"])
+            request_anonymizer = get_request_anonymizer(request)
+            data["role_name"] = request_anonymizer.anonymize_struct(
+                data["role_name"], "wca_role_explanation"
+            )
+            data["files"] = request_anonymizer.anonymize_struct(
+                data["files"], "wca_role_explanation"
+            )
 
-        @backoff.on_exception(
-            backoff.expo,
-            Exception,
-            max_tries=self.retries + 1,
-            giveup=self.fatal_exception,
+        return WCARequest(
+            url=f"{self.config.inference_url}/v1/wca/codegen/ansible/roles/explain",
+            headers=headers,
+            data=data,
+            model_id=model_id,
+            hist=wca_explain_role_hist,
+            circuit_breaker=wca_explain_role_circuit_breaker,
             on_backoff=self.on_backoff_explain_role,
+            request_id=explanation_id,
         )
-        @wca_explain_role_hist.time()
-        def post_request():
-            return self.session.post(
-                f"{self.config.inference_url}/v1/wca/codegen/ansible/roles/explain",
-                headers=cast(Mapping[str, str], headers),
-                json=data,
-            )
-
-        result = post_request()
-
-        x_request_id = result.headers.get(WCA_REQUEST_ID_HEADER)
-        if explanation_id and x_request_id:
-            # request/payload suggestion_id is a UUID not a string whereas
-            # HTTP headers are strings.
-            if x_request_id != str(explanation_id):
-                raise WcaRequestIdCorrelationFailure(model_id=model_id, x_request_id=x_request_id)
 
-        context = Context(model_id, result, False)
-        InferenceResponseChecks().run_checks(context)
-        result.raise_for_status()
+    def process_response(
+        self, wca_request: WCARequest, result: requests.Response
+    ) -> RoleExplanationResponse:
+        self.check_inference_response(wca_request, result)
 
         response = json.loads(result.text)
         return response["explanation"]
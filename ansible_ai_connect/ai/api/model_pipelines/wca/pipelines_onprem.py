@@ -207,6 +207,14 @@ class WCAOnPremPlaybookGenerationPipeline(
         else:
             raise FeatureNotAvailable
 
+    async def async_invoke(
+        self, params: PlaybookGenerationParameters
+    ) -> PlaybookGenerationResponse:
+        if settings.ANSIBLE_AI_ENABLE_PLAYBOOK_ENDPOINT:
+            return await super().async_invoke(params)
+        else:
+            raise FeatureNotAvailable
+
     def self_test(self) -> HealthCheckSummary:
         return HealthCheckSummary(
             {
@@ -267,6 +275,14 @@ class WCAOnPremPlaybookExplanationPipeline(
         else:
             raise FeatureNotAvailable
 
+    async def async_invoke(
+        self, params: PlaybookExplanationParameters
+    ) -> PlaybookExplanationResponse:
+        if settings.ANSIBLE_AI_ENABLE_PLAYBOOK_ENDPOINT:
+            return await super().async_invoke(params)
+        else:
+            raise FeatureNotAvailable
+
     def self_test(self) -> HealthCheckSummary:
         return HealthCheckSummary(
             {
@@ -17,12 +17,13 @@ from abc import ABCMeta
 from typing import TYPE_CHECKING, Generic, Optional
 
 import backoff
-from django.apps import apps
+import requests
 from django.conf import settings
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import HTTPError
 
 from ansible_ai_connect.ai.api.aws.wca_secret_manager import (
+    OrgCredentials,
     Suffixes,
     WcaSecretManagerError,
 )
@@ -67,8 +68,15 @@ from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_base import (
     WCABaseRoleExplanationPipeline,
     WCABaseRoleGenerationPipeline,
     WcaModelRequestException,
+    WCARequest,
     WcaTokenRequestException,
+    ibm_cloud_identity_token_circuit_breaker,
     ibm_cloud_identity_token_hist,
+    ibm_cloud_identity_token_retry_budget,
+)
+from ansible_ai_connect.ai.api.model_pipelines.wca.token_cache import (
+    TokenCache,
+    token_cache,
 )
 from ansible_ai_connect.ai.api.model_pipelines.wca.wca_utils import (
     TokenContext,
@@ -97,33 +105,48 @@ class WCASaaSMetaData(WCABaseMetaData[WCASaaSConfiguration]):
         super().__init__(config=config)
 
     def get_token(self, api_key):
+        # Store token and only fetch a new one when it is about to expire
+        # https://cloud.ibm.com/docs/account?topic=account-iamtoken_from_apikey
+        key = TokenCache.get_key(self.config.idp_url, self.config.idp_login, api_key)
+        return token_cache.get(key, lambda: self._fetch_token(api_key))
+
+    def _fetch_token(self, api_key):
         basic = None
         if self.config.idp_login:
             basic = HTTPBasicAuth(self.config.idp_login, self.config.idp_password)
-        # Store token and only fetch a new one if it has expired
-        # https://cloud.ibm.com/docs/account?topic=account-iamtoken_from_apikey
         logger.debug("Fetching WCA token")
         headers = {
             "Content-Type": "application/x-www-form-urlencoded",
             "Accept": "application/json",
         }
         data = {"grant_type": "urn:ibm:params:oauth:grant-type:apikey", "apikey": api_key}
+        retries = ibm_cloud_identity_token_retry_budget.retries(
+            self.fatal_exception, self.retries + 1
+        )
 
         @backoff.on_exception(
             backoff.expo,
             Exception,
             max_tries=self.retries + 1,
-            giveup=self.fatal_exception,
-            on_backoff=self.on_backoff_ibm_cloud_identity_token,
+            jitter=backoff.full_jitter,
+            giveup=retries.giveup,
+            on_backoff=[retries.on_backoff, self.on_backoff_ibm_cloud_identity_token],
+            on_giveup=retries.on_giveup,
+            on_success=retries.on_success,
         )
-        @ibm_cloud_identity_token_hist.time()
         def post_request():
-            return self.session.post(
-                f"{self.config.idp_url}/token",
-                headers=headers,
-                data=data,
-                auth=basic,
-            )
+            with (
+                ibm_cloud_identity_token_circuit_breaker.guard() as outcome,
+                ibm_cloud_identity_token_hist.time(),
+            ):
+                response = self.session.post(
+                    f"{self.config.idp_url}/token",
+                    headers=headers,
+                    data=data,
+                    auth=basic,
+                )
+                outcome.status_code = response.status_code
+                return response
 
         try:
             response = post_request()
@@ -137,6 +160,12 @@ class WCASaaSMetaData(WCABaseMetaData[WCASaaSConfiguration]):
 
         return response.json()
 
+    @staticmethod
+    def get_org_credentials(user) -> OrgCredentials:
+        # The snapshot is fetched once and memoized on the user's organization
+        # so that the API Key and Model ID are resolved with a single request.
+        return user.organization.wca_credentials
+
     def get_api_key(self, user) -> str:
         organization_id = user.organization and user.organization.id
         # use the environment API key override if it's set
@@ -149,7 +178,6 @@ class WCASaaSMetaData(WCABaseMetaData[WCASaaSConfiguration]):
             )
             raise WcaKeyNotFound
 
-        secret_manager = apps.get_app_config("ai").get_wca_secret_manager()  # type: ignore
         if (
             settings.ANSIBLE_AI_ENABLE_ONE_CLICK_TRIAL
             and any(up.is_active for up in user.userplan_set.all())
@@ -159,7 +187,7 @@ class WCASaaSMetaData(WCABaseMetaData[WCASaaSConfiguration]):
             return self.config.one_click_default_api_key
 
         try:
-            api_key = secret_manager.get_secret(organization_id, Suffixes.API_KEY)
+            api_key = self.get_org_credentials(user).get(Suffixes.API_KEY)
             if api_key is not None:
                 return api_key["SecretString"]
 
@@ -180,7 +208,6 @@ class WCASaaSMetaData(WCABaseMetaData[WCASaaSConfiguration]):
         organization_id = (
             hasattr(user, "organization") and user.organization and user.organization.id
         )
-        secret_manager = apps.get_app_config("ai").get_wca_secret_manager()  # type: ignore
         if (
             settings.ANSIBLE_AI_ENABLE_ONE_CLICK_TRIAL
             and any(
@@ -188,7 +215,7 @@ class WCASaaSMetaData(WCABaseMetaData[WCASaaSConfiguration]):
                 for up in user.userplan_set.all()  # noqa: E501 # pyright: ignore[reportAttributeAccessIssue]
             )
             and user.organization
-            and not secret_manager.secret_exists(organization_id, Suffixes.API_KEY)
+            and self.get_org_credentials(user).get(Suffixes.API_KEY) is None
         ):
             return self.config.one_click_default_model_id
 
@@ -205,7 +232,7 @@ class WCASaaSMetaData(WCABaseMetaData[WCASaaSConfiguration]):
             raise WcaNoDefaultModelId
 
         try:
-            model_id = secret_manager.get_secret(organization_id, Suffixes.MODEL_ID)
+            model_id = self.get_org_credentials(user).get(Suffixes.MODEL_ID)
             if model_id is not None:
                 return model_id["SecretString"]
 
@@ -238,6 +265,24 @@ class WCASaaSPipeline(
             WCA_REQUEST_USER_UUID_HEADER: lightspeed_user_uuid if lightspeed_user_uuid else None,
         }
 
+    def post(self, wca_request: WCARequest) -> requests.Response:
+        response = super().post(wca_request)
+        self.invalidate_rejected_token(wca_request, response)
+        return response
+
+    async def async_post(self, wca_request: WCARequest) -> requests.Response:
+        response = await super().async_post(wca_request)
+        self.invalidate_rejected_token(wca_request, response)
+        return response
+
+    @staticmethod
+    def invalidate_rejected_token(wca_request: WCARequest, response: requests.Response):
+        # The IAM token may be revoked before it expires: the next request
+        # fetches a new one rather than reusing the cached one.
+        if response.status_code in (401, 403):
+            authorization = wca_request.headers.get("Authorization") or ""
+            token_cache.invalidate_access_token(authorization.removeprefix("Bearer "))
+
     def _get_base_headers(self, api_key: str) -> dict[str, str]:
         token = self.get_token(api_key)
         return {
@@ -332,6 +377,14 @@ class WCASaaSPlaybookGenerationPipeline(
         else:
             raise FeatureNotAvailable
 
+    async def async_invoke(
+        self, params: PlaybookGenerationParameters
+    ) -> PlaybookGenerationResponse:
+        if settings.ANSIBLE_AI_ENABLE_PLAYBOOK_ENDPOINT:
+            return await super().async_invoke(params)
+        else:
+            raise FeatureNotAvailable
+
     def self_test(self) -> HealthCheckSummary:
         return HealthCheckSummary(
             {
@@ -373,6 +426,11 @@ class WCASaaSRoleExplanationPipeline(
             raise FeatureNotAvailable
         return super().invoke(params)
 
+    async def async_invoke(self, params: RoleExplanationParameters) -> RoleExplanationResponse:
+        if not settings.ANSIBLE_AI_ENABLE_ROLE_GEN_ENDPOINT:
+            raise FeatureNotAvailable
+        return await super().async_invoke(params)
+
     def self_test(self) -> HealthCheckSummary:
         return HealthCheckSummary(
             {
@@ -397,6 +455,14 @@ class WCASaaSPlaybookExplanationPipeline(
         else:
             raise FeatureNotAvailable
 
+    async def async_invoke(
+        self, params: PlaybookExplanationParameters
+    ) -> PlaybookExplanationResponse:
+        if settings.ANSIBLE_AI_ENABLE_PLAYBOOK_ENDPOINT:
+            return await super().async_invoke(params)
+        else:
+            raise FeatureNotAvailable
+
     def self_test(self) -> HealthCheckSummary:
         return HealthCheckSummary(
             {
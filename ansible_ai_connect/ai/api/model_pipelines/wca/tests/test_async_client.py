@@ -0,0 +1,224 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock
+
+import requests
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from django.test import override_settings
+
+from ansible_ai_connect.ai.api.model_pipelines.exceptions import (
+    ModelTimeoutError,
+    WcaInferenceFailure,
+    WcaRequestIdCorrelationFailure,
+)
+from ansible_ai_connect.ai.api.model_pipelines.pipelines import (
+    CompletionsParameters,
+    PlaybookExplanationParameters,
+)
+from ansible_ai_connect.ai.api.model_pipelines.tests import mock_pipeline_config
+from ansible_ai_connect.ai.api.model_pipelines.wca import async_client
+from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_base import (
+    WCA_REQUEST_ID_HEADER,
+    wca_codegen_hist,
+    wca_codegen_retry_counter,
+)
+from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_saas import (
+    WCASaaSCompletionsPipeline,
+    WCASaaSPlaybookExplanationPipeline,
+)
+
+SUGGESTION_ID = "ae43f4e0-6ed1-4fc2-a4ff-e4b8d4b2a5a7"
+
+
+class WCAServerTestCase(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = []
+        self.responses = []
+        app = web.Application()
+        app.router.add_post("/{path:.*}", self.handle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+    async def asyncTearDown(self):
+        await async_client.close_client_sessions()
+        await self.server.close()
+
+    async def handle(self, request: web.Request):
+        self.requests.append((request.path, dict(request.headers), await request.json()))
+        status, body, delay = self.responses.pop(0)
+        if delay:
+            await asyncio.sleep(delay)
+        return web.json_response(
+            body, status=status, headers={WCA_REQUEST_ID_HEADER: SUGGESTION_ID}
+        )
+
+    @property
+    def url(self):
+        return str(self.server.make_url("")).rstrip("/")
+
+
+class TestAsyncClient(WCAServerTestCase):
+
+    async def test_post(self):
+        self.responses.append((200, {"predictions": ["a"]}, 0))
+
+        result = await async_client.post(
+            f"{self.url}/v1/test", {"Authorization": "Bearer a", "X-Empty": None}, {"a": 1}
+        )
+
+        self.assertIsInstance(result, requests.Response)
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(result.json(), {"predictions": ["a"]})
+        self.assertEqual(result.headers[WCA_REQUEST_ID_HEADER.lower()], SUGGESTION_ID)
+        path, headers, body = self.requests[0]
+        self.assertEqual(path, "/v1/test")
+        self.assertEqual(headers["Authorization"], "Bearer a")
+        self.assertNotIn("X-Empty", headers)
+        self.assertEqual(body, {"a": 1})
+
+    async def test_post_error_status(self):
+        self.responses.append((500, {"detail": "boom"}, 0))
+        result = await async_client.post(f"{self.url}/v1/test", {}, {})
+        with self.assertRaises(requests.exceptions.HTTPError):
+            result.raise_for_status()
+
+    async def test_post_timeout(self):
+        self.responses.append((200, {}, 1))
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            await async_client.post(f"{self.url}/v1/test", {}, {}, timeout=0.1)
+
+    async def test_session_is_shared_per_event_loop(self):
+        session = async_client.get_client_session()
+        self.assertIs(session, async_client.get_client_session())
+        self.assertIsNot(session, async_client.get_client_session(verify_ssl=False))
+
+        other_loop_session = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: asyncio.run(self._get_session_and_close())
+        )
+        self.assertIsNot(session, other_loop_session)
+
+    @staticmethod
+    async def _get_session_and_close():
+        session = async_client.get_client_session()
+        await async_client.close_client_sessions()
+        return session
+
+
+class TestWCAPipelinesAsyncInvoke(WCAServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        playbook_endpoint = override_settings(ANSIBLE_AI_ENABLE_PLAYBOOK_ENDPOINT=True)
+        playbook_endpoint.enable()
+        self.addCleanup(playbook_endpoint.disable)
+
+    def get_pipeline(self, pipeline_class, **kwargs):
+        pipeline = pipeline_class(
+            mock_pipeline_config("wca", inference_url=self.url, retry_count=1, **kwargs)
+        )
+        pipeline.get_api_key = Mock(return_value="org-api-key")
+        pipeline.get_model_id = Mock(return_value="org-model-id")
+        pipeline.get_token = Mock(return_value={"access_token": "abc"})
+        return pipeline
+
+    @staticmethod
+    def get_completions_parameters():
+        return CompletionsParameters.init(
+            request=Mock(user=Mock(organization=None)),
+            model_input={
+                "instances": [
+                    {
+                        "prompt": "- name: Install Apache\n",
+                        "context": "",
+                        "suggestionId": SUGGESTION_ID,
+                    }
+                ]
+            },
+            suggestion_id=SUGGESTION_ID,
+        )
+
+    async def test_completions(self):
+        self.responses.append((200, {"predictions": ["ansible.builtin.apt:\n"]}, 0))
+        pipeline = self.get_pipeline(WCASaaSCompletionsPipeline)
+        hist_count = wca_codegen_hist._sum.get()
+
+        response = await pipeline.async_invoke(self.get_completions_parameters())
+
+        self.assertEqual(
+            response, {"predictions": ["ansible.builtin.apt:\n"], "model_id": "org-model-id"}
+        )
+        path, headers, body = self.requests[0]
+        self.assertEqual(path, "/v1/wca/codegen/ansible")
+        self.assertEqual(headers["Authorization"], "Bearer abc")
+        self.assertEqual(body["model_id"], "org-model-id")
+        self.assertGreater(wca_codegen_hist._sum.get(), hist_count)
+
+    async def test_completions_retry(self):
+        self.responses.append((200, {}, 2))
+        self.responses.append((200, {"predictions": ["ansible.builtin.apt:\n"]}, 0))
+        pipeline = self.get_pipeline(WCASaaSCompletionsPipeline, timeout=1)
+        retries = wca_codegen_retry_counter._value.get()
+
+        response = await pipeline.async_invoke(self.get_completions_parameters())
+
+        self.assertEqual(response["predictions"], ["ansible.builtin.apt:\n"])
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(wca_codegen_retry_counter._value.get(), retries + 1)
+
+    async def test_completions_failure(self):
+        self.responses.append((500, {}, 0))
+        self.responses.append((500, {}, 0))
+        pipeline = self.get_pipeline(WCASaaSCompletionsPipeline)
+
+        with self.assertRaises(WcaInferenceFailure):
+            await pipeline.async_invoke(self.get_completions_parameters())
+
+    async def test_completions_timeout(self):
+        self.responses.append((200, {}, 2))
+        self.responses.append((200, {}, 2))
+        pipeline = self.get_pipeline(WCASaaSCompletionsPipeline, timeout=1)
+
+        with self.assertRaises(ModelTimeoutError):
+            await pipeline.async_invoke(self.get_completions_parameters())
+
+    async def test_completions_request_id_correlation(self):
+        self.responses.append((200, {"predictions": ["ansible.builtin.apt:\n"]}, 0))
+        pipeline = self.get_pipeline(WCASaaSCompletionsPipeline)
+        params = self.get_completions_parameters()
+        params.suggestion_id = "another-suggestion-id"
+
+        with self.assertRaises(WcaRequestIdCorrelationFailure):
+            await pipeline.async_invoke(params)
+
+    async def test_playbook_explanation(self):
+        self.responses.append((200, {"explanation": "An explanation"}, 0))
+        pipeline = self.get_pipeline(WCASaaSPlaybookExplanationPipeline)
+
+        explanation = await pipeline.async_invoke(
+            PlaybookExplanationParameters.init(
+                request=Mock(user=Mock(organization=None)),
+                content="- hosts: all\n",
+                explanation_id=SUGGESTION_ID,
+            )
+        )
+
+        self.assertEqual(explanation, "An explanation")
+        path, _, body = self.requests[0]
+        self.assertEqual(path, "/v1/wca/explain/ansible/playbook")
+        self.assertEqual(body["playbook"], "- hosts: all\n")
@@ -0,0 +1,239 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from unittest.mock import Mock, patch
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from ansible_ai_connect.ai.api.model_pipelines.exceptions import (
+    WcaCircuitOpen,
+    WcaInferenceFailure,
+)
+from ansible_ai_connect.ai.api.model_pipelines.pipelines import CompletionsParameters
+from ansible_ai_connect.ai.api.model_pipelines.tests import mock_pipeline_config
+from ansible_ai_connect.ai.api.model_pipelines.wca.circuit_breaker import (
+    CircuitBreaker,
+    CircuitState,
+    circuit_breaker_rejection_counter,
+    circuit_breaker_state_gauge,
+)
+from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_base import (
+    WCABaseMetaData,
+    wca_codegen_circuit_breaker,
+)
+from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_saas import (
+    WCASaaSCompletionsPipeline,
+)
+
+
+def get_response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{"predictions": ["ansible.builtin.apt:\\n"]}'
+    return response
+
+
+@override_settings(ENABLE_WCA_CIRCUIT_BREAKER=True)
+@override_settings(WCA_CIRCUIT_BREAKER_WINDOW_SIZE=4)
+@override_settings(WCA_CIRCUIT_BREAKER_MINIMUM_CALLS=4)
+@override_settings(WCA_CIRCUIT_BREAKER_FAILURE_RATE_THRESHOLD=0.5)
+@override_settings(WCA_CIRCUIT_BREAKER_SLOW_CALL_DURATION_SEC=5)
+@override_settings(WCA_CIRCUIT_BREAKER_SLOW_CALL_RATE_THRESHOLD=0.75)
+@override_settings(WCA_CIRCUIT_BREAKER_OPEN_DURATION_SEC=30)
+@override_settings(WCA_CIRCUIT_BREAKER_HALF_OPEN_CALLS=2)
+class TestCircuitBreaker(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        patcher = patch(
+            "ansible_ai_connect.ai.api.model_pipelines.wca.circuit_breaker.time.monotonic",
+            side_effect=lambda: self.now,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker("test")
+
+    def call(self, status_code=200, duration=0.1):
+        with self.breaker.guard() as outcome:
+            self.now += duration
+            outcome.status_code = status_code
+
+    def open_circuit(self):
+        for _ in range(4):
+            self.call(500)
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+
+    def test_stays_closed_below_minimum_calls(self):
+        for _ in range(3):
+            self.call(500)
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+
+    def test_stays_closed_below_failure_rate(self):
+        for status_code in [500, 200, 200, 200, 500, 200]:
+            self.call(status_code)
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+
+    def test_opens_on_failure_rate(self):
+        for status_code in [200, 500, 200, 500]:
+            self.call(status_code)
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+        self.assertEqual(
+            circuit_breaker_state_gauge.labels(endpoint="test")._value.get(), CircuitState.OPEN
+        )
+
+    def test_opens_on_exceptions(self):
+        for _ in range(4):
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                with self.breaker.guard():
+                    raise requests.exceptions.ReadTimeout()
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+
+    def test_client_errors_are_not_failures(self):
+        for _ in range(4):
+            self.call(429)
+        for _ in range(4):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                with self.breaker.guard():
+                    raise requests.exceptions.HTTPError(response=get_response(404))
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+
+    def test_opens_on_slow_call_rate(self):
+        for duration in [1, 6, 6, 6]:
+            self.call(200, duration)
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+
+    def test_open_circuit_rejects_calls(self):
+        self.open_circuit()
+        rejections = circuit_breaker_rejection_counter.labels(endpoint="test")._value.get()
+
+        with self.assertRaises(WcaCircuitOpen) as e:
+            self.call()
+
+        self.assertEqual(e.exception.endpoint, "test")
+        self.assertEqual(
+            circuit_breaker_rejection_counter.labels(endpoint="test")._value.get(), rejections + 1
+        )
+
+    def test_half_open_closes_after_successful_probes(self):
+        self.open_circuit()
+        self.now += 30
+        self.assertEqual(self.breaker.state, CircuitState.HALF_OPEN)
+
+        self.call()
+        self.assertEqual(self.breaker.state, CircuitState.HALF_OPEN)
+        self.call()
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+
+    def test_half_open_limits_probe_calls(self):
+        self.open_circuit()
+        self.now += 30
+
+        self.breaker.before_call()
+        self.breaker.before_call()
+        with self.assertRaises(WcaCircuitOpen):
+            self.breaker.before_call()
+
+    def test_half_open_releases_cancelled_probes(self):
+        self.open_circuit()
+        self.now += 30
+
+        for _ in range(3):
+            with self.assertRaises(KeyboardInterrupt):
+                with self.breaker.guard():
+                    raise KeyboardInterrupt()
+        self.assertEqual(self.breaker.state, CircuitState.HALF_OPEN)
+
+        self.call()
+        self.call()
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+
+    def test_release_ignores_probes_of_a_previous_period(self):
+        self.open_circuit()
+        self.now += 30
+        probe = self.breaker.before_call()
+        self.call(503)
+        self.now += 30
+        self.breaker.before_call()
+        self.breaker.before_call()
+
+        self.breaker.release(probe)
+
+        with self.assertRaises(WcaCircuitOpen):
+            self.breaker.before_call()
+
+    def test_half_open_reopens_on_failed_probe(self):
+        self.open_circuit()
+        self.now += 30
+
+        self.call(503)
+
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+        with self.assertRaises(WcaCircuitOpen):
+            self.call()
+
+    @override_settings(ENABLE_WCA_CIRCUIT_BREAKER=False)
+    def test_disabled(self):
+        for _ in range(10):
+            self.call(500)
+        self.assertEqual(self.breaker.state, CircuitState.CLOSED)
+
+
+@override_settings(ENABLE_WCA_CIRCUIT_BREAKER=True)
+@override_settings(WCA_CIRCUIT_BREAKER_WINDOW_SIZE=2)
+@override_settings(WCA_CIRCUIT_BREAKER_MINIMUM_CALLS=2)
+class TestWCAPipelineCircuitBreaker(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(wca_codegen_circuit_breaker.reset)
+        self.pipeline = WCASaaSCompletionsPipeline(mock_pipeline_config("wca", retry_count=3))
+        self.pipeline.get_api_key = Mock(return_value="org-api-key")
+        self.pipeline.get_model_id = Mock(return_value="org-model-id")
+        self.pipeline.get_token = Mock(return_value={"access_token": "abc"})
+        self.pipeline.session.post = Mock(return_value=get_response(500))
+
+    def invoke(self):
+        return self.pipeline.invoke(
+            CompletionsParameters.init(
+                request=Mock(),
+                model_input={"instances": [{"context": "", "prompt": "- name: Install Apache\n"}]},
+            )
+        )
+
+    def test_fatal_exception(self):
+        self.assertTrue(WCABaseMetaData.fatal_exception(WcaCircuitOpen(endpoint="codegen")))
+
+    @patch("backoff._sync.time.sleep")
+    def test_open_circuit_fails_fast(self, _):
+        # A 500 response isn't retried, each invocation makes a single call
+        for _ in range(2):
+            with self.assertRaises(WcaInferenceFailure):
+                self.invoke()
+        self.assertEqual(wca_codegen_circuit_breaker.state, CircuitState.OPEN)
+        self.pipeline.session.post.reset_mock()
+
+        with self.assertRaises(WcaCircuitOpen):
+            self.invoke()
+        self.pipeline.session.post.assert_not_called()
+
+    @patch("backoff._sync.time.sleep")
+    def test_retries_stop_once_the_circuit_opens(self, _):
+        self.pipeline.session.post = Mock(side_effect=requests.exceptions.ConnectionError())
+
+        with self.assertRaises(WcaCircuitOpen):
+            self.invoke()
+
+        self.assertEqual(self.pipeline.session.post.call_count, 2)
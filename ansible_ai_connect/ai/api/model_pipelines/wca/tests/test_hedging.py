@@ -0,0 +1,330 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from ansible_ai_connect.ai.api.model_pipelines.exceptions import (
+    WcaRequestIdCorrelationFailure,
+)
+from ansible_ai_connect.ai.api.model_pipelines.pipelines import CompletionsParameters
+from ansible_ai_connect.ai.api.model_pipelines.tests import mock_pipeline_config
+from ansible_ai_connect.ai.api.model_pipelines.wca.hedging import (
+    LATENCY_MIN_SAMPLES,
+    HedgeBudget,
+    Hedger,
+    LatencyTracker,
+    hedged_requests_fired_counter,
+    hedged_requests_won_counter,
+)
+from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_base import (
+    WCA_REQUEST_ID_HEADER,
+)
+from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_saas import (
+    WCASaaSCompletionsPipeline,
+)
+
+SUGGESTION_ID = "ae43f4e0-6ed1-4fc2-a4ff-e4b8d4b2a5a7"
+
+
+class StubWCAServer(ThreadingHTTPServer):
+    """WCA codegen stub, each request is answered after the next injected delay."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubWCARequestHandler)
+        self.delays = deque()
+        self.request_ids = []
+        self.response_request_id = None
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubWCARequestHandler(BaseHTTPRequestHandler):
+    server: StubWCAServer
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with self.server.lock:
+            request_id = self.headers[WCA_REQUEST_ID_HEADER]
+            self.server.request_ids.append(request_id)
+            index = len(self.server.request_ids)
+            delay = self.server.delays.popleft() if self.server.delays else 0
+        time.sleep(delay)
+        body = json.dumps({"predictions": [f"ansible.builtin.debug:\n  msg: {index}\n"]})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header(WCA_REQUEST_ID_HEADER, self.server.response_request_id or request_id)
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestLatencyTracker(SimpleTestCase):
+
+    def test_get_percentile(self):
+        tracker = LatencyTracker()
+        for i in range(1, LATENCY_MIN_SAMPLES):
+            tracker.observe(i / 100)
+        self.assertIsNone(tracker.get_percentile(95))
+
+        tracker.observe(1.0)
+        self.assertEqual(tracker.get_percentile(95), 0.95)
+        self.assertEqual(tracker.get_percentile(100), 1.0)
+
+
+@override_settings(WCA_CODEGEN_HEDGING_BUDGET_PERCENT=50)
+class TestHedgeBudget(SimpleTestCase):
+
+    def test_budget_is_per_organization(self):
+        budget = HedgeBudget()
+        budget.deposit(1)
+        self.assertFalse(budget.try_withdraw(1))
+        budget.deposit(1)
+        budget.deposit(2)
+        self.assertTrue(budget.try_withdraw(1))
+        self.assertFalse(budget.try_withdraw(1))
+        self.assertFalse(budget.try_withdraw(2))
+
+    @patch(
+        "ansible_ai_connect.ai.api.model_pipelines.wca.hedging.HEDGE_BUDGET_MAX_ORGANIZATIONS", 2
+    )
+    def test_least_recently_used_organizations_are_dropped(self):
+        budget = HedgeBudget()
+        for organization_id in [1, 2, 1, 3]:
+            budget.deposit(organization_id)
+            budget.deposit(organization_id)
+        self.assertTrue(budget.try_withdraw(1))
+        self.assertFalse(budget.try_withdraw(2))
+        self.assertTrue(budget.try_withdraw(3))
+
+
+@override_settings(ENABLE_WCA_CODEGEN_HEDGING=True)
+@override_settings(WCA_CODEGEN_HEDGING_DEFAULT_DELAY_SEC=0.2)
+@override_settings(WCA_CODEGEN_HEDGING_BUDGET_PERCENT=100)
+class TestHedgedCompletions(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.server = StubWCAServer()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        patcher = patch(
+            "ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_base.codegen_hedger",
+            Hedger(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.pipeline = WCASaaSCompletionsPipeline(
+            mock_pipeline_config("wca", inference_url=self.server.url, retry_count=0, timeout=5)
+        )
+        self.pipeline.get_api_key = Mock(return_value="org-api-key")
+        self.pipeline.get_model_id = Mock(return_value="org-model-id")
+        self.pipeline.get_token = Mock(return_value={"access_token": "abc"})
+
+    def invoke(self):
+        return self.pipeline.invoke(
+            CompletionsParameters.init(
+                request=Mock(user=Mock(organization=Mock(id=1))),
+                model_input={
+                    "instances": [
+                        {
+                            "prompt": "- name: Say hello\n",
+                            "context": "",
+                            "suggestionId": SUGGESTION_ID,
+                        }
+                    ]
+                },
+                suggestion_id=SUGGESTION_ID,
+            )
+        )
+
+    def test_hedge_wins(self):
+        self.server.delays.extend([2, 0])
+        fired = hedged_requests_fired_counter._value.get()
+        won = hedged_requests_won_counter._value.get()
+
+        start = time.monotonic()
+        response = self.invoke()
+
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(response["predictions"], ["ansible.builtin.debug:\n  msg: 2\n"])
+        self.assertEqual(self.server.request_ids, [SUGGESTION_ID, SUGGESTION_ID])
+        self.assertEqual(hedged_requests_fired_counter._value.get(), fired + 1)
+        self.assertEqual(hedged_requests_won_counter._value.get(), won + 1)
+
+    def test_original_request_wins(self):
+        self.server.delays.extend([0.4, 2])
+        won = hedged_requests_won_counter._value.get()
+
+        response = self.invoke()
+
+        self.assertEqual(response["predictions"], ["ansible.builtin.debug:\n  msg: 1\n"])
+        self.assertEqual(len(self.server.request_ids), 2)
+        self.assertEqual(hedged_requests_won_counter._value.get(), won)
+
+    def test_fast_response_is_not_hedged(self):
+        fired = hedged_requests_fired_counter._value.get()
+
+        self.invoke()
+
+        self.assertEqual(len(self.server.request_ids), 1)
+        self.assertEqual(hedged_requests_fired_counter._value.get(), fired)
+
+    @override_settings(WCA_CODEGEN_HEDGING_BUDGET_PERCENT=0)
+    def test_budget_exhausted(self):
+        self.server.delays.extend([0.4])
+
+        self.invoke()
+
+        self.assertEqual(len(self.server.request_ids), 1)
+
+    def test_request_id_correlation(self):
+        self.server.delays.extend([2, 0])
+        self.server.response_request_id = "another-request-id"
+
+        with self.assertRaises(WcaRequestIdCorrelationFailure):
+            self.invoke()
+        self.assertEqual(len(self.server.request_ids), 2)
+
+    @override_settings(ENABLE_WCA_CODEGEN_HEDGING=False)
+    def test_disabled(self):
+        self.server.delays.extend([0.4])
+
+        self.invoke()
+
+        self.assertEqual(len(self.server.request_ids), 1)
+
+
+class TestHedger(SimpleTestCase):
+
+    @override_settings(ENABLE_WCA_CODEGEN_HEDGING=True)
+    @override_settings(WCA_CODEGEN_HEDGING_DEFAULT_DELAY_SEC=0.1)
+    @override_settings(WCA_CODEGEN_HEDGING_BUDGET_PERCENT=100)
+    def test_error_falls_back_to_the_other_request(self):
+        calls = []
+
+        def post():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.3)
+                raise ConnectionError()
+            time.sleep(0.5)
+            return "hedge"
+
+        self.assertEqual(Hedger().post(post), "hedge")
+
+    @override_settings(ENABLE_WCA_CODEGEN_HEDGING=True)
+    @override_settings(WCA_CODEGEN_HEDGING_DEFAULT_DELAY_SEC=0.1)
+    @override_settings(WCA_CODEGEN_HEDGING_BUDGET_PERCENT=100)
+    @patch("ansible_ai_connect.ai.api.model_pipelines.wca.hedging.HEDGING_MAX_WORKERS", 1)
+    def test_busy_workers_are_not_waited_for(self):
+        hedger = Hedger()
+        release = threading.Event()
+        self.addCleanup(release.set)
+        busy = hedger._submit(release.wait)
+        fired = hedged_requests_fired_counter._value.get()
+        threads = []
+
+        def post():
+            threads.append(threading.current_thread())
+            time.sleep(0.2)
+            return "ok"
+
+        # Sent from the calling thread, without hedge
+        self.assertEqual(hedger.post(post), "ok")
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertEqual(hedged_requests_fired_counter._value.get(), fired)
+
+        release.set()
+        busy.result()
+        threads.clear()
+        # The only worker sends the request, no hedge is sent and its budget is refunded
+        self.assertEqual(hedger.post(post, organization_id=1), "ok")
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertEqual(hedged_requests_fired_counter._value.get(), fired)
+        self.assertTrue(hedger.budget.try_withdraw(1))
+
+    def test_delay_uses_observed_latencies(self):
+        hedger = Hedger()
+        self.assertEqual(hedger.get_delay(), 3.0)
+        for _ in range(LATENCY_MIN_SAMPLES):
+            hedger.latencies.observe(0.5)
+        self.assertEqual(hedger.get_delay(), 0.5)
+
+
+class TestAsyncHedger(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        super().setUp()
+        hedging_settings = override_settings(
+            ENABLE_WCA_CODEGEN_HEDGING=True,
+            WCA_CODEGEN_HEDGING_DEFAULT_DELAY_SEC=0.1,
+            WCA_CODEGEN_HEDGING_BUDGET_PERCENT=100,
+        )
+        hedging_settings.enable()
+        self.addCleanup(hedging_settings.disable)
+
+    async def test_hedge_wins_and_original_is_cancelled(self):
+        delays = deque([5, 0])
+        cancelled = []
+
+        async def post():
+            try:
+                await asyncio.sleep(delays.popleft())
+                return len(delays)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        won = hedged_requests_won_counter._value.get()
+
+        self.assertEqual(await Hedger().async_post(post, organization_id=1), 0)
+        await asyncio.sleep(0)
+        self.assertEqual(cancelled, [True])
+        self.assertEqual(hedged_requests_won_counter._value.get(), won + 1)
+
+    async def test_fast_response_is_not_hedged(self):
+        post = Mock(side_effect=lambda: asyncio.sleep(0, result="ok"))
+
+        self.assertEqual(await Hedger().async_post(post, organization_id=1), "ok")
+        post.assert_called_once()
+
+    async def test_latency_of_cancelled_request_is_not_observed(self):
+        delays = deque([5, 0])
+
+        async def post():
+            await asyncio.sleep(delays.popleft())
+
+        hedger = Hedger()
+        await hedger.async_post(post, organization_id=1)
+        await asyncio.sleep(0)
+        self.assertEqual(len(hedger.latencies._latencies), 1)
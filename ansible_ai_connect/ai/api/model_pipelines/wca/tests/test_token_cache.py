@@ -0,0 +1,99 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+from django.test import SimpleTestCase
+
+from ansible_ai_connect.ai.api.model_pipelines.wca.token_cache import (
+    TokenCache,
+    get_token_expiry,
+)
+
+
+class TestTokenCache(SimpleTestCase):
+
+    def test_get_key_does_not_contain_api_key(self):
+        key = TokenCache.get_key("https://iam", None, "my-secret-api-key")
+        self.assertNotIn("my-secret-api-key", key)
+        self.assertEqual(key, TokenCache.get_key("https://iam", None, "my-secret-api-key"))
+        self.assertNotEqual(key, TokenCache.get_key("https://iam", None, "another-api-key"))
+
+    def test_get_token_expiry(self):
+        self.assertEqual(get_token_expiry({"expiration": 100, "expires_in": 10}, 0), 100)
+        self.assertEqual(get_token_expiry({"expires_in": 10}, 5), 15)
+        self.assertIsNone(get_token_expiry({"access_token": "a"}, 0))
+        self.assertIsNone(get_token_expiry(Mock(), 0))
+
+    def test_token_without_expiry_is_not_cached(self):
+        cache = TokenCache()
+        fetch = Mock(return_value={"access_token": "a"})
+        cache.get("key", fetch)
+        cache.get("key", fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_fetch_failure_is_not_cached(self):
+        cache = TokenCache()
+        fetch = Mock(side_effect=[Exception("boom"), {"access_token": "a", "expires_in": 3600}])
+        with self.assertRaises(Exception):
+            cache.get("key", fetch)
+        self.assertEqual(cache.get("key", fetch)["access_token"], "a")
+        self.assertEqual(cache.get("key", fetch)["access_token"], "a")
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_invalidate(self):
+        cache = TokenCache()
+        fetch = Mock(return_value={"access_token": "a", "expires_in": 3600})
+        cache.get("key", fetch)
+        cache.invalidate("key")
+        cache.get("key", fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_invalidate_access_token(self):
+        cache = TokenCache()
+        cache.get("key", Mock(return_value={"access_token": "a", "expires_in": 3600}))
+        cache.get("other", Mock(return_value={"access_token": "b", "expires_in": 3600}))
+        cache.invalidate_access_token("a")
+        fetch = Mock(return_value={"access_token": "c", "expires_in": 3600})
+        self.assertEqual(cache.get("key", fetch)["access_token"], "c")
+        self.assertEqual(cache.get("other", fetch)["access_token"], "b")
+        fetch.assert_called_once()
+
+    def test_concurrent_refresh_is_single_flight(self):
+        cache = TokenCache()
+        started = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return {"access_token": "a", "expires_in": 3600}
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(cache.get, "key", fetch) for _ in range(8)]
+            results = [f.result() for f in futures]
+
+        self.assertTrue(started.is_set())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r["access_token"] == "a" for r in results))
+
+    def test_locks_are_released(self):
+        cache = TokenCache()
+        for i in range(100):
+            cache.get(f"key-{i}", Mock(return_value={"access_token": "a", "expires_in": 3600}))
+        self.assertEqual(len(cache._locks), 0)
@@ -0,0 +1,139 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Callable, Optional
+
+from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_base import (
+    ibm_cloud_identity_token_cache_hit_counter,
+    ibm_cloud_identity_token_cache_miss_counter,
+    ibm_cloud_identity_token_cache_refresh_counter,
+)
+
+logger = logging.getLogger(__name__)
+
+# Refresh a token this many seconds before IBM Cloud IAM says it expires.
+# The margin is capped at half of the token lifetime for short-lived tokens.
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+
+class CachedToken:
+    def __init__(self, token: dict[str, Any], expires_at: float, refresh_at: float):
+        self.token = token
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.refresh_at
+
+
+def get_token_expiry(token: dict[str, Any], now: float) -> Optional[float]:
+    """Return the absolute expiry time (epoch seconds) of an IAM token response.
+    https://cloud.ibm.com/docs/account?topic=account-iamtoken_from_apikey
+    """
+    if not isinstance(token, dict):
+        return None
+    expiration = token.get("expiration")
+    if isinstance(expiration, (int, float)) and not isinstance(expiration, bool):
+        return float(expiration)
+    expires_in = token.get("expires_in")
+    if isinstance(expires_in, (int, float)) and not isinstance(expires_in, bool):
+        return now + float(expires_in)
+    return None
+
+
+class TokenCache:
+    """
+    Per-worker cache of IBM Cloud IAM tokens keyed by a hash of the API key.
+
+    Tokens are refreshed ahead of their expiry. Concurrent lookups for the same
+    key are serialised so that only a single caller fetches a new token while
+    the others wait for, and then reuse, its result.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, CachedToken] = {}
+        # A key's lock is dropped once no caller is fetching its token
+        self._locks: weakref.WeakValueDictionary[str, threading.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(*parts: Optional[str]) -> str:
+        return hashlib.sha256("\0".join(p or "" for p in parts).encode("utf-8")).hexdigest()
+
+    def _get_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _lookup(self, key: str) -> Optional[CachedToken]:
+        entry = self._entries.get(key)
+        if entry and entry.is_fresh(time.time()):
+            return entry
+        return None
+
+    def get(self, key: str, fetch: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        if entry := self._lookup(key):
+            ibm_cloud_identity_token_cache_hit_counter.inc()
+            return entry.token
+
+        with self._get_lock(key):
+            # Another caller may have refreshed the token whilst we waited for the lock
+            if entry := self._lookup(key):
+                ibm_cloud_identity_token_cache_hit_counter.inc()
+                return entry.token
+
+            if key in self._entries:
+                ibm_cloud_identity_token_cache_refresh_counter.inc()
+            else:
+                ibm_cloud_identity_token_cache_miss_counter.inc()
+
+            token = fetch()
+            now = time.time()
+            expires_at = get_token_expiry(token, now)
+            if expires_at is None:
+                logger.debug("WCA token response has no expiry; the token will not be cached")
+                self._entries.pop(key, None)
+                return token
+
+            margin = min(TOKEN_REFRESH_MARGIN_SECONDS, max(expires_at - now, 0) / 2)
+            self._entries[key] = CachedToken(token, expires_at, expires_at - margin)
+            return token
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def invalidate_access_token(self, access_token: str):
+        """
+        Drop the cached token whose access token was rejected. A token that
+        another caller has fetched since then is kept.
+        """
+        for key, entry in list(self._entries.items()):
+            if entry.token.get("access_token") == access_token:
+                self.invalidate(key)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Shared by all the WCA SaaS pipelines of the worker: they use the same API keys
+token_cache = TokenCache()
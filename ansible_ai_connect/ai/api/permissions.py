@@ -15,6 +15,8 @@
 from django.conf import settings
 from rest_framework import permissions
 
+from ansible_ai_connect.users.profile import get_user_profile
+
 CONTINUE = True
 BLOCK = False
 
@@ -54,18 +56,18 @@ class BlockWCANotReadyButTrialAvailable(permissions.BasePermission):
     message = "Access denied but user can apply for a trial period."
 
     def has_permission(self, request, view):
-        user = request.user
+        user_profile = get_user_profile(request)
         if not settings.ANSIBLE_AI_ENABLE_ONE_CLICK_TRIAL:
             return CONTINUE
 
-        if not request.user.organization:
+        if not user_profile.organization:
             return CONTINUE
 
         # accept user with active Trial period
-        if any(up.is_active for up in request.user.userplan_set.all()):
+        if user_profile.has_active_plan():
             return CONTINUE
 
-        org_has_api_key = user.organization.has_api_key
+        org_has_api_key = user_profile.organization.has_api_key
         return CONTINUE if org_has_api_key else BLOCK
 
 
@@ -82,17 +84,18 @@ class BlockUserWithoutSeatAndWCAReadyOrg(permissions.BasePermission):
 
     def has_permission(self, request, view):
         user = request.user
-        if user.organization is None:
+        user_profile = get_user_profile(request)
+        if user_profile.organization is None:
             # We accept the Community users, the won't have access to WCA
             return CONTINUE
         if user.rh_user_has_seat is True:
             return CONTINUE
 
         # accept user with active Trial period
-        if any(up.is_active for up in request.user.userplan_set.all()):
+        if user_profile.has_active_plan():
             return CONTINUE
 
-        org_has_api_key = user.organization.has_api_key
+        org_has_api_key = user_profile.organization.has_api_key
 
         return BLOCK if org_has_api_key else CONTINUE
 
@@ -108,17 +111,18 @@ class BlockUserWithSeatButWCANotReady(permissions.BasePermission):
 
     def has_permission(self, request, view):
         user = request.user
-        if user.organization is None:
+        user_profile = get_user_profile(request)
+        if user_profile.organization is None:
             # We accept the Community users, the won't have access to WCA
             return CONTINUE
         if user.rh_user_has_seat is not True:
             return CONTINUE
 
         # If the user has an active Trial, we continue
-        if any(up.is_active for up in request.user.userplan_set.all()):
+        if user_profile.has_active_plan():
             return CONTINUE
 
-        org_has_api_key = user.organization.has_api_key
+        org_has_api_key = user_profile.organization.has_api_key
         return CONTINUE if org_has_api_key else BLOCK
 
 
@@ -137,7 +141,7 @@ class BlockUserWithoutSeat(permissions.BasePermission):
             return CONTINUE
 
         # If the user has an active Trial, we continue
-        if any(up.is_active for up in request.user.userplan_set.all()):
+        if get_user_profile(request).has_active_plan():
             return CONTINUE
 
         return CONTINUE if user.rh_user_has_seat else BLOCK
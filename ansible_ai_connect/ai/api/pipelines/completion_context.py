@@ -13,12 +13,13 @@
 #  limitations under the License.
 
 from dataclasses import dataclass, field
-from typing import Any, Union
+from typing import Any, Optional, Union
 
 from rest_framework.request import Request
 from rest_framework.response import Response
 
 from ansible_ai_connect.ai.api.data.data_model import APIPayload
+from ansible_ai_connect.ai.api.formatter import YamlDocument
 
 
 @dataclass
@@ -31,9 +32,14 @@ class CompletionContext:
     model_id: str = ""
     payload: APIPayload = None
     original_indent: int = 0
+    # Parsed payload.context, shared by the stages instead of parsing it again
+    context_document: Optional[YamlDocument] = None
 
     predictions: dict[str, Union[list[str], str]] = field(default_factory=dict)
     anonymized_predictions: dict[str, Union[list[str], str]] = field(default_factory=dict)
     post_processed_predictions: dict[str, Union[list[str], str]] = field(default_factory=dict)
 
     task_results: list[dict[str, str]] = field(default_factory=list)
+
+    result_cache_key: Optional[tuple] = None
+    result_cache_hit: bool = False
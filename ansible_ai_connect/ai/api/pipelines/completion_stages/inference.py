@@ -17,7 +17,6 @@ import logging
 import time
 from string import Template
 
-from ansible_anonymizer import anonymizer
 from django.apps import apps
 from django_prometheus.conf import NAMESPACE
 from prometheus_client import Histogram
@@ -43,6 +42,7 @@ from ansible_ai_connect.ai.api.exceptions import (
     WcaValidationFailureException,
     process_error_count,
 )
+from ansible_ai_connect.ai.api.model_pipelines.coalescing import completions_coalescer
 from ansible_ai_connect.ai.api.model_pipelines.exceptions import (
     ModelTimeoutError,
     WcaBadRequest,
@@ -65,6 +65,7 @@ from ansible_ai_connect.ai.api.model_pipelines.pipelines import (
 )
 from ansible_ai_connect.ai.api.pipelines.common import PipelineElement
 from ansible_ai_connect.ai.api.pipelines.completion_context import CompletionContext
+from ansible_ai_connect.ai.api.utils.anonymization import get_request_anonymizer
 from ansible_ai_connect.ai.api.utils.segment import send_segment_event
 from ansible_ai_connect.ai.feature_flags import FeatureFlags
 
@@ -75,6 +76,8 @@ feature_flags = FeatureFlags()
 completions_hist = Histogram(
     "model_prediction_latency_seconds",
     "Histogram of model prediction processing time",
+    # "hit" when the prediction is answered from the completion result cache
+    ["cache"],
     namespace=NAMESPACE,
 )
 
@@ -112,13 +115,14 @@ class InferenceStage(PipelineElement):
         event_name = None
         start_time = time.time()
         try:
-            predictions = model_mesh_client.invoke(
+            predictions = completions_coalescer.invoke(
+                model_mesh_client,
                 CompletionsParameters.init(
                     request=request,
                     model_input=data,
                     model_id=model_id,
                     suggestion_id=suggestion_id,
-                )
+                ),
             )
             model_id = predictions.get("model_id", model_id)
         except ModelTimeoutError as e:
@@ -236,9 +240,10 @@ class InferenceStage(PipelineElement):
 
         finally:
             duration = round((time.time() - start_time) * 1000, 2)
-            completions_hist.observe(duration / 1000)  # millisec back to seconds
-            anonymized_predictions = anonymizer.anonymize_struct(
-                predictions, value_template=Template("{{ _${variable_name}_ }}")
+            # millisec back to seconds
+            completions_hist.labels(cache="miss").observe(duration / 1000)
+            anonymized_predictions = get_request_anonymizer(request).anonymize_struct(
+                predictions, "completions_predictions", Template("{{ _${variable_name}_ }}")
             )
             # If an exception was thrown during the backend call, try to get the model ID
             # that is contained in the exception.
@@ -14,12 +14,14 @@
 
 import logging
 import time
+from typing import Optional
 
 import yaml
 from django.apps import apps
 from django_prometheus.conf import NAMESPACE
 from prometheus_client import Histogram
 from yaml.error import MarkedYAMLError
+from yaml.scanner import ScannerError
 
 from ansible_ai_connect.ai.api import formatter as fmtr
 from ansible_ai_connect.ai.api.exceptions import (
@@ -37,6 +39,8 @@ STRIP_YAML_LINE = "---\n"
 postprocess_hist = Histogram(
     "postprocessing_latency_seconds",
     "Histogram of post-processing time",
+    # "hit" when the prediction is answered from the completion result cache
+    ["cache"],
     namespace=NAMESPACE,
 )
 
@@ -86,13 +90,50 @@ def trim_whitespace_lines(input: str):
     return "\n".join(line if line.strip() else "" for line in input.split("\n"))
 
 
-def truncate_recommendation_yaml(recommendation_yaml: str) -> tuple[bool, str]:
+def truncate_recommendation_yaml(
+    recommendation_yaml: str, error: Optional[Exception] = None
+) -> tuple[bool, str]:
+    """
+    Truncate a recommendation cut off at the token limit of the model, given the
+    error of its parsing.
+
+    When the parser failed on the last line or at the end of the stream, the
+    recommendation is cut at the start of the node being parsed, located with
+    the error marks: the scalar, key or flow collection that was cut off, else
+    the line of the problem. Errors without marks fall back to removing the
+    last line when it isn't valid YAML on its own.
+    """
     lines = recommendation_yaml.splitlines()
-    lines = [line for line in lines if line.strip() != ""]
+    non_blank_lines = [i for i, line in enumerate(lines) if line.strip() != ""]
 
     # process the input only when it has multiple lines
-    if len(lines) < 2:
+    if len(non_blank_lines) < 2:
+        return False, recommendation_yaml
+
+    if not isinstance(error, MarkedYAMLError) or error.problem_mark is None:
+        return truncate_last_line(recommendation_yaml)
+
+    last_line = non_blank_lines[-1]
+    if error.problem_mark.line < last_line:
+        # The recommendation is broken before its last line, it wasn't cut off
         return False, recommendation_yaml
+    cut_line = last_line
+    if error.context_mark is not None and (
+        isinstance(error, ScannerError) or "flow" in (error.context or "")
+    ):
+        cut_line = min(cut_line, error.context_mark.line)
+
+    truncated_lines = lines[:cut_line]
+    while truncated_lines and truncated_lines[-1].strip() == "":
+        truncated_lines.pop()
+    if not truncated_lines:
+        return False, recommendation_yaml
+    return True, "\n".join(truncated_lines)
+
+
+def truncate_last_line(recommendation_yaml: str) -> tuple[bool, str]:
+    lines = recommendation_yaml.splitlines()
+    lines = [line for line in lines if line.strip() != ""]
 
     # if the last line can be parsed as YAML successfully,
     # we do not need to try truncating.
@@ -139,29 +180,32 @@ def completion_post_process(context: CompletionContext):
         )
 
     recommendation_yaml = fmtr.restore_original_task_names(
-        anonymized_recommendation_yaml, original_prompt, payload_context
+        anonymized_recommendation_yaml, original_prompt, payload_context, context.context_document
     )
+    recommendation_document = fmtr.YamlDocument(recommendation_yaml)
     truncated_yaml = None
     postprocessed_yaml = None
     tasks = [{"name": task_name} for task_name in fmtr.get_task_names_from_prompt(prompt)]
 
     # check if the recommendation_yaml is a valid YAML
     try:
-        _ = yaml.safe_load(recommendation_yaml)
+        _ = recommendation_document.data
     except Exception as exc:
         # the recommendation YAML can have a broken line at the bottom
         # because the token size of the wisdom model is limited.
-        # so we try truncating the last line of the recommendation here.
-        truncated, truncated_yaml = truncate_recommendation_yaml(recommendation_yaml)
+        # so we try truncating the broken node of the recommendation here.
+        truncated, truncated_yaml = truncate_recommendation_yaml(recommendation_yaml, exc)
         recommendation_problem = None
         if truncated:
             try:
-                _ = yaml.safe_load(truncated_yaml)
+                truncated_document = fmtr.YamlDocument(truncated_yaml)
+                _ = truncated_document.data
                 logger.debug(
                     f"suggestion id: {suggestion_id}, "
                     f"truncated recommendation: \n{truncated_yaml}"
                 )
                 recommendation_yaml = truncated_yaml
+                recommendation_document = truncated_document
             except Exception as exc:
                 recommendation_problem = exc
         else:
@@ -217,8 +261,13 @@ def completion_post_process(context: CompletionContext):
                 raise exception
 
     if is_multi_task_prompt:
-        post_processed_predictions["predictions"][0] = fmtr.normalize_yaml(
-            post_processed_predictions["predictions"][0]
+        prediction = post_processed_predictions["predictions"][0]
+        # Reuse the parsed recommendation unless ansible-lint changed it
+        if prediction != recommendation_document.text:
+            recommendation_document = fmtr.YamlDocument(prediction)
+        normalized_document = fmtr.normalize_document(recommendation_document)
+        post_processed_predictions["predictions"][0] = (
+            normalized_document.text if normalized_document else None
         )
 
     # adjust indentation as per default ansible-lint configuration
@@ -281,7 +330,7 @@ class PostProcessStage(PipelineElement):
             raise PostprocessException(cause=predictions)
         finally:
             duration = round((time.time() - start_time) * 1000, 2)
-            postprocess_hist.observe(duration / 1000)  # millisec to seconds
+            postprocess_hist.labels(cache="miss").observe(duration / 1000)  # millisec to seconds
 
         logger.debug(
             f"response from postprocess for "
@@ -61,19 +61,21 @@ def completion_pre_process(context: CompletionContext):
     multi_task = fmtr.is_multi_task_prompt(prompt)
     context.original_indent = prompt.find("#" if multi_task else "name")
 
-    # fmtr.preprocess() performs:
+    # fmtr.preprocess_document() performs:
     #
     #   1. Insert additional context (variables), and
     #   2. Formatting/normalizing prompt/context YAML data,
     #
-    # Calling fmtr.preprocess for of (2) is redundant in WCA case
+    # Calling fmtr.preprocess_document for of (2) is redundant in WCA case
     # because WCA is already doing this. However, enhanced context
     # support also relies on this preprocess step, so we will
-    # always call fmtr.preprocess, regardless of model server.
+    # always call fmtr.preprocess_document, regardless of model server.
     #
     ansibleFileType = context.metadata.get("ansibleFileType", "playbook")
-    context.payload.context, context.payload.prompt = fmtr.preprocess(
-        payload_context, prompt, ansibleFileType, additionalContext
+    context.payload.context, context.payload.prompt, context.context_document = (
+        fmtr.preprocess_document(
+            payload_context, prompt, ansibleFileType, additionalContext, user.org_id
+        )
     )
     if not multi_task:
         # We are currently more forgiving on leading spacing of single task
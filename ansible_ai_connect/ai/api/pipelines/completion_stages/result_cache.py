@@ -0,0 +1,162 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Histogram
+
+from ansible_ai_connect.ai.api.model_pipelines.pipelines import ModelPipelineCompletions
+from ansible_ai_connect.ai.api.pipelines.common import PipelineElement
+from ansible_ai_connect.ai.api.pipelines.completion_context import CompletionContext
+from ansible_ai_connect.ai.api.pipelines.completion_stages.inference import (
+    completions_hist,
+)
+from ansible_ai_connect.ai.api.pipelines.completion_stages.post_process import (
+    postprocess_hist,
+)
+from ansible_ai_connect.ai.api.pipelines.completion_stages.response import ResponseStage
+
+logger = logging.getLogger(__name__)
+
+result_cache_hist = Histogram(
+    "completion_result_cache_latency_seconds",
+    "Histogram of completion result cache lookup time",
+    ["result"],
+    namespace=NAMESPACE,
+)
+
+
+class CompletionResultCache:
+    """
+    Per-worker LRU cache of post-processed completions.
+
+    Entries are keyed by organization, model and a digest of the normalized
+    prompt/context so that results are never shared across organizations.
+    """
+
+    def __init__(self):
+        self._entries: OrderedDict[tuple, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(org_id, model_id: Optional[str], context: CompletionContext) -> tuple:
+        payload = context.payload
+        digest = hashlib.sha256(
+            json.dumps(
+                [
+                    payload.context,
+                    payload.prompt,
+                    payload.original_prompt,
+                    context.original_indent,
+                    context.metadata.get("ansibleFileType", "playbook"),
+                ]
+            ).encode("utf-8")
+        ).hexdigest()
+        return str(org_id), model_id or "", digest
+
+    def get(self, key: tuple) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def set(self, key: tuple, value: dict[str, Any]):
+        expires_at = time.monotonic() + settings.COMPLETION_RESULT_CACHE_TIMEOUT_SEC
+        with self._lock:
+            self._entries[key] = (expires_at, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.COMPLETION_RESULT_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+completion_result_cache = CompletionResultCache()
+
+
+def get_result_cache_key(context: CompletionContext) -> Optional[tuple]:
+    user = context.request.user
+    organization = getattr(user, "organization", None)
+    if organization is None:
+        # Results are scoped per organization; users without one are never cached.
+        return None
+    model_mesh_client: ModelPipelineCompletions = apps.get_app_config("ai").get_model_pipeline(
+        ModelPipelineCompletions
+    )
+    try:
+        # The model actually used, e.g. the organization's WCA model when none is requested
+        model_id = model_mesh_client.get_model_id(user, context.payload.model)
+    except Exception as e:
+        # The inference stage reports the error
+        logger.debug(f"completion result cache skipped, the model id can't be resolved: {e}")
+        return None
+    return CompletionResultCache.get_key(organization.id, model_id, context)
+
+
+class ResultCacheLookupStage(PipelineElement):
+    def process(self, context: CompletionContext) -> None:
+        start_time = time.time()
+        key = get_result_cache_key(context)
+        cached = completion_result_cache.get(key) if key else None
+        duration = time.time() - start_time
+        result_cache_hist.labels(result="hit" if cached else "miss").observe(duration)
+        context.result_cache_key = key
+        if not cached:
+            return
+
+        # The skipped stages are still counted, so that the completions answered
+        # from the cache remain visible in their latency and throughput.
+        completions_hist.labels(cache="hit").observe(duration)
+        postprocess_hist.labels(cache="hit").observe(0)
+
+        logger.debug(f"completion result cache hit for suggestion {context.payload.suggestionId}")
+        context.model_id = cached["model_id"]
+        context.predictions = {"model_id": cached["model_id"]} if cached["model_id"] else {}
+        context.post_processed_predictions = cached["post_processed_predictions"]
+        context.task_results = cached["task_results"]
+        context.result_cache_hit = True
+        # Short-circuit the inference and post-processing stages
+        ResponseStage().process(context)
+
+
+class ResultCacheStoreStage(PipelineElement):
+    def process(self, context: CompletionContext) -> None:
+        if not context.result_cache_key:
+            return
+        completion_result_cache.set(
+            context.result_cache_key,
+            {
+                "model_id": context.predictions.get("model_id"),
+                "post_processed_predictions": context.post_processed_predictions,
+                "task_results": context.task_results,
+            },
+        )
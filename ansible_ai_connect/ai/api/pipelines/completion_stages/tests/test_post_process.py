@@ -18,6 +18,9 @@ Test post_process
 
 from unittest.case import TestCase
 
+import yaml
+
+from ansible_ai_connect.ai.api import formatter as fmtr
 from ansible_ai_connect.ai.api.pipelines.completion_stages import post_process
 
 
@@ -78,3 +81,52 @@ class PostProcessTaskTest(TestCase):
         post_process.populate_module_and_collection(task)
         self.assertNotIn("module", task.keys())
         self.assertNotIn("collection", task.keys())
+
+
+class TruncateRecommendationYamlTest(TestCase):
+    TASK = "- name: Copy the configuration\n  ansible.builtin.copy:\n    src: httpd.conf\n"
+
+    def truncate(self, recommendation_yaml):
+        with self.assertRaises(yaml.YAMLError) as e:
+            fmtr.load_yaml(recommendation_yaml)
+        return post_process.truncate_recommendation_yaml(recommendation_yaml, e.exception)
+
+    def test_cut_off_nodes(self):
+        for cut_off in [
+            '    dest: "/etc/httpd/conf/httpd.conf\n',
+            '    dest: "/etc/httpd/conf/\n      httpd.conf\n',
+            "    de",
+            "    owner: {{ httpd_user\n",
+            "    mode: [\n      u+rw,\n      g+r",
+            "   dest",
+        ]:
+            with self.subTest(cut_off=cut_off):
+                truncated, truncated_yaml = self.truncate(self.TASK + cut_off)
+                self.assertTrue(truncated)
+                self.assertEqual(truncated_yaml, self.TASK.rstrip())
+                self.assertEqual(
+                    fmtr.load_yaml(truncated_yaml),
+                    [
+                        {
+                            "name": "Copy the configuration",
+                            "ansible.builtin.copy": {"src": "httpd.conf"},
+                        }
+                    ],
+                )
+
+    def test_broken_before_the_last_line(self):
+        recommendation_yaml = self.TASK.replace("  ansible", "  a: b: c\n  ansible")
+        self.assertEqual(self.truncate(recommendation_yaml), (False, recommendation_yaml))
+
+    def test_cut_off_at_the_first_line(self):
+        recommendation_yaml = '- name: "Copy\n  ansible.builtin.copy:\n    src: httpd.conf\n'
+        self.assertEqual(self.truncate(recommendation_yaml), (False, recommendation_yaml))
+
+    def test_single_line(self):
+        self.assertEqual(self.truncate('- name: "Copy'), (False, '- name: "Copy'))
+
+    def test_error_without_marks(self):
+        self.assertEqual(
+            post_process.truncate_recommendation_yaml(self.TASK + "    dest: [", ValueError()),
+            (True, self.TASK.rstrip()),
+        )
@@ -16,6 +16,7 @@ import copy
 import uuid
 from unittest.mock import Mock, patch
 
+import yaml
 from django.test import TestCase, modify_settings, override_settings
 from yaml.error import Mark
 from yaml.scanner import ScannerError
@@ -656,6 +657,23 @@ class CompletionPreProcessTest(TestCase):
             PLAYBOOK_CONTEXT_WITH_VARS,
         )
 
+    @override_settings(ENABLE_ADDITIONAL_CONTEXT=True)
+    def test_multi_task_prompt_context_document(self):
+        payload = copy.deepcopy(PLAYBOOK_PAYLOAD)
+        payload["prompt"] = (
+            "\n".join(payload["prompt"].split("\n")[:-2]) + "\n    # do this & do that\n"
+        )
+        context = CompletionPreProcessTest.mock_context(payload, True)
+        completion_pre_process(context)
+        self.assertEqual(context.context_document.text, PLAYBOOK_CONTEXT_WITH_VARS)
+        self.assertEqual(context.context_document.data, yaml.safe_load(PLAYBOOK_CONTEXT_WITH_VARS))
+
+    @override_settings(ENABLE_ADDITIONAL_CONTEXT=True)
+    def test_single_task_prompt_has_no_context_document(self):
+        context = CompletionPreProcessTest.mock_context(PLAYBOOK_PAYLOAD, True)
+        completion_pre_process(context)
+        self.assertIsNone(context.context_document)
+
     @override_settings(ENABLE_ADDITIONAL_CONTEXT=True)
     def test_additional_context_with_playbook_with_two_plays(self):
         self.call_completion_pre_process(
@@ -0,0 +1,212 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import uuid
+from http import HTTPStatus
+from unittest.mock import Mock, patch
+
+from django.apps import apps
+from django.test import SimpleTestCase, override_settings
+
+from ansible_ai_connect.ai.api.data.data_model import APIPayload
+from ansible_ai_connect.ai.api.model_pipelines.exceptions import WcaNoDefaultModelId
+from ansible_ai_connect.ai.api.pipelines.completion_context import CompletionContext
+from ansible_ai_connect.ai.api.pipelines.completion_stages.inference import (
+    completions_hist,
+)
+from ansible_ai_connect.ai.api.pipelines.completion_stages.post_process import (
+    postprocess_hist,
+)
+from ansible_ai_connect.ai.api.pipelines.completion_stages.result_cache import (
+    CompletionResultCache,
+    completion_result_cache,
+)
+from ansible_ai_connect.organizations.models import Organization
+from ansible_ai_connect.test_utils import (
+    APIVersionTestCaseBase,
+    WisdomAppsBackendMocking,
+    WisdomServiceAPITestCaseBase,
+)
+
+
+def get_context(prompt="    - name: Install Apache\n", context="---\n- hosts: all\n"):
+    payload = APIPayload(prompt=prompt, context=context)
+    payload.original_prompt = prompt
+    return CompletionContext(request=Mock(), payload=payload)
+
+
+def get_count(hist, cache):
+    return sum(
+        sample.value
+        for metric in hist.collect()
+        for sample in metric.samples
+        if sample.name.endswith("_count") and sample.labels.get("cache") == cache
+    )
+
+
+@override_settings(COMPLETION_RESULT_CACHE_TIMEOUT_SEC=60)
+@override_settings(COMPLETION_RESULT_CACHE_MAX_ENTRIES=2)
+class TestCompletionResultCache(SimpleTestCase):
+
+    def test_get_key(self):
+        key = CompletionResultCache.get_key(1, "model", get_context())
+        self.assertEqual(key, CompletionResultCache.get_key(1, "model", get_context()))
+        self.assertNotEqual(key, CompletionResultCache.get_key(2, "model", get_context()))
+        self.assertNotEqual(key, CompletionResultCache.get_key(1, "other", get_context()))
+        self.assertNotEqual(
+            key,
+            CompletionResultCache.get_key(1, "model", get_context(prompt="    - name: Foo\n")),
+        )
+
+    def test_get_returns_a_copy(self):
+        cache = CompletionResultCache()
+        cache.set(("1", "", "a"), {"predictions": ["a"]})
+        cache.get(("1", "", "a"))["predictions"].append("b")
+        self.assertEqual(cache.get(("1", "", "a")), {"predictions": ["a"]})
+
+    def test_lru_eviction(self):
+        cache = CompletionResultCache()
+        cache.set("a", {"v": "a"})
+        cache.set("b", {"v": "b"})
+        cache.get("a")
+        cache.set("c", {"v": "c"})
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_expiry(self):
+        cache = CompletionResultCache()
+        with patch(
+            "ansible_ai_connect.ai.api.pipelines.completion_stages.result_cache.time.monotonic"
+        ) as monotonic:
+            monotonic.return_value = 100
+            cache.set("a", {"v": "a"})
+            monotonic.return_value = 159
+            self.assertIsNotNone(cache.get("a"))
+            monotonic.return_value = 160
+            self.assertIsNone(cache.get("a"))
+
+
+@override_settings(ENABLE_COMPLETION_RESULT_CACHE=True)
+@override_settings(ENABLE_ANSIBLE_LINT_POSTPROCESS=False)
+@override_settings(SEGMENT_WRITE_KEY="DUMMY_KEY_VALUE")
+@override_settings(WCA_SECRET_BACKEND_TYPE="dummy")
+@override_settings(WCA_SECRET_DUMMY_SECRETS="1:valid,2:valid")
+class TestCompletionResultCacheView(
+    APIVersionTestCaseBase, WisdomAppsBackendMocking, WisdomServiceAPITestCaseBase
+):
+
+    def setUp(self):
+        super().setUp()
+        self.user.rh_user_has_seat = True
+        self.user.organization = Organization.objects.get_or_create(id=1)[0]
+        completion_result_cache.clear()
+        self.org_model_id = "a-model-id"
+        self.model_client = Mock()
+        self.model_client.get_model_id.side_effect = (
+            lambda user, requested_model_id: requested_model_id or self.org_model_id
+        )
+        self.model_client.invoke.return_value = {
+            "model_id": "a-model-id",
+            "predictions": ["      ansible.builtin.apt:\n        name: apache2"],
+        }
+
+    def tearDown(self):
+        completion_result_cache.clear()
+        super().tearDown()
+
+    def post(self):
+        payload = {
+            "prompt": "---\n- hosts: all\n  become: yes\n\n  tasks:\n    - name: Install Apache\n",
+            "suggestionId": str(uuid.uuid4()),
+        }
+        with patch.object(
+            apps.get_app_config("ai"),
+            "get_model_pipeline",
+            Mock(return_value=self.model_client),
+        ):
+            with self.assertLogs(logger="root", level="DEBUG") as log:
+                r = self.client.post(self.api_version_reverse("completions"), payload)
+        self.assertEqual(r.status_code, HTTPStatus.OK)
+        self.assertEqual(str(r.data["suggestionId"]), payload["suggestionId"])
+        return r, self.extractSegmentEventsFromLog(log)
+
+    def test_cache_hit(self):
+        self.client.force_authenticate(user=self.user)
+        r1, _ = self.post()
+        r2, segment_events = self.post()
+
+        self.assertEqual(self.model_client.invoke.call_count, 1)
+        self.assertEqual(r1.data["predictions"], r2.data["predictions"])
+        self.assertEqual(r2.data["model"], "a-model-id")
+        completion_events = [e for e in segment_events if e["event"] == "completion"]
+        self.assertEqual(len(completion_events), 1)
+        self.assertEqual(completion_events[0]["properties"]["modelName"], "a-model-id")
+        self.assertEqual(completion_events[0]["properties"]["taskCount"], 1)
+        self.assertFalse([e for e in segment_events if e["event"] == "prediction"])
+
+    def test_cache_hit_is_observed(self):
+        self.client.force_authenticate(user=self.user)
+        counts = {
+            (hist, cache): get_count(hist, cache)
+            for hist in (completions_hist, postprocess_hist)
+            for cache in ("hit", "miss")
+        }
+
+        self.post()
+        self.post()
+
+        for hist in (completions_hist, postprocess_hist):
+            self.assertEqual(get_count(hist, "miss"), counts[(hist, "miss")] + 1)
+            self.assertEqual(get_count(hist, "hit"), counts[(hist, "hit")] + 1)
+
+    def test_cache_is_scoped_per_organization(self):
+        self.client.force_authenticate(user=self.user)
+        self.post()
+        self.user.organization = Organization.objects.get_or_create(id=2)[0]
+        try:
+            self.post()
+        finally:
+            Organization.objects.filter(id=2).delete()
+
+        self.assertEqual(self.model_client.invoke.call_count, 2)
+
+    def test_cache_is_scoped_per_resolved_model(self):
+        self.client.force_authenticate(user=self.user)
+        self.post()
+        # The organization switched to another model
+        self.org_model_id = "another-model-id"
+        self.post()
+        self.assertEqual(self.model_client.invoke.call_count, 2)
+
+    def test_model_id_not_resolved_is_not_cached(self):
+        self.model_client.get_model_id.side_effect = WcaNoDefaultModelId
+        self.client.force_authenticate(user=self.user)
+        self.post()
+        self.post()
+        self.assertEqual(self.model_client.invoke.call_count, 2)
+
+    def test_users_without_organization_are_not_cached(self):
+        self.user.organization = None
+        self.client.force_authenticate(user=self.user)
+        self.post()
+        self.post()
+        self.assertEqual(self.model_client.invoke.call_count, 2)
+
+    @override_settings(ENABLE_COMPLETION_RESULT_CACHE=False)
+    def test_cache_disabled(self):
+        self.client.force_authenticate(user=self.user)
+        self.post()
+        self.post()
+        self.assertEqual(self.model_client.invoke.call_count, 2)
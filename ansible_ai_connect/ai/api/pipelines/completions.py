@@ -14,6 +14,7 @@
 
 import logging
 
+from django.conf import settings
 from rest_framework.request import Request
 from rest_framework.response import Response
 
@@ -32,6 +33,10 @@ from ansible_ai_connect.ai.api.pipelines.completion_stages.pre_process import (
     PreProcessStage,
 )
 from ansible_ai_connect.ai.api.pipelines.completion_stages.response import ResponseStage
+from ansible_ai_connect.ai.api.pipelines.completion_stages.result_cache import (
+    ResultCacheLookupStage,
+    ResultCacheStoreStage,
+)
 
 from .completion_context import CompletionContext
 
@@ -41,16 +46,25 @@ logger = logging.getLogger(__name__)
 class CompletionsPipeline(Pipeline[Response, CompletionContext]):
     def __init__(self, request: Request):
         self.context = CompletionContext(request=request)
-        super().__init__(
-            [
+        if settings.ENABLE_COMPLETION_RESULT_CACHE:
+            pipeline = [
                 DeserializeStage(),
                 PreProcessStage(),
+                ResultCacheLookupStage(),
                 InferenceStage(),
                 PostProcessStage(),
+                ResultCacheStoreStage(),
                 ResponseStage(),
-            ],
-            self.context,
-        )
+            ]
+        else:
+            pipeline = [
+                DeserializeStage(),
+                PreProcessStage(),
+                InferenceStage(),
+                PostProcessStage(),
+                ResponseStage(),
+            ]
+        super().__init__(pipeline, self.context)
 
     def execute(self) -> Response:
         for pe in self.pipeline:
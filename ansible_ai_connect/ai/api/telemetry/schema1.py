@@ -28,6 +28,7 @@ from yaml.error import MarkedYAMLError
 
 from ansible_ai_connect.healthcheck.version_info import VersionInfo
 from ansible_ai_connect.users.models import User
+from ansible_ai_connect.users.profile import get_user_profile
 
 logger = logging.getLogger(__name__)
 version_info = VersionInfo()
@@ -115,16 +116,19 @@ class Schema1Event:
         self._user = user
         if isinstance(user, AnonymousUser):
             return
+        # Read from the relations prefetched by get_user_profile() when the
+        # user is the one of the request, see set_request().
         self.rh_user_has_seat = user.rh_user_has_seat
         if user.organization:
             self.rh_user_org_id = user.organization.id
-        self.groups = list(user.groups.values_list("name", flat=True))
-        self.plans = [PlanEntry.init(up) for up in user.userplan_set.all()]
-        self.plan_ids = [up.plan_id for up in user.userplan_set.all()]
+        self.groups = [group.name for group in user.groups.all()]
+        plans = list(user.userplan_set.all())
+        self.plans = [PlanEntry.init(up) for up in plans]
+        self.plan_ids = [up.plan_id for up in plans]
 
     def set_request(self, request):
         if hasattr(request, "user"):  # e.g WSGIRequest generated when we run update-openapi-schema
-            self.set_user(request.user)
+            self.set_user(get_user_profile(request).user)
         self.request = RequestPayload(path=request.path, method=request.method)
 
     def set_response(self, response):
@@ -47,7 +47,8 @@ def _oneclick_trial_event_build(user):
                 name=plan.plan.name,
                 id=plan.plan.id,
             )
-            for plan in user.userplan_set.all()
+            # Queried again: the trial plan was just added
+            for plan in user.userplan_set.select_related("plan")
         ],
         rh_user_org_id=user.organization.id,
     )
@@ -14,9 +14,11 @@
 
 from unittest import mock
 
-from django.test import override_settings
+from django.test import RequestFactory, override_settings
 
 from ansible_ai_connect.test_utils import WisdomServiceAPITestCaseBaseOIDC
+from ansible_ai_connect.users.models import User
+from ansible_ai_connect.users.profile import get_user_profile
 
 from .schema1 import (
     ExplainPlaybookEvent,
@@ -46,6 +48,26 @@ class TestSchema1Event(WisdomServiceAPITestCaseBaseOIDC):
         self.assertEqual(event1.request.path, "/trial")
         self.assertEqual(event1.request.method, "POST")
 
+    def test_set_user_reads_only_its_relations(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.rh_user_has_seat = False
+        event1 = Schema1Event()
+        # organization, groups and plans, without the social auth
+        with self.assertNumQueries(3):
+            event1.set_user(user)
+        self.assertEqual(event1.groups, ["Group 1", "Group 2"])
+
+    def test_set_request_reuses_user_profile(self):
+        request = RequestFactory().post("/trial")
+        request.user = User.objects.get(pk=self.user.pk)
+        request.user.rh_user_has_seat = False
+        get_user_profile(request)
+        event1 = Schema1Event()
+        with self.assertNumQueries(0):
+            event1.set_request(request)
+        self.assertEqual(event1.rh_user_org_id, 1981)
+        self.assertEqual(event1.groups, ["Group 1", "Group 2"])
+
     def test_set_exception(self):
         event1 = Schema1Event()
         self.assertFalse(event1.exception)
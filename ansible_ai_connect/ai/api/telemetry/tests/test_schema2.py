@@ -80,5 +80,5 @@ class TestSchema2OneClickTrial(TestCase):
         m_user.organization = m_org
         m_user.organization.has_telemetry_opt_out = False
         m_user.groups.values_list.return_value = []
-        m_user.userplan_set.all.return_value = [m_plan]
+        m_user.userplan_set.select_related.return_value = [m_plan]
         return m_user
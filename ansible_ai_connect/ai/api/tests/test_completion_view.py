@@ -67,6 +67,7 @@ from ansible_ai_connect.healthcheck.backends import HealthCheckSummary
 from ansible_ai_connect.test_utils import (
     APIVersionTestCaseBase,
     WisdomServiceAPITestCaseBase,
+    WisdomServiceAPITestCaseBaseOIDC,
 )
 from ansible_ai_connect.users.models import User
 
@@ -571,3 +572,33 @@ class TestCompletionView(APIVersionTestCaseBase, WisdomServiceAPITestCaseBase):
                 self.assertIsNotNone(r.data["model"])
                 self.assertIsNotNone(r.data["suggestionId"])
                 self.assertSegmentTimestamp(log)
+
+
+class TestCompletionViewQueries(APIVersionTestCaseBase, WisdomServiceAPITestCaseBaseOIDC):
+    api_version = "v1"
+
+    @override_settings(SEGMENT_WRITE_KEY="DUMMY_KEY_VALUE")
+    @override_settings(ENABLE_ANSIBLE_LINT_POSTPROCESS=False)
+    def test_num_queries(self):
+        self.start_user_plan()
+        payload = {
+            "prompt": "---\n- hosts: all\n  become: yes\n\n  tasks:\n    - name: Install Apache\n",
+            "suggestionId": str(uuid.uuid4()),
+        }
+        response_data = {
+            "model_id": "a-model-id",
+            "predictions": ["      ansible.builtin.apt:\n        name: apache2"],
+        }
+        with patch.object(
+            apps.get_app_config("ai"),
+            "get_model_pipeline",
+            Mock(return_value=MockedPipelineCompletions(self, payload, response_data)),
+        ):
+            for _ in range(2):
+                # As loaded by the authentication of each request
+                self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+                # The organization, groups, plans and social_auth of the
+                # UserProfile, then the 6 queries of the throttling cache
+                with self.assertNumQueries(10):
+                    r = self.client.post(self.api_version_reverse("completions"), payload)
+                self.assertEqual(r.status_code, HTTPStatus.OK)
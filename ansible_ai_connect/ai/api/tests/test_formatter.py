@@ -14,6 +14,13 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+from unittest import skipUnless
+from unittest.mock import patch
+
+import yaml
+from django.conf import settings
+from django.test import override_settings
+
 from ansible_ai_connect.ai.api import formatter as fmtr
 from ansible_ai_connect.test_utils import WisdomServiceLogAwareTestCase
 
@@ -617,6 +624,135 @@ var3: value3
             fmtr.restore_original_task_names(multi_task_yaml, multi_task_prompt, payload_context),
         )
 
+    def test_yaml_document_is_parsed_once(self):
+        document = fmtr.YamlDocument("- name: Install Apache\n  ansible.builtin.apt:\n")
+        self.assertFalse(document.is_loaded)
+        with patch.object(fmtr, "load_yaml", wraps=fmtr.load_yaml) as load:
+            self.assertEqual(
+                document.data, [{"name": "Install Apache", "ansible.builtin.apt": None}]
+            )
+            _ = document.data
+        load.assert_called_once()
+        self.assertTrue(document.is_loaded)
+
+    def test_yaml_document_parse_error(self):
+        document = fmtr.YamlDocument("- name: Install Apache\n  - invalid")
+        with patch.object(fmtr, "load_yaml", wraps=fmtr.load_yaml) as load:
+            for _ in range(2):
+                with self.assertRaises(yaml.YAMLError):
+                    _ = document.data
+        load.assert_called_once()
+
+    def test_preprocess_document(self):
+        context = "- hosts: all\n  tasks:\n  - name: Install Apache\n    ansible.builtin.apt:\n"
+        _, _, document = fmtr.preprocess_document(context, "  - name: Say hello\n")
+        self.assertIsNone(document)
+
+        normalized_context, _, document = fmtr.preprocess_document(
+            context, "  # Say hello & start Apache\n"
+        )
+        self.assertEqual(document.text, normalized_context)
+        self.assertTrue(document.is_loaded)
+        self.assertEqual(document.data, yaml.safe_load(normalized_context))
+
+    def test_restore_original_task_names_with_context_document(self):
+        prompt = "# Install Apache & say hello fred@redhat.com\n"
+        task_list_context = "- name: Update packages\n  ansible.builtin.dnf:\n    name: '*'\n"
+        playbook_context = (
+            "- name: Playbook\n  hosts: all\n  tasks:\n"
+            "    - name: Update packages\n      ansible.builtin.dnf:\n        name: '*'\n"
+        )
+        tasks = (
+            "- name:  Install Apache\n  ansible.builtin.apt:\n    name: apache2\n"
+            "- name:  say hello test@example.com\n  ansible.builtin.debug:\n"
+            "    msg: Hello there olivia1@example.com\n"
+        )
+        indented_tasks = "".join(f"    {line}\n" for line in tasks.splitlines())
+
+        for context, output_yaml in [
+            ("", tasks),
+            (task_list_context, tasks),
+            (playbook_context, indented_tasks),
+            ("- name: Playbook\n  hosts: all\n  tasks:\n", indented_tasks),
+        ]:
+            with self.subTest(context=context):
+                document = fmtr.YamlDocument(context)
+                _ = document.data
+                expected = fmtr.restore_original_task_names(output_yaml, prompt, context)
+                self.assertIn("say hello fred@redhat.com", expected)
+
+                with patch.object(
+                    fmtr, "load_yaml_with_name_lines", wraps=fmtr.load_yaml_with_name_lines
+                ) as load:
+                    self.assertEqual(
+                        fmtr.restore_original_task_names(output_yaml, prompt, context, document),
+                        expected,
+                    )
+                # The output is parsed without the context
+                load.assert_called_once_with(output_yaml)
+
+    def test_restore_original_task_names_with_context_document_fallback(self):
+        prompt = "# Install Apache\n"
+        context = "- name: Playbook\n  hosts: all\n  tasks:\n"
+        # Not indented as the tasks of the play
+        output_yaml = "  - name:  install apache\n    ansible.builtin.apt:\n"
+        document = fmtr.YamlDocument(context)
+        _ = document.data
+
+        with patch.object(
+            fmtr, "load_yaml_with_name_lines", wraps=fmtr.load_yaml_with_name_lines
+        ) as load:
+            self.assertEqual(
+                fmtr.restore_original_task_names(output_yaml, prompt, context, document),
+                "  - name:  Install Apache\n    ansible.builtin.apt:\n",
+            )
+        load.assert_called_once_with(context + output_yaml)
+
+    def test_restore_original_task_names_max_tasks(self):
+        context = "- name: Playbook\n  hosts: all\n  tasks:\n"
+        document = fmtr.YamlDocument(context)
+        _ = document.data
+        task_names = [f"Install package {i}" for i in range(int(settings.MULTI_TASK_MAX_REQUESTS))]
+        prompt = "    # " + " & ".join(task_names) + "\n"
+        output_yaml = "".join(
+            f"    - name:  install package {i}\n      ansible.builtin.package:\n"
+            f"        name: pkg{i}\n      loop:\n        - name:  install package {i}\n"
+            for i in range(len(task_names))
+        )
+        expected = "".join(
+            f"    - name:  Install package {i}\n      ansible.builtin.package:\n"
+            f"        name: pkg{i}\n      loop:\n        - name:  install package {i}\n"
+            for i in range(len(task_names))
+        )
+
+        for payload_context_document in [None, document]:
+            with patch.object(
+                fmtr, "load_yaml_with_name_lines", wraps=fmtr.load_yaml_with_name_lines
+            ) as load:
+                self.assertEqual(
+                    fmtr.restore_original_task_names(
+                        output_yaml, prompt, context, payload_context_document
+                    ),
+                    expected,
+                )
+            load.assert_called_once()
+
+    def test_restore_original_task_names_only_rewrites_the_task_name_lines(self):
+        prompt = "# Install Apache & install Apache httpd & install Apache & print done\n"
+        output_yaml = (
+            "- name:  install apache\n  ansible.builtin.apt:\n    name: apache2\n"
+            "- name:  install apache httpd\n  ansible.builtin.apt:\n    name: httpd\n"
+            "- name:  install apache\n  ansible.builtin.apt:\n    name: apache2\n"
+            "- ansible.builtin.debug:\n    msg: Done\n"
+        )
+        self.assertEqual(
+            fmtr.restore_original_task_names(output_yaml, prompt),
+            "- name:  Install Apache\n  ansible.builtin.apt:\n    name: apache2\n"
+            "- name:  install Apache httpd\n  ansible.builtin.apt:\n    name: httpd\n"
+            "- name:  install Apache\n  ansible.builtin.apt:\n    name: apache2\n"
+            "- ansible.builtin.debug:\n    msg: Done\n",
+        )
+
     def test_strip_task_preamble_from_multi_task_prompt_no_preamble_unchanged_multi(self):
         prompt = "    # install ffmpeg"
         self.assertEqual(prompt, fmtr.strip_task_preamble_from_multi_task_prompt(prompt))
@@ -821,6 +957,39 @@ var3: value3
         self.assertTrue("tags" in keywords)
         self.assertTrue("timeout" in keywords)
 
+    def test_ansible_task_keywords_match_the_task_attributes(self):
+        from ansible.playbook.task import Task
+
+        keywords = set()
+        for c in Task.__mro__:
+            # Filter out callable objects (functions) and "private" (_) fields
+            keywords.update(
+                attr.replace("_val", "")
+                for attr in c.__dict__
+                if not callable(c.__dict__[attr]) and not attr.startswith("_")
+            )
+        self.assertEqual(keywords, fmtr.ANSIBLE_TASK_KEYWORDS)
+
+    def test_get_fqcn_module_from_prediction_ignores_values(self):
+        self.assertEqual(
+            "docker_image",
+            fmtr.get_fqcn_or_module_from_prediction(
+                "      delegate_to: http://example.com:8080\n"
+                "      vars: rabbitmq:3.7.13\n"
+                "      docker_image:\n"
+                "        name: rabbitmq:3.7.13\n"
+            ),
+        )
+        self.assertEqual(
+            "community.general.ufw",
+            fmtr.get_fqcn_or_module_from_prediction(
+                "- name: Allow SSH\n  community.general.ufw:\n    rule: allow\n"
+            ),
+        )
+        self.assertIsNone(
+            fmtr.get_fqcn_or_module_from_prediction("      when: a.b.c:d\n      register: x\n")
+        )
+
     def test_get_fqcn_module_from_prediction_with_task_keywords(self):
         self.assertEqual(
             "community.windows.win_iis_website",
@@ -877,6 +1046,423 @@ var3: value3
         )
 
 
+# Documents dumped with the libyaml emitter
+LIBYAML_CORPUS = [
+    """---
+- name: Install and start Apache
+  hosts: webservers
+  become: yes
+  gather_facts: false
+  vars:
+    http_port: 8080
+    version: "2.4"
+    enabled: 'yes'
+    empty:
+    empty_string: ""
+    packages: [httpd, mod_ssl]
+    settings: {}
+    options: []
+  vars_files:
+  - vars/main.yml
+  tasks:
+  - name: Install httpd
+    ansible.builtin.package:
+      name: "{{ item }}"
+      state: present
+    loop: "{{ packages }}"
+    when: ansible_os_family == 'RedHat'
+  - name: Start httpd
+    ansible.builtin.service:
+      name: httpd
+      state: started
+    notify:
+    - Restart httpd
+  handlers:
+  - name: Restart httpd
+    ansible.builtin.service: {name: httpd, state: restarted}
+- name: Second play
+  hosts: all
+  tasks:
+""",
+    """- name: Handle errors
+  block:
+    - name: Run a command
+      ansible.builtin.command: /bin/false
+      register: result
+      changed_when: result.rc != 0
+      with_items:
+        - - nested
+          - list
+        - item: value
+  rescue:
+    - ansible.builtin.debug:
+        msg: 'I caught an error: "{{ result }}"'
+  always:
+    - ansible.builtin.debug: msg="always"
+""",
+    """- name: Scalars that need quotes
+  ansible.builtin.set_fact:
+    'yes': 'no'
+    '1': 'on'
+    null_string: 'null'
+    tilde: '~'
+    float_string: '1.0'
+    octal_string: '0o17'
+    hex_string: '0x1F'
+    underscore_number: '1_000'
+    infinity: '.inf'
+    date_string: '2024-01-01'
+    colon: 'a: b'
+    dash: '- a'
+    hash: '#comment'
+    space_hash: 'a #b'
+    at: '@at'
+    backtick: '`tick'
+    percent: '%percent'
+    anchor: '&anchor'
+    alias: '*alias'
+    tag: '!tag'
+    pipe: '|pipe'
+    folded: '>folded'
+    leading_space: ' leading'
+    trailing_space: 'trailing '
+    backslash: 'C:\\path'
+    single_quote: "it's"
+    double_quote: 'a "b" c'
+    both_quotes: 'it''s "b"'
+    question: '? mark'
+    braces: '{a}'
+    brackets: '[a]'
+    comma: 'a, b'
+""",
+    """name: top-level mapping
+number: 1
+float: 1.5
+boolean: true
+date: 2024-01-01
+timestamp: 2024-01-01 10:00:00
+list:
+- a
+- b: c
+  d:
+  - e
+- []
+""",
+    """- a
+- 'yes'
+- 1
+- b: c
+- null
+""",
+    """- roles: []
+  hosts: db
+- hosts: all
+  roles:
+  - common
+""",
+]
+
+# Documents dumped with the pure-Python emitter
+FALLBACK_CORPUS = [
+    """- name: Multi-line string
+  ansible.builtin.shell: |
+    echo hello
+    echo world
+""",
+    """- name: Install the café
+  ansible.builtin.debug:
+    msg: crème brûlée
+""",
+    """- name: Tab
+  ansible.builtin.debug:
+    msg: "a\tb"
+""",
+    """- - nested
+  - top-level
+- list
+""",
+    f"""- name: Long key
+  {"k" * 200}: value
+""",
+    """- name: Empty key
+  "": value
+""",
+    """- hosts: all
+- roles: []
+  hosts: db
+""",
+    """- name: a
+  ping:
+- tags: []
+  name: b
+""",
+    """- a
+- roles:
+  - common
+  hosts: db
+""",
+]
+
+
+@skipUnless(fmtr.LIBYAML_AVAILABLE, "PyYAML is built without libyaml")
+class YamlEngineTestCase(WisdomServiceLogAwareTestCase):
+    @staticmethod
+    def python_dump(data):
+        return yaml.dump(
+            data, Dumper=fmtr.AnsibleDumper, allow_unicode=True, sort_keys=False, width=10000
+        )
+
+    def assert_same_as_python_engine(self, document):
+        data = yaml.load(document, Loader=yaml.SafeLoader)
+        self.assertEqual(fmtr.load_yaml(document), data)
+        self.assertEqual(fmtr.dump_yaml(data), self.python_dump(data))
+
+    def test_libyaml_corpus(self):
+        for document in LIBYAML_CORPUS:
+            with self.subTest(document=document):
+                self.assertTrue(fmtr.can_dump_with_libyaml(fmtr.load_yaml(document)))
+                self.assert_same_as_python_engine(document)
+
+    def test_fallback_corpus(self):
+        for document in FALLBACK_CORPUS:
+            with self.subTest(document=document):
+                self.assertFalse(fmtr.can_dump_with_libyaml(fmtr.load_yaml(document)))
+                self.assert_same_as_python_engine(document)
+
+    def test_blank_lines_and_quotes(self):
+        data = [
+            {"name": "a", "tasks": [{"debug": {"msg": "yes"}}]},
+            {"name": "b", "vars": {"x": "it's"}},
+        ]
+        self.assertEqual(
+            fmtr.dump_yaml(data),
+            '- name: a\n  tasks:\n    - debug:\n        msg: "yes"\n\n'
+            "- name: b\n  vars:\n    x: it's\n",
+        )
+
+    def test_normalize_yaml(self):
+        for document in LIBYAML_CORPUS + FALLBACK_CORPUS:
+            with self.subTest(document=document):
+                expected = self.python_dump(yaml.load(document, Loader=yaml.SafeLoader))
+                self.assertEqual(fmtr.normalize_yaml(document), expected)
+
+    def test_without_libyaml(self):
+        data = fmtr.load_yaml(LIBYAML_CORPUS[0])
+        with (
+            patch.object(fmtr, "LIBYAML_AVAILABLE", False),
+            patch.object(fmtr, "AnsibleCDumper") as c_dumper,
+        ):
+            self.assertEqual(fmtr.dump_yaml(data), self.python_dump(data))
+        c_dumper.assert_not_called()
+
+
+PLAYBOOK_CONTEXT = """---
+# A playbook
+- name: Configure
+  hosts: all
+  vars_files:
+    - vars/main.yml
+  tasks:
+  - name: Install httpd
+    ansible.builtin.package:
+      name: httpd
+    loop:
+    - a
+    - b
+
+  # A comment
+  - name: Configure httpd
+    ansible.builtin.template:
+      src: httpd.conf.j2
+      dest: /etc/httpd/conf/httpd.conf
+"""
+
+ADDITIONAL_CONTEXT = {
+    "playbookContext": {"varInfiles": {"vars/main.yml": "port: 8080\n"}},
+    "roleContext": {"roleVars": {"defaults": {"main.yml": "user: admin\n"}}},
+    "standaloneTaskContext": {"includeVars": {"vars.yml": "group: wheel\n"}},
+}
+
+
+@override_settings(NORMALIZED_YAML_CACHE_MAX_BYTES=1024 * 1024)
+class NormalizedYamlCacheTestCase(WisdomServiceLogAwareTestCase):
+    def setUp(self):
+        super().setUp()
+        fmtr.normalized_yaml_cache.clear()
+        self.addCleanup(fmtr.normalized_yaml_cache.clear)
+
+    def assert_same_as_normalize_document(self, text, ansible_file_type, additional_context):
+        def normalize(normalize_document):
+            try:
+                document = normalize_document(
+                    fmtr.YamlDocument(text), ansible_file_type, additional_context
+                )
+                return document.text, document.data
+            except Exception as e:
+                # e.g. a play that is not a mapping with the additional context
+                return type(e)
+
+        expected = normalize(fmtr.normalize_document)
+        # Without and with the cached items
+        for _ in range(2):
+            self.assertEqual(normalize(fmtr.normalize_document_incrementally), expected)
+
+    def test_same_as_normalize_document(self):
+        documents = (
+            LIBYAML_CORPUS
+            + FALLBACK_CORPUS
+            + [
+                PLAYBOOK_CONTEXT + "\n  - name: Start httpd",
+                PLAYBOOK_CONTEXT + "\n  # Start httpd & enable httpd",
+                # Handlers follow the tasks
+                PLAYBOOK_CONTEXT + "  handlers:\n  - name: Restart httpd\n    service: {}\n",
+                # Alias of an anchor of another item
+                "- &task\n  name: a\n- *task\n",
+                # A play whose tasks are its first key follows another play
+                PLAYBOOK_CONTEXT + "- tasks:\n  - name: Start httpd\n    service: {}\n",
+            ]
+        )
+        for document in documents:
+            for ansible_file_type, additional_context in [
+                ("playbook", None),
+                ("playbook", ADDITIONAL_CONTEXT),
+                ("tasks_in_role", ADDITIONAL_CONTEXT),
+                ("tasks", ADDITIONAL_CONTEXT),
+            ]:
+                with self.subTest(
+                    document=document,
+                    ansible_file_type=ansible_file_type,
+                    additional_context=additional_context,
+                ):
+                    self.assert_same_as_normalize_document(
+                        document, ansible_file_type, additional_context
+                    )
+
+    def test_only_changed_tasks_are_normalized(self):
+        fmtr.normalize_document_incrementally(
+            fmtr.YamlDocument(PLAYBOOK_CONTEXT + "\n  - name: Start"),
+            "playbook",
+            ADDITIONAL_CONTEXT,
+        )
+        hits = fmtr.normalized_yaml_cache_lookup_counter.labels(result="hit")._value.get()
+
+        with patch.object(fmtr, "load_yaml", wraps=fmtr.load_yaml) as load:
+            document = fmtr.normalize_document_incrementally(
+                fmtr.YamlDocument(PLAYBOOK_CONTEXT + "\n  - name: Start httpd"),
+                "playbook",
+                ADDITIONAL_CONTEXT,
+            )
+
+        load.assert_called_once_with("- name: Start httpd")
+        self.assertTrue(document.text.endswith("    - name: Start httpd\n"))
+        self.assertIn("  vars:\n    port: 8080\n", document.text)
+        # The play header and the first two tasks
+        self.assertEqual(
+            fmtr.normalized_yaml_cache_lookup_counter.labels(result="hit")._value.get(), hits + 3
+        )
+
+    @override_settings(NORMALIZED_YAML_CACHE_MAX_BYTES=100)
+    def test_size_is_bounded(self):
+        self.assert_same_as_normalize_document(PLAYBOOK_CONTEXT, "playbook", None)
+        self.assertLessEqual(fmtr.normalized_yaml_cache_size_gauge._value.get(), 100)
+
+    @override_settings(ENABLE_NORMALIZED_YAML_CACHE=True)
+    def test_preprocess(self):
+        prompt = "  - name: Start httpd"
+        expected = fmtr.preprocess(PLAYBOOK_CONTEXT, prompt)
+        with patch.object(
+            fmtr, "normalize_document_incrementally", wraps=fmtr.normalize_document_incrementally
+        ) as normalize:
+            self.assertEqual(fmtr.preprocess(PLAYBOOK_CONTEXT, prompt), expected)
+        normalize.assert_called_once()
+
+
+ROLE_VARS_CONTEXT = {
+    "roleContext": {
+        "roleVars": {"defaults": {"main.yml": "user: admin\npackages:\n  - httpd\n"}},
+        "includeVars": {"vars.yml": "config:\n  port: 8080\n"},
+    },
+}
+
+
+@override_settings(ENABLE_PARSED_VARS_CACHE=True)
+@override_settings(PARSED_VARS_CACHE_MAX_BYTES=1024)
+class ParsedVarsCacheTestCase(WisdomServiceLogAwareTestCase):
+    def setUp(self):
+        super().setUp()
+        fmtr.parsed_vars_cache.clear()
+        self.addCleanup(fmtr.parsed_vars_cache.clear)
+
+    def expand(self, organization_id=1):
+        data = [{"name": "Install httpd"}]
+        fmtr.expand_vars_files(data, "tasks_in_role", ROLE_VARS_CONTEXT, organization_id)
+        return data
+
+    def get_skipped_bytes(self):
+        counter = fmtr.parsed_vars_skipped_bytes_counter
+        return counter.labels(ansible_file_type="tasks_in_role")._value.get()
+
+    def test_vars_are_parsed_once(self):
+        expected = self.expand()
+        skipped_bytes = self.get_skipped_bytes()
+
+        with patch.object(fmtr, "load_yaml", wraps=fmtr.load_yaml) as load:
+            self.assertEqual(self.expand(), expected)
+
+        load.assert_not_called()
+        self.assertEqual(
+            expected[0]["ansible.builtin.set_fact"],
+            {"user": "admin", "packages": ["httpd"], "config": {"port": 8080}},
+        )
+        self.assertEqual(self.get_skipped_bytes(), skipped_bytes + 53)
+
+    def test_cached_vars_are_not_modified(self):
+        expected = self.expand()
+        data = self.expand()
+        data[0]["ansible.builtin.set_fact"]["packages"].append("nginx")
+        data[0]["ansible.builtin.set_fact"]["config"]["port"] = 80
+
+        self.assertEqual(self.expand(), expected)
+
+    def test_vars_are_scoped_per_organization(self):
+        self.expand(organization_id=1)
+
+        with patch.object(fmtr, "load_yaml", wraps=fmtr.load_yaml) as load:
+            self.expand(organization_id=2)
+            self.assertEqual(load.call_count, 2)
+            self.expand(organization_id=None)
+            self.expand(organization_id=None)
+            self.assertEqual(load.call_count, 6)
+
+    @override_settings(PARSED_VARS_CACHE_MAX_BYTES=30)
+    def test_size_is_bounded(self):
+        self.expand()
+        self.assertEqual(fmtr.parsed_vars_cache_size_gauge._value.get(), 21)
+
+    @override_settings(ENABLE_PARSED_VARS_CACHE=False)
+    def test_disabled(self):
+        self.expand()
+
+        with patch.object(fmtr, "load_yaml", wraps=fmtr.load_yaml) as load:
+            self.expand()
+        self.assertEqual(load.call_count, 2)
+
+    def test_preprocess(self):
+        prompt = "- name: Install httpd"
+        expected = fmtr.preprocess("", prompt, "tasks_in_role", ROLE_VARS_CONTEXT)
+        self.assertEqual(
+            fmtr.preprocess("", prompt, "tasks_in_role", ROLE_VARS_CONTEXT, organization_id=1),
+            expected,
+        )
+        with patch.object(fmtr, "load_yaml", wraps=fmtr.load_yaml) as load:
+            self.assertEqual(
+                fmtr.preprocess("", prompt, "tasks_in_role", ROLE_VARS_CONTEXT, organization_id=1),
+                expected,
+            )
+        # Only the prompt
+        load.assert_called_once()
+
+
 if __name__ == "__main__":
     tests = AnsibleDumperTestCase()
     tests.test_extra_empty_lines()
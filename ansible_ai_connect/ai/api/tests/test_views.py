@@ -47,6 +47,7 @@ from ansible_ai_connect.ai.api.model_pipelines.config_pipelines import BaseConfi
 from ansible_ai_connect.ai.api.model_pipelines.exceptions import (
     ModelTimeoutError,
     WcaBadRequest,
+    WcaCircuitOpen,
     WcaKeyNotFound,
     WcaModelIdNotFound,
     WcaNoDefaultModelId,
@@ -1140,6 +1141,16 @@ that are running Red Hat Enterprise Linux 9.
             "Please contact your administrator.",
         )
 
+    def test_wca_circuit_open(self):
+        model_client = self.stub_wca_client(200)
+        model_client.invoke = Mock(side_effect=WcaCircuitOpen(endpoint="explain_playbook"))
+        self.assert_test(
+            model_client,
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            ServiceUnavailable,
+            "ServiceUnavailable",
+        )
+
     def test_wca_request_with_model_id_given(self):
         self.payload["model"] = "mymodel"
         model_client = self.stub_wca_client(
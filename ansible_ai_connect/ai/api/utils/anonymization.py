@@ -0,0 +1,109 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import time
+from functools import lru_cache
+from string import Template
+from typing import Any, Optional
+
+from ansible_anonymizer import anonymizer
+from ansible_anonymizer.field_checks import is_password_field_name
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter, Histogram
+from rest_framework.request import Request
+
+anonymization_hist = Histogram(
+    "anonymization_latency_seconds",
+    "Histogram of the anonymization time of the request payloads, per call site",
+    ["call_site"],
+    namespace=NAMESPACE,
+)
+anonymization_memo_hits_counter = Counter(
+    "anonymization_memo_hits",
+    "Counter of strings anonymized earlier in the same request, per call site",
+    ["call_site"],
+    namespace=NAMESPACE,
+)
+
+# The default of anonymizer.anonymize_struct()
+DEFAULT_VALUE_TEMPLATE = Template("{{ $variable_name }}")
+
+
+@lru_cache(maxsize=1024)
+def _is_password_field_name(name: str) -> bool:
+    return is_password_field_name(name)
+
+
+class RequestAnonymizer:
+    """
+    Request-scoped anonymizer.anonymize_struct().
+
+    A request anonymizes the same strings several times: the context sent to the
+    model, the Segment events, ... The anonymized strings are memoized by content
+    and value template, so that each one is anonymized once per request. The
+    duration of the calls is observed per call site and summed up in `duration`.
+    """
+
+    def __init__(self):
+        self._memo: dict[tuple[str, str, str], str] = {}
+        self.duration = 0.0
+
+    def anonymize_struct(
+        self, value: Any, call_site: str, value_template: Optional[Template] = None
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._anonymize(value, "", value_template or DEFAULT_VALUE_TEMPLATE, call_site)
+        finally:
+            duration = time.perf_counter() - start
+            self.duration += duration
+            anonymization_hist.labels(call_site=call_site).observe(duration)
+
+    def _anonymize(self, o: Any, key_name: Any, value_template: Template, call_site: str) -> Any:
+        # The traversal of anonymizer.anonymize_struct()
+        if key_name and not isinstance(key_name, str):
+            key_name = str(key_name)
+
+        if isinstance(o, dict):
+            return {
+                k: self._anonymize(v, k if isinstance(k, str) else "", value_template, call_site)
+                for k, v in o.items()
+            }
+        if isinstance(o, list):
+            return [self._anonymize(v, key_name, value_template, call_site) for v in o]
+        if isinstance(o, str):
+            # The field name only matters for password fields
+            name = key_name if _is_password_field_name(key_name) else ""
+            key = (o, name, value_template.template)
+            anonymized = self._memo.get(key)
+            if anonymized is None:
+                anonymized = anonymizer.anonymize_field(o, name, value_template)
+                self._memo[key] = anonymized
+            else:
+                anonymization_memo_hits_counter.labels(call_site=call_site).inc()
+            return anonymized
+        return o
+
+
+def get_request_anonymizer(request) -> RequestAnonymizer:
+    """
+    Return the RequestAnonymizer of the request. It is stored on the Django
+    request, so that the DRF request wrapping it and the middlewares share it.
+    """
+    http_request = request._request if isinstance(request, Request) else request
+    request_anonymizer = getattr(http_request, "_anonymizer", None)
+    if not isinstance(request_anonymizer, RequestAnonymizer):
+        request_anonymizer = RequestAnonymizer()
+        http_request._anonymizer = request_anonymizer
+    return request_anonymizer
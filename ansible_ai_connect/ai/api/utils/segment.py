@@ -64,8 +64,10 @@ def send_segment_event(event: Dict[str, Any], event_name: str, user: User) -> No
     if "hostname" not in event:
         event["hostname"] = platform.node()
 
+    # Only the relations needed are read, from the prefetched ones when
+    # get_user_profile() loaded them on the user of the request.
     if "groups" not in event:
-        event["groups"] = list(user.groups.values_list("name", flat=True))
+        event["groups"] = [group.name for group in user.groups.all()]
 
     if "rh_user_has_seat" not in event:
         event["rh_user_has_seat"] = getattr(user, "rh_user_has_seat", False)
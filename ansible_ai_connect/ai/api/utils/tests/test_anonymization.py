@@ -0,0 +1,124 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from string import Template
+from unittest import TestCase, mock
+
+from ansible_anonymizer import anonymizer
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from ansible_ai_connect.ai.api.utils.anonymization import (
+    RequestAnonymizer,
+    anonymization_hist,
+    anonymization_memo_hits_counter,
+    get_request_anonymizer,
+)
+
+PAYLOAD = {
+    "context": "- hosts: all\n  vars:\n    email: jean-pierre@redhat.com\n",
+    "prompt": "  - name: Ping 192.168.1.10\n",
+    "vars": [
+        {"password": "my_secret", "host": "10.0.0.1"},
+        {"user_password": "my_secret", "host": "10.0.0.1"},
+    ],
+    "status_code": 200,
+    "exception": None,
+}
+
+
+class TestRequestAnonymizer(TestCase):
+    def test_same_result_as_anonymize_struct(self):
+        self.assertEqual(
+            RequestAnonymizer().anonymize_struct(PAYLOAD, "test"),
+            anonymizer.anonymize_struct(PAYLOAD),
+        )
+
+    def test_same_result_as_anonymize_struct_with_value_template(self):
+        value_template = Template("{{ _${variable_name}_ }}")
+        self.assertEqual(
+            RequestAnonymizer().anonymize_struct(PAYLOAD, "test", value_template),
+            anonymizer.anonymize_struct(PAYLOAD, value_template=value_template),
+        )
+
+    def test_password_fields(self):
+        anonymized = RequestAnonymizer().anonymize_struct(
+            {"password": "my_secret", "comment": "my_secret"}, "test"
+        )
+        self.assertEqual(anonymized["password"], "{{ password }}")
+        self.assertEqual(anonymized["comment"], "my_secret")
+
+    def test_strings_are_anonymized_once(self):
+        request_anonymizer = RequestAnonymizer()
+        hits = anonymization_memo_hits_counter.labels(call_site="test_memo")._value.get()
+        with mock.patch(
+            "ansible_ai_connect.ai.api.utils.anonymization.anonymizer.anonymize_field",
+            wraps=anonymizer.anonymize_field,
+        ) as anonymize_field:
+            request_anonymizer.anonymize_struct(PAYLOAD, "test_memo")
+            calls = anonymize_field.call_count
+            request_anonymizer.anonymize_struct(PAYLOAD["context"], "test_memo")
+            request_anonymizer.anonymize_struct([PAYLOAD["prompt"]], "test_memo")
+        self.assertEqual(anonymize_field.call_count, calls)
+        # The two "10.0.0.1" hosts, the context and the prompt
+        self.assertEqual(
+            anonymization_memo_hits_counter.labels(call_site="test_memo")._value.get(),
+            hits + 3,
+        )
+
+    def test_value_template_is_part_of_the_key(self):
+        request_anonymizer = RequestAnonymizer()
+        value = {"password": "my_secret"}
+        self.assertEqual(
+            request_anonymizer.anonymize_struct(value, "test"), {"password": "{{ password }}"}
+        )
+        self.assertEqual(
+            request_anonymizer.anonymize_struct(
+                value, "test", Template("{{ _${variable_name}_ }}")
+            ),
+            {"password": "{{ _password_ }}"},
+        )
+
+    def test_duration(self):
+        request_anonymizer = RequestAnonymizer()
+        count = self._get_sample_count("test_duration")
+        request_anonymizer.anonymize_struct(PAYLOAD, "test_duration")
+        request_anonymizer.anonymize_struct(PAYLOAD, "test_duration")
+        self.assertEqual(self._get_sample_count("test_duration"), count + 2)
+        self.assertGreater(request_anonymizer.duration, 0)
+
+    @staticmethod
+    def _get_sample_count(call_site):
+        for metric in anonymization_hist.collect():
+            for sample in metric.samples:
+                if sample.name.endswith("_count") and sample.labels["call_site"] == call_site:
+                    return sample.value
+        return 0
+
+
+class TestGetRequestAnonymizer(TestCase):
+    def test_shared_by_the_drf_request(self):
+        http_request = RequestFactory().post("/api/v1/ai/completions/")
+        request_anonymizer = get_request_anonymizer(Request(http_request))
+        self.assertIs(get_request_anonymizer(http_request), request_anonymizer)
+        self.assertIsNot(
+            get_request_anonymizer(RequestFactory().post("/api/v1/ai/completions/")),
+            request_anonymizer,
+        )
+
+    def test_mock_request(self):
+        request = mock.Mock()
+        request_anonymizer = get_request_anonymizer(request)
+        self.assertIsInstance(request_anonymizer, RequestAnonymizer)
+        self.assertIs(get_request_anonymizer(request), request_anonymizer)
@@ -158,7 +158,7 @@ class TestSegment(TestCase):
     @override_settings(SEGMENT_WRITE_KEY="DUMMY_KEY_VALUE")
     def test_send_segment_event_commercial_forbidden_event(self, *args):
         g = Mock()
-        g.values_list = MagicMock(return_value=[])
+        g.all = MagicMock(return_value=[])
         user = Mock(rh_user_has_seat=True, groups=g)
         user.userplan_set.all.return_value = []
         event = {
@@ -177,7 +177,7 @@ class TestSegment(TestCase):
     @override_settings(SEGMENT_WRITE_KEY="DUMMY_KEY_VALUE")
     def test_send_segment_event_community_user(self, track_method):
         g = Mock()
-        g.values_list = MagicMock(return_value=[])
+        g.all = MagicMock(return_value=[])
         user = Mock(rh_user_has_seat=False, groups=g)
         user.userplan_set.all.return_value = []
         event = {
@@ -195,7 +195,7 @@ class TestSegment(TestCase):
     @override_settings(SEGMENT_WRITE_KEY="DUMMY_KEY_VALUE")
     def test_send_segment_event_seated_user(self, track_method):
         g = Mock()
-        g.values_list = MagicMock(return_value=[])
+        g.all = MagicMock(return_value=[])
         user = Mock(rh_user_has_seat=True, groups=g)
         user.userplan_set.all.return_value = []
         event = {
@@ -326,7 +326,7 @@ class TestSegment(TestCase):
     @override_settings(SEGMENT_WRITE_KEY="DUMMY_KEY_VALUE")
     def test_segment_client_in_use(self):
         g = Mock()
-        g.values_list = MagicMock(return_value=[])
+        g.all = MagicMock(return_value=[])
         user = Mock(rh_user_has_seat=False, groups=g)
         event = {
             "rh_user_has_seat": False,
@@ -342,7 +342,7 @@ class TestSegment(TestCase):
     @override_settings(SEGMENT_WRITE_KEY="DUMMY_KEY_VALUE")
     def test_send_segment_plans(self, track_method):
         user = Mock()
-        user.groups.values_list.return_value = []
+        user.groups.all.return_value = []
         userplan = Mock()
         userplan.accept_marketing = True
         userplan.created_at = "Some date"
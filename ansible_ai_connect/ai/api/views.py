@@ -61,6 +61,7 @@ from ansible_ai_connect.ai.api.exceptions import (
 )
 from ansible_ai_connect.ai.api.model_pipelines.exceptions import (
     WcaBadRequest,
+    WcaCircuitOpen,
     WcaCloudflareRejection,
     WcaEmptyResponse,
     WcaHAPFilterRejection,
@@ -98,6 +99,7 @@ from ansible_ai_connect.ai.api.telemetry.schema2 import (
     AnalyticsRoleGenerationWizard,
     AnalyticsTelemetryEvents,
 )
+from ansible_ai_connect.ai.api.utils.anonymization import get_request_anonymizer
 from ansible_ai_connect.ai.api.utils.segment import send_schema1_event
 from ansible_ai_connect.ai.api.utils.segment_analytics_telemetry import (
     send_segment_analytics_event,
@@ -239,6 +241,7 @@ class AACSAPIView(APIView):
         # Mapping between the internal exceptions and the API exceptions (with a message and a code)
         mapping = [
             (WcaBadRequest, WcaBadRequestException),
+            (WcaCircuitOpen, ServiceUnavailable),
             (WcaCloudflareRejection, WcaCloudflareRejectionException),
             (WcaEmptyResponse, WcaEmptyResponseException),
             (WcaHAPFilterRejection, WcaHAPFilterRejectionException),
@@ -878,8 +881,8 @@ class Explanation(AACSAPIView):
 
         # Anonymize response
         # Anonymized in the View to be consistent with where Completions are anonymized
-        anonymized_explanation = anonymizer.anonymize_struct(
-            explanation, value_template=Template("{{ _${variable_name}_ }}")
+        anonymized_explanation = get_request_anonymizer(request).anonymize_struct(
+            explanation, "playbook_explanation", Template("{{ _${variable_name}_ }}")
         )
 
         answer = {
@@ -935,8 +938,8 @@ class ExplanationRole(AACSAPIView):
 
         # Anonymize response
         # Anonymized in the View to be consistent with where Completions are anonymized
-        anonymized_explanation = anonymizer.anonymize_struct(
-            explanation, value_template=Template("{{ _${variable_name}_ }}")
+        anonymized_explanation = get_request_anonymizer(request).anonymize_struct(
+            explanation, "role_explanation", Template("{{ _${variable_name}_ }}")
         )
 
         answer = {
@@ -997,11 +1000,11 @@ class GenerationPlaybook(AACSAPIView):
         )
         # Anonymize responses
         # Anonymized in the View to be consistent with where Completions are anonymized
-        anonymized_playbook = anonymizer.anonymize_struct(
-            playbook, value_template=Template("{{ _${variable_name}_ }}")
+        anonymized_playbook = get_request_anonymizer(request).anonymize_struct(
+            playbook, "playbook_generation", Template("{{ _${variable_name}_ }}")
         )
-        anonymized_outline = anonymizer.anonymize_struct(
-            outline, value_template=Template("{{ _${variable_name}_ }}")
+        anonymized_outline = get_request_anonymizer(request).anonymize_struct(
+            outline, "playbook_generation", Template("{{ _${variable_name}_ }}")
         )
         self.event.playbook_length = len(anonymized_playbook)
 
@@ -1071,14 +1074,14 @@ class GenerationRole(AACSAPIView):
 
         # Anonymize responses
         # Anonymized in the View to be consistent with where Completions are anonymized
-        anonymized_role = anonymizer.anonymize_struct(
-            roles, value_template=Template("{{ _${variable_name}_ }}")
+        anonymized_role = get_request_anonymizer(request).anonymize_struct(
+            roles, "role_generation", Template("{{ _${variable_name}_ }}")
         )
-        anonymized_outline = anonymizer.anonymize_struct(
-            outline, value_template=Template("{{ _${variable_name}_ }}")
+        anonymized_outline = get_request_anonymizer(request).anonymize_struct(
+            outline, "role_generation", Template("{{ _${variable_name}_ }}")
         )
-        anonymized_files = anonymizer.anonymize_struct(
-            files, value_template=Template("{{ _${variable_name}_ }}")
+        anonymized_files = get_request_anonymizer(request).anonymize_struct(
+            files, "role_generation", Template("{{ _${variable_name}_ }}")
         )
 
         answer = {
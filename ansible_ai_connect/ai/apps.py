@@ -20,7 +20,7 @@ from django.conf import settings
 
 from ansible_ai_connect.ai.api.model_pipelines.factory import ModelPipelineFactory
 from ansible_ai_connect.ai.api.model_pipelines.types import PIPELINE_TYPE
-from ansible_ai_connect.ansible_lint import lintpostprocessing
+from ansible_ai_connect.ansible_lint import lintpostprocessing, pool
 from ansible_ai_connect.users.authz_checker import AMSCheck, DummyCheck
 from ansible_ai_connect.users.reports.postman import (
     BasePostman,
@@ -31,7 +31,11 @@ from ansible_ai_connect.users.reports.postman import (
     StdoutPostman,
 )
 
-from .api.aws.wca_secret_manager import AWSSecretManager, DummySecretManager
+from .api.aws.wca_secret_manager import (
+    AWSSecretManager,
+    CachingSecretManager,
+    DummySecretManager,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -102,7 +106,9 @@ class AiConfig(AppConfig):
 
         return self._seat_checker
 
-    def get_wca_secret_manager(self) -> Union[AWSSecretManager, DummySecretManager]:
+    def get_wca_secret_manager(
+        self,
+    ) -> Union[AWSSecretManager, DummySecretManager, CachingSecretManager]:
         backends = {
             "aws_sm": AWSSecretManager,
             "dummy": DummySecretManager,
@@ -124,10 +130,19 @@ class AiConfig(AppConfig):
                 settings.WCA_SECRET_MANAGER_PRIMARY_REGION,
                 settings.WCA_SECRET_MANAGER_REPLICA_REGIONS,
             )
+            if (
+                settings.WCA_SECRET_MANAGER_CACHE_TIMEOUT_SEC > 0
+                or settings.WCA_SECRET_MANAGER_NEGATIVE_CACHE_TIMEOUT_SEC > 0
+            ):
+                self._wca_secret_manager = CachingSecretManager(
+                    self._wca_secret_manager,
+                    settings.WCA_SECRET_MANAGER_CACHE_TIMEOUT_SEC,
+                    settings.WCA_SECRET_MANAGER_NEGATIVE_CACHE_TIMEOUT_SEC,
+                )
 
         return self._wca_secret_manager
 
-    def get_ansible_lint_caller(self) -> lintpostprocessing.AnsibleLintCaller | None:
+    def get_ansible_lint_caller(self) -> lintpostprocessing.BaseLintCaller | None:
         if self._ansible_lint_caller:
             return self._ansible_lint_caller
         if not settings.ENABLE_ANSIBLE_LINT_POSTPROCESS:
@@ -136,7 +151,10 @@ class AiConfig(AppConfig):
         if self._ansible_lint_caller is FAILED:
             return None
         try:
-            self._ansible_lint_caller = lintpostprocessing.AnsibleLintCaller()
+            if settings.ENABLE_ANSIBLE_LINT_POOL:
+                self._ansible_lint_caller = pool.AnsibleLintPool()
+            else:
+                self._ansible_lint_caller = lintpostprocessing.AnsibleLintCaller()
             logger.info("Ansible Lint Postprocessing is enabled.")
         except Exception as ex:
             logger.exception(f"Failed to initialize Ansible Lint with exception: {ex}")
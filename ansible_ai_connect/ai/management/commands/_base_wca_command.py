@@ -19,6 +19,7 @@ from django.core.management.base import BaseCommand, CommandError
 
 from ansible_ai_connect.ai.api.aws.wca_secret_manager import (
     AWSSecretManager,
+    CachingSecretManager,
     Suffixes,
     WcaSecretManagerError,
 )
@@ -29,12 +30,17 @@ class BaseWCACommand(BaseCommand):
         parser.add_argument("org_id", type=str, help="The Red Hat OrgId.")
 
     def handle(self, *args, **options):
-        client = AWSSecretManager(
-            settings.WCA_SECRET_MANAGER_ACCESS_KEY,
-            settings.WCA_SECRET_MANAGER_SECRET_ACCESS_KEY,
-            settings.WCA_SECRET_MANAGER_KMS_KEY_ID,
-            settings.WCA_SECRET_MANAGER_PRIMARY_REGION,
-            settings.WCA_SECRET_MANAGER_REPLICA_REGIONS,
+        # Changes made by the commands invalidate the secrets cached by the service workers
+        client = CachingSecretManager(
+            AWSSecretManager(
+                settings.WCA_SECRET_MANAGER_ACCESS_KEY,
+                settings.WCA_SECRET_MANAGER_SECRET_ACCESS_KEY,
+                settings.WCA_SECRET_MANAGER_KMS_KEY_ID,
+                settings.WCA_SECRET_MANAGER_PRIMARY_REGION,
+                settings.WCA_SECRET_MANAGER_REPLICA_REGIONS,
+            ),
+            timeout=0,
+            negative_timeout=0,
         )
 
         self.stdout.write(
@@ -0,0 +1,140 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import statistics
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ansible_ai_connect.ansible_lint.lintpostprocessing import (
+    AnsibleLintCaller,
+    get_default_rules_collection,
+)
+
+SAMPLES = [
+    "- name: Install nginx\n  package:\n    name: nginx\n    state: present\n",
+    "- name: Start nginx\n  service: name=nginx state=started enabled=yes\n",
+    "- name: Copy the configuration\n"
+    "  copy:\n"
+    "    src: nginx.conf\n"
+    "    dest: /etc/nginx/nginx.conf\n"
+    "    mode: 0644\n"
+    "  become: true\n",
+    "- name: Print a message\n  debug:\n    msg: Hello World!\n",
+]
+
+
+@contextmanager
+def time_rules(rules_collection, timings: dict[str, list[float]]):
+    """Collects the time spent in each rule of the collection, in ms."""
+
+    def timed(rule):
+        getmatches = rule.getmatches
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return getmatches(*args, **kwargs)
+            finally:
+                timings[rule.id].append((time.perf_counter() - start) * 1000)
+
+        return wrapper
+
+    for rule in rules_collection.rules:
+        rule.getmatches = timed(rule)
+    try:
+        yield
+    finally:
+        for rule in rules_collection.rules:
+            del rule.getmatches
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the per-call latency of the ansible-lint post-processing in a temporary "
+        "directory, in the reused workspace and with the transform rules only"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=20, help="Number of lint calls per sample and mode"
+        )
+        parser.add_argument(
+            "--file", type=str, nargs="*", help="YAML files to lint instead of the samples"
+        )
+        parser.add_argument(
+            "--rules", action="store_true", help="Report the time spent in each rule"
+        )
+
+    def handle(self, iterations, file, rules, *args, **options):
+        if iterations < 1:
+            raise CommandError("iterations must be at least 1")
+        samples = SAMPLES
+        if file:
+            samples = []
+            for path in file:
+                with open(path, encoding="utf-8") as f:
+                    samples.append(f.read())
+
+        caller = AnsibleLintCaller(transform_only=False)
+        transform_caller = AnsibleLintCaller(transform_only=True)
+        modes = {
+            "temporary directory": caller.run_linter_in_temporary_directory,
+            "workspace": caller.run_linter_in_workspace,
+            "transform rules only": transform_caller.run_linter_in_workspace,
+        }
+        for run_linter in modes.values():
+            # Warm up the rules and the ansible-lint caches
+            for sample in samples:
+                run_linter(sample)
+
+        latencies = {name: [] for name in modes}
+        for _ in range(iterations):
+            for sample in samples:
+                # Alternate the modes so that they see the same system noise
+                for name, run_linter in modes.items():
+                    start = time.perf_counter()
+                    run_linter(sample)
+                    latencies[name].append((time.perf_counter() - start) * 1000)
+
+        # The transform rules only are a subset of the default collection
+        timings: dict[str, list[float]] = defaultdict(list)
+        if rules:
+            with time_rules(get_default_rules_collection(), timings):
+                for _ in range(iterations):
+                    for sample in samples:
+                        caller.run_linter_in_workspace(sample)
+        caller.get_workspace().cleanup()
+        transform_caller.get_workspace().cleanup()
+
+        self.stdout.write(f"{len(samples)} sample(s), {iterations} iteration(s)")
+        for name, values in latencies.items():
+            values.sort()
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            self.stdout.write(
+                f"{name}: mean {statistics.mean(values):.2f} ms, "
+                f"median {statistics.median(values):.2f} ms, p95 {p95:.2f} ms"
+            )
+
+        if rules:
+            transform_rule_ids = {rule.id for rule in transform_caller.rules_collection.rules}
+            self.stdout.write(
+                "Mean time per lint call, per rule (* kept with the transform rules only):"
+            )
+            for rule_id, values in sorted(timings.items(), key=lambda item: -sum(item[1])):
+                marker = " *" if rule_id in transform_rule_ids else ""
+                mean = sum(values) / (len(samples) * iterations)
+                self.stdout.write(f"{rule_id}: {mean:.3f} ms{marker}")
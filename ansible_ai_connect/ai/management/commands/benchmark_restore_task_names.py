@@ -0,0 +1,103 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ansible_ai_connect.ai.api.formatter import (
+    YamlDocument,
+    restore_original_task_names,
+)
+
+
+def get_sample(tasks: int, context_tasks: int) -> tuple[str, str, str, str]:
+    """
+    A multi-task prompt of tasks tasks, following a playbook of context_tasks
+    tasks, with its suggestion and the expected output. Each suggested task
+    loops over items with a name, which must not be restored.
+    """
+    context = "- name: Playbook\n  hosts: all\n  tasks:\n" + "".join(
+        f"    - name: Context task {i}\n      ansible.builtin.debug:\n        msg: Task {i}\n"
+        for i in range(context_tasks)
+    )
+    task_names = [f"Install package {i}" for i in range(tasks)]
+    prompt = "    # " + " & ".join(task_names) + "\n"
+    suggested_task = (
+        "    - name:  {name} {i}\n      ansible.builtin.package:\n"
+        "        name: pkg{i}\n      loop:\n        - name:  install package {i}\n"
+    )
+    output_yaml = "".join(suggested_task.format(name="install package", i=i) for i in range(tasks))
+    expected = "".join(suggested_task.format(name="Install package", i=i) for i in range(tasks))
+    return context, prompt, output_yaml, expected
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-call latency of restore_original_task_names() for a multi-task "
+        "prompt, with and without the parsed context document"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200, help="Number of calls per mode")
+        parser.add_argument(
+            "--tasks",
+            type=int,
+            default=int(settings.MULTI_TASK_MAX_REQUESTS),
+            help="Number of tasks of the prompt (default: MULTI_TASK_MAX_REQUESTS)",
+        )
+        parser.add_argument(
+            "--context-tasks", type=int, default=40, help="Number of tasks of the playbook"
+        )
+
+    def handle(self, iterations, tasks, context_tasks, *args, **options):
+        if iterations < 1:
+            raise CommandError("iterations must be at least 1")
+        if tasks < 2:
+            raise CommandError("tasks must be at least 2, for a multi-task prompt")
+        context, prompt, output_yaml, expected = get_sample(tasks, context_tasks)
+        document = YamlDocument(context)
+        _ = document.data
+        modes = {
+            "with the context document": document,
+            "without the context document": None,
+        }
+        for name, payload_context_document in modes.items():
+            # Warm up, and check that the benchmark restores the names
+            restored = restore_original_task_names(
+                output_yaml, prompt, context, payload_context_document
+            )
+            if restored != expected:
+                raise CommandError(f"The task names weren't restored {name}")
+
+        latencies = {name: [] for name in modes}
+        for _ in range(iterations):
+            # Alternate the modes so that they see the same system noise
+            for name, payload_context_document in modes.items():
+                start = time.perf_counter()
+                restore_original_task_names(output_yaml, prompt, context, payload_context_document)
+                latencies[name].append((time.perf_counter() - start) * 1000000)
+
+        self.stdout.write(
+            f"{tasks} task(s), {context_tasks} context task(s), {iterations} iteration(s)"
+        )
+        for name, values in latencies.items():
+            values.sort()
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            self.stdout.write(
+                f"{name}: mean {statistics.mean(values):.0f} us, "
+                f"median {statistics.median(values):.0f} us, p95 {p95:.0f} us"
+            )
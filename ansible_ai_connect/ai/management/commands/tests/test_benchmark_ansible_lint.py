@@ -0,0 +1,49 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+
+class TestBenchmarkAnsibleLint(SimpleTestCase):
+    def call_command(self, *args):
+        out = StringIO()
+        call_command("benchmark_ansible_lint", *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_benchmark(self):
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".yml") as f:
+            f.write("- name: Print a message\n  debug:\n    msg: Hello World!\n")
+            f.flush()
+            output = self.call_command("--iterations", "1", "--file", f.name)
+        self.assertIn("1 sample(s), 1 iteration(s)", output)
+        self.assertIn("temporary directory: mean", output)
+        self.assertIn("workspace: mean", output)
+        self.assertIn("transform rules only: mean", output)
+        self.assertNotIn("per rule", output)
+
+    def test_benchmark_rules(self):
+        output = self.call_command("--iterations", "1", "--rules")
+        self.assertIn("4 sample(s), 1 iteration(s)", output)
+        self.assertIn("Mean time per lint call, per rule", output)
+        self.assertRegex(output, r"\nfqcn: [0-9.]+ ms \*\n")
+        self.assertRegex(output, r"\nno-changed-when: [0-9.]+ ms\n")
+
+    def test_invalid_iterations(self):
+        with self.assertRaises(CommandError):
+            self.call_command("--iterations", "0")
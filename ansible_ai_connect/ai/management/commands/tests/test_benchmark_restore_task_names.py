@@ -0,0 +1,43 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+
+
+class TestBenchmarkRestoreTaskNames(SimpleTestCase):
+    def call_command(self, *args):
+        out = StringIO()
+        call_command("benchmark_restore_task_names", *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    @override_settings(MULTI_TASK_MAX_REQUESTS=10)
+    def test_benchmark(self):
+        output = self.call_command("--iterations", "2")
+        self.assertIn("10 task(s), 40 context task(s), 2 iteration(s)", output)
+        self.assertIn("with the context document: mean", output)
+        self.assertIn("without the context document: mean", output)
+
+    def test_benchmark_tasks(self):
+        output = self.call_command("--iterations", "1", "--tasks", "3", "--context-tasks", "0")
+        self.assertIn("3 task(s), 0 context task(s), 1 iteration(s)", output)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(CommandError):
+            self.call_command("--iterations", "0")
+        with self.assertRaises(CommandError):
+            self.call_command("--tasks", "1")
@@ -15,6 +15,10 @@
 from django.apps.config import AppConfig
 from django.test import override_settings
 
+from ansible_ai_connect.ai.api.aws.wca_secret_manager import (
+    CachingSecretManager,
+    DummySecretManager,
+)
 from ansible_ai_connect.ai.api.model_pipelines.dummy.pipelines import (
     DummyCompletionsPipeline,
 )
@@ -32,6 +36,7 @@ from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_onprem import (
 from ansible_ai_connect.ai.api.model_pipelines.wca.pipelines_saas import (
     WCASaaSCompletionsPipeline,
 )
+from ansible_ai_connect.ansible_lint.pool import AnsibleLintPool
 from ansible_ai_connect.test_utils import WisdomServiceLogAwareTestCase
 from ansible_ai_connect.users.reports.exceptions import ReportConfigurationException
 from ansible_ai_connect.users.reports.postman import (
@@ -90,12 +95,39 @@ class TestAiApp(WisdomServiceLogAwareTestCase):
         app_config.ready()
         self.assertIsNotNone(app_config.get_ansible_lint_caller())
 
+    @override_settings(ENABLE_ANSIBLE_LINT_POSTPROCESS=True)
+    @override_settings(ENABLE_ANSIBLE_LINT_POOL=True)
+    @override_settings(ANSIBLE_LINT_POOL_WORKERS=1)
+    def test_enable_ansible_lint_pool(self):
+        app_config = AppConfig.create("ansible_ai_connect.ai")
+        app_config.ready()
+        ansible_lint_caller = app_config.get_ansible_lint_caller()
+        self.addCleanup(ansible_lint_caller.close)
+        self.assertIsInstance(ansible_lint_caller, AnsibleLintPool)
+
     @override_settings(ENABLE_ANSIBLE_LINT_POSTPROCESS=False)
     def test_disable_ansible_lint(self):
         app_config = AppConfig.create("ansible_ai_connect.ai")
         app_config.ready()
         self.assertIsNone(app_config.get_ansible_lint_caller())
 
+    @override_settings(WCA_SECRET_BACKEND_TYPE="dummy")
+    @override_settings(WCA_SECRET_MANAGER_CACHE_TIMEOUT_SEC=0)
+    @override_settings(WCA_SECRET_MANAGER_NEGATIVE_CACHE_TIMEOUT_SEC=0)
+    def test_wca_secret_manager_without_cache(self):
+        app_config = AppConfig.create("ansible_ai_connect.ai")
+        app_config.ready()
+        self.assertIsInstance(app_config.get_wca_secret_manager(), DummySecretManager)
+
+    @override_settings(WCA_SECRET_BACKEND_TYPE="dummy")
+    @override_settings(WCA_SECRET_MANAGER_CACHE_TIMEOUT_SEC=300)
+    def test_wca_secret_manager_with_cache(self):
+        app_config = AppConfig.create("ansible_ai_connect.ai")
+        app_config.ready()
+        secret_manager = app_config.get_wca_secret_manager()
+        self.assertIsInstance(secret_manager, CachingSecretManager)
+        self.assertIsInstance(secret_manager.delegate, DummySecretManager)
+
     @override_settings(ANSIBLE_AI_ONE_CLICK_REPORTS_POSTMAN="none")
     def test_reports_postman_none(self):
         app_config = AppConfig.create("ansible_ai_connect.ai")
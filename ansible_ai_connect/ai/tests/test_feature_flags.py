@@ -21,6 +21,7 @@ from ldclient.config import Config
 
 import ansible_ai_connect.ai.feature_flags as feature_flags
 from ansible_ai_connect.test_utils import WisdomServiceAPITestCaseBaseOIDC
+from ansible_ai_connect.users.models import User
 
 
 class TestFeatureFlags(WisdomServiceAPITestCaseBaseOIDC):
@@ -50,6 +51,19 @@ class TestFeatureFlags(WisdomServiceAPITestCaseBaseOIDC):
         self.assertEqual(config_arg[0].sdk_key, "dummy_key")
         self.assertEqual(kwargs["start_wait"], settings.LAUNCHDARKLY_SDK_TIMEOUT)
 
+    @override_settings(LAUNCHDARKLY_SDK_KEY="dummy_key")
+    @patch.object(feature_flags, "LDClient")
+    def test_feature_flags_user_groups(self, LDClient):
+        ff = feature_flags.FeatureFlags()
+        user = User.objects.get(pk=self.user.pk)
+
+        # Only the groups are loaded
+        with self.assertNumQueries(1):
+            ff.get("model_name", user, "default_value")
+
+        _, (_, user_context, _), _ = LDClient.return_value.variation.mock_calls[0]
+        self.assertCountEqual(user_context.get("groups"), ["Group 1", "Group 2"])
+
     @override_settings(LAUNCHDARKLY_SDK_KEY="dummy_key")
     @override_settings(LAUNCHDARKLY_SDK_TIMEOUT=40)
     @patch.object(feature_flags, "LDClient")
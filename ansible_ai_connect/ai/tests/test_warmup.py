@@ -0,0 +1,105 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from unittest.mock import Mock, patch
+
+from django.apps import apps
+from django.test import override_settings
+
+from ansible_ai_connect.ai.api.aws.wca_secret_manager import (
+    AWSSecretManager,
+    CachingSecretManager,
+)
+from ansible_ai_connect.ai.api.model_pipelines.factory import ModelPipelineFactory
+from ansible_ai_connect.ai.api.model_pipelines.pipelines import ModelPipelineCompletions
+from ansible_ai_connect.ai.warmup import WARM_UP_PIPELINES, warm_up, warm_up_hist
+from ansible_ai_connect.test_utils import (
+    WisdomAppsBackendMocking,
+    WisdomServiceLogAwareTestCase,
+)
+
+
+def get_count(step):
+    for metric in warm_up_hist.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_count") and sample.labels["step"] == step:
+                return sample.value
+    return 0
+
+
+@override_settings(WCA_SECRET_BACKEND_TYPE="dummy")
+class TestWarmUp(WisdomAppsBackendMocking, WisdomServiceLogAwareTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ai_config = apps.get_app_config("ai")
+        self.pipeline_factory = ModelPipelineFactory()
+        patcher = patch.object(self.ai_config, "_pipeline_factory", self.pipeline_factory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_warm_up(self):
+        steps = ["pipelines", "secret_manager", "ansible_lint", "completion", "total"]
+        counts = {step: get_count(step) for step in steps}
+
+        with self.assertLogs(logger="root", level="INFO") as log:
+            warm_up()
+            self.assertInLog("Worker warmed up in", log)
+            self.assertNotInLog("failed", log)
+
+        for step in steps:
+            self.assertEqual(get_count(step), counts[step] + 1)
+        for pipeline_type in WARM_UP_PIPELINES:
+            self.assertIsNotNone(self.pipeline_factory.cache[pipeline_type])
+
+    @override_settings(WORKER_WARM_UP_STEPS=["pipelines"])
+    def test_steps(self):
+        count = get_count("completion")
+        warm_up()
+        self.assertEqual(get_count("completion"), count)
+        self.assertIsNotNone(self.pipeline_factory.cache[ModelPipelineCompletions])
+
+    @override_settings(WORKER_WARM_UP_STEPS=["unknown", "completion"])
+    def test_unknown_step(self):
+        count = get_count("completion")
+        with self.assertLogs(logger="root", level="ERROR") as log:
+            warm_up()
+            self.assertInLog("Unknown worker warm-up step: 'unknown'", log)
+        self.assertEqual(get_count("completion"), count + 1)
+
+    @override_settings(WORKER_WARM_UP_STEPS=["pipelines", "completion"])
+    def test_failed_step(self):
+        count = get_count("completion")
+        with patch.object(
+            self.pipeline_factory, "get_pipeline", side_effect=RuntimeError("no pipeline")
+        ):
+            with self.assertLogs(logger="root", level="WARNING") as log:
+                warm_up()
+                self.assertInLog("Worker warm-up step 'pipelines' failed: no pipeline", log)
+        self.assertEqual(get_count("completion"), count + 1)
+
+    @override_settings(WORKER_WARM_UP_STEPS=["secret_manager"])
+    @patch("ansible_ai_connect.ai.api.aws.wca_secret_manager.boto3.client")
+    def test_secret_manager(self, client):
+        secret_manager = AWSSecretManager("key", "secret", "kms", "us-east-1", [])
+        self.mock_wca_secret_manager_with(CachingSecretManager(secret_manager, 60, 60))
+        warm_up()
+        client.assert_called_once()
+        self.assertIs(secret_manager.get_client(), client.return_value)
+
+    @override_settings(WORKER_WARM_UP_STEPS=["ansible_lint"])
+    def test_ansible_lint(self):
+        ansible_lint_caller = Mock()
+        self.mock_ansible_lint_caller_with(ansible_lint_caller)
+        warm_up()
+        ansible_lint_caller.run_linter.assert_called_once()
@@ -0,0 +1,149 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import logging
+import time
+from typing import cast
+
+from django.apps import apps
+from django.conf import settings
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Histogram
+
+from ansible_ai_connect.ai.api import formatter as fmtr
+from ansible_ai_connect.ai.api.aws.wca_secret_manager import (
+    AWSSecretManager,
+    CachingSecretManager,
+)
+from ansible_ai_connect.ai.api.model_pipelines.dummy.configuration import (
+    DEFAULT_BODY,
+    DummyConfiguration,
+)
+from ansible_ai_connect.ai.api.model_pipelines.dummy.pipelines import (
+    DummyCompletionsPipeline,
+)
+from ansible_ai_connect.ai.api.model_pipelines.pipelines import (
+    CompletionsParameters,
+    ModelPipelineChatBot,
+    ModelPipelineCompletions,
+    ModelPipelineContentMatch,
+    ModelPipelinePlaybookExplanation,
+    ModelPipelinePlaybookGeneration,
+    ModelPipelineRoleExplanation,
+    ModelPipelineRoleGeneration,
+    ModelPipelineStreamingChatBot,
+)
+
+logger = logging.getLogger(__name__)
+
+warm_up_hist = Histogram(
+    "worker_warm_up_duration_seconds",
+    "Histogram of the warm-up time of the workers, per step",
+    ["step"],
+    namespace=NAMESPACE,
+)
+
+WARM_UP_PIPELINES = [
+    ModelPipelineCompletions,
+    ModelPipelineContentMatch,
+    ModelPipelinePlaybookGeneration,
+    ModelPipelineRoleGeneration,
+    ModelPipelinePlaybookExplanation,
+    ModelPipelineRoleExplanation,
+    ModelPipelineChatBot,
+    ModelPipelineStreamingChatBot,
+]
+
+WARM_UP_CONTEXT = "---\n- hosts: all\n  become: true\n  tasks:\n"
+WARM_UP_PROMPT = "    - name: Install nginx\n"
+
+
+def _get_ai_config():
+    from ansible_ai_connect.ai.apps import AiConfig
+
+    return cast(AiConfig, apps.get_app_config("ai"))
+
+
+def warm_up_pipelines():
+    ai_config = _get_ai_config()
+    for pipeline_type in WARM_UP_PIPELINES:
+        ai_config.get_model_pipeline(pipeline_type)
+
+
+def warm_up_secret_manager():
+    secret_manager = _get_ai_config().get_wca_secret_manager()
+    if isinstance(secret_manager, CachingSecretManager):
+        secret_manager = secret_manager.delegate
+    if isinstance(secret_manager, AWSSecretManager):
+        secret_manager.get_client()
+
+
+def warm_up_ansible_lint():
+    if ansible_lint_caller := _get_ai_config().get_ansible_lint_caller():
+        ansible_lint_caller.run_linter(f"{WARM_UP_PROMPT.lstrip()}  package:\n    name: nginx\n")
+
+
+def warm_up_completion():
+    """Runs a synthetic completion through the dummy pipeline and the formatter."""
+    context, prompt = fmtr.preprocess(WARM_UP_CONTEXT, WARM_UP_PROMPT)
+    pipeline = DummyCompletionsPipeline(
+        DummyConfiguration(
+            enable_health_check=False,
+            latency_use_jitter=False,
+            latency_max_msec=0,
+            body=DEFAULT_BODY,
+        )
+    )
+    response = pipeline.invoke(
+        CompletionsParameters.init(
+            request=None, model_input={"instances": [{"context": context, "prompt": prompt}]}
+        )
+    )
+    prediction = response["predictions"][0]
+    _ = fmtr.YamlDocument(prediction).data
+    original_indent = len(prompt) - len(prompt.lstrip())
+    fmtr.restore_indentation(fmtr.adjust_indentation(prediction), original_indent)
+    fmtr.get_fqcn_or_module_from_prediction(prediction)
+
+
+WARM_UP_STEPS = {
+    "pipelines": warm_up_pipelines,
+    "secret_manager": warm_up_secret_manager,
+    "ansible_lint": warm_up_ansible_lint,
+    "completion": warm_up_completion,
+}
+
+
+def warm_up():
+    """
+    Runs the WORKER_WARM_UP_STEPS, which build the objects the first requests
+    of a worker would otherwise build lazily. With uwsgi lazy-apps, it runs in
+    the worker after the fork and before the worker accepts requests. A failed
+    step is logged and skipped.
+    """
+    start = time.perf_counter()
+    for step in settings.WORKER_WARM_UP_STEPS:
+        func = WARM_UP_STEPS.get(step)
+        if func is None:
+            logger.error(f"Unknown worker warm-up step: '{step}'")
+            continue
+        step_start = time.perf_counter()
+        try:
+            func()
+        except Exception as exc:
+            logger.warning(f"Worker warm-up step '{step}' failed: {exc}")
+        warm_up_hist.labels(step=step).observe(time.perf_counter() - step_start)
+    duration = time.perf_counter() - start
+    warm_up_hist.labels(step="total").observe(duration)
+    logger.info(f"Worker warmed up in {duration:.3f}s")
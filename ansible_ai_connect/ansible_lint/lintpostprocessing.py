@@ -12,38 +12,311 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import hashlib
+import itertools
+import json
 import logging
 import os
+import shutil
 import tempfile
-from copy import deepcopy
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from copy import copy, deepcopy
+from typing import Any, Callable, Optional
 
 from ansiblelint.app import get_app
 from ansiblelint.config import Options
 from ansiblelint.config import options as default_options
 from ansiblelint.constants import DEFAULT_RULESDIR
-from ansiblelint.rules import RulesCollection
-from ansiblelint.runner import LintResult, get_matches
+from ansiblelint.file_utils import Lintable
+from ansiblelint.rules import RulesCollection, TransformMixin
+from ansiblelint.runner import LintResult, Runner, get_matches
 from ansiblelint.transformer import Transformer
+from ansiblelint.version import __version__ as ansible_lint_version
 from django.conf import settings
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter
 
 logger = logging.getLogger(__name__)
 
+lint_cache_lookup_counter = Counter(
+    "ansible_lint_cache_lookups",
+    "Counter of ansible-lint post-processing cache lookups",
+    ["result"],
+    namespace=NAMESPACE,
+)
+lint_cache_saved_bytes_counter = Counter(
+    "ansible_lint_cache_saved_bytes",
+    "Counter of the bytes of YAML that weren't linted thanks to the ansible-lint cache",
+    namespace=NAMESPACE,
+)
+
 TEMP_TASK_FOLDER = "tasks"
+# Default parent of the lint workspaces, when available
+RAM_BACKED_DIR = "/dev/shm"
 
 
-class AnsibleLintCaller:
-    def __init__(self) -> None:
-        self.config_options = deepcopy(default_options)
-        # Specify app for ansible-lint PR #4891 - https://github.com/ansible/ansible-lint/pull/4891
-        self.default_rules_collection = RulesCollection(
-            app=get_app(offline=True), rulesdirs=[DEFAULT_RULESDIR]
-        )
-        self.config_options.write_list = settings.ANSIBLE_LINT_TRANSFORM_RULES
+def _remove_workspace(root: str, pid: int):
+    # A forked worker must not remove the workspace of its parent
+    if os.getpid() == pid:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+class LintWorkspace:
+    """
+    Per-worker tasks/ directory the snippets are linted in, created once and
+    reused across the lint calls. It is created under RAM_BACKED_DIR by default.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        if root is None and os.path.isdir(RAM_BACKED_DIR):
+            root = RAM_BACKED_DIR
+        self.pid = os.getpid()
+        self.root = tempfile.mkdtemp(prefix="ansible-lint-", dir=root)
+        self.tasks_dir = os.path.join(self.root, TEMP_TASK_FOLDER)
+        os.mkdir(self.tasks_dir)
+        self._counter = itertools.count()
+        self._finalizer = weakref.finalize(self, _remove_workspace, self.root, self.pid)
+
+    def get_path(self) -> str:
+        # ansible-lint caches the parsed files by name, so each snippet gets its own.
+        return os.path.join(self.tasks_dir, f"{next(self._counter)}.yml")
+
+    def get_dir(self) -> str:
+        """Creates a directory for the files of a role."""
+        path = os.path.join(self.root, f"role-{next(self._counter)}")
+        os.mkdir(path)
+        return path
+
+    def cleanup(self):
+        self._finalizer()
+
+
+class LintResultCache:
+    """
+    Per-worker LRU cache of the ansible-lint transformed snippets and roles.
+
+    Entries are keyed by a digest of the snippet, the transform rules and the
+    ansible-lint version, and expire after ANSIBLE_LINT_CACHE_TIMEOUT_SEC.
+    """
+
+    def __init__(self):
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(inline_completion: str, write_list: list[str]) -> tuple:
+        digest = hashlib.sha256(inline_completion.encode("utf-8")).hexdigest()
+        return digest, tuple(write_list), ansible_lint_version
+
+    def get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: tuple, value: Any):
+        expires_at = time.monotonic() + settings.ANSIBLE_LINT_CACHE_TIMEOUT_SEC
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.ANSIBLE_LINT_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+lint_result_cache = LintResultCache()
+
+
+class InMemoryLintable(Lintable):
+    """Lintable whose transformed content is kept in memory instead of written back."""
+
+    def write(self, *, force: bool = False) -> None:
+        pass
+
+
+class BaseLintCaller:
+    """
+    run_linter() returns the snippet fixed by lint(), and run_linter_on_role()
+    the role files fixed by lint_role(), from the cache when
+    ENABLE_ANSIBLE_LINT_CACHE is set, or unchanged when the linting failed.
+    """
 
     def run_linter(
         self,
         inline_completion: str,
     ) -> str:
+        return self._run_cached("snippet", inline_completion, inline_completion, self.lint)
+
+    def run_linter_on_role(self, files: dict[str, str]) -> dict[str, str]:
+        # The cache key covers the paths and the contents of the files
+        text = json.dumps(files, sort_keys=True)
+        return dict(self._run_cached("role", text, files, self.lint_role))
+
+    def _run_cached(self, kind: str, text: str, value: Any, lint: Callable[[Any], Any]) -> Any:
+        key = None
+        if settings.ENABLE_ANSIBLE_LINT_CACHE:
+            key = (kind, *LintResultCache.get_key(text, settings.ANSIBLE_LINT_TRANSFORM_RULES))
+            cached = lint_result_cache.get(key)
+            if cached is not None:
+                lint_cache_lookup_counter.labels(result="hit").inc()
+                lint_cache_saved_bytes_counter.inc(len(text.encode("utf-8")))
+                return cached
+            lint_cache_lookup_counter.labels(result="miss").inc()
+
+        try:
+            transformed = lint(value)
+        except Exception as exc:
+            logger.exception(f"Lint Post-Processing resulted into exception: {exc}")
+            # Failures aren't cached
+            return value
+        if key:
+            lint_result_cache.set(key, transformed)
+        return transformed
+
+    def lint(self, inline_completion: str) -> str:
+        """Returns the transformed snippet, raises the ansible-lint exceptions."""
+        raise NotImplementedError
+
+    def lint_role(self, files: dict[str, str]) -> dict[str, str]:
+        """
+        Returns the transformed files of a role, keyed by their path, raises
+        the ansible-lint exceptions.
+        """
+        raise NotImplementedError
+
+
+_default_rules_collection: Optional[RulesCollection] = None
+_rules_collections_lock = threading.Lock()
+
+
+def get_default_rules_collection() -> RulesCollection:
+    """
+    Returns the RulesCollection of the default rules, loaded once per process.
+    The rules don't keep any state between the files they match, so that the
+    collection is shared by the callers and their threads.
+    """
+    global _default_rules_collection
+    with _rules_collections_lock:
+        if _default_rules_collection is None:
+            # Specify app for ansible-lint PR #4891
+            # https://github.com/ansible/ansible-lint/pull/4891
+            _default_rules_collection = RulesCollection(
+                app=get_app(offline=True), rulesdirs=[DEFAULT_RULESDIR]
+            )
+        return _default_rules_collection
+
+
+# Rules that decide whether a file is linted, and transformed, at all
+CORE_RULES_TAG = "core"
+
+_transform_rules_collections: dict[tuple[str, ...], RulesCollection] = {}
+
+
+def get_transform_rules_collection(write_list: list[str]) -> RulesCollection:
+    """
+    Returns the default RulesCollection restricted to the core rules and to
+    the rules whose transforms are enabled by write_list. The other rules
+    can't change the transformed snippet, there is no need to evaluate them.
+    """
+    default_collection = get_default_rules_collection()
+    with _rules_collections_lock:
+        collection = _transform_rules_collections.get(tuple(write_list))
+        if collection is None:
+            # The same selection as the Transformer
+            write_set = Transformer.effective_write_set(write_list)
+            collection = copy(default_collection)
+            collection.rules = [
+                rule
+                for rule in default_collection.rules
+                if CORE_RULES_TAG in rule.tags
+                or (
+                    isinstance(rule, TransformMixin)
+                    and (write_set == {"all"} or not write_set.isdisjoint({rule.id, *rule.tags}))
+                )
+            ]
+            _transform_rules_collections[tuple(write_list)] = collection
+        return collection
+
+
+class AnsibleLintCaller(BaseLintCaller):
+    """
+    Lints the snippets with the default rules, or only the core and transform
+    ones with ENABLE_ANSIBLE_LINT_TRANSFORM_ONLY, and applies the transforms of
+    ANSIBLE_LINT_TRANSFORM_RULES.
+
+    A caller can be used by several threads at once: the rules collection and
+    the options are only read while linting, the lintables, runner and
+    options of a lint call are its own.
+    """
+
+    def __init__(self, transform_only: Optional[bool] = None) -> None:
+        self.config_options = deepcopy(default_options)
+        self.default_rules_collection = get_default_rules_collection()
+        self.config_options.write_list = settings.ANSIBLE_LINT_TRANSFORM_RULES
+        if transform_only is None:
+            transform_only = settings.ENABLE_ANSIBLE_LINT_TRANSFORM_ONLY
+        self.rules_collection = (
+            get_transform_rules_collection(self.config_options.write_list)
+            if transform_only
+            else self.default_rules_collection
+        )
+        self._workspace: Optional[LintWorkspace] = None
+        self._workspace_lock = threading.Lock()
+
+    def lint(self, inline_completion: str) -> str:
+        if settings.ENABLE_ANSIBLE_LINT_WORKSPACE:
+            return self._lint_in_workspace(inline_completion)
+        with tempfile.TemporaryDirectory() as tmp_root:
+            return self._lint(inline_completion, tmp_root)
+
+    def lint_role(self, files: dict[str, str]) -> dict[str, str]:
+        if settings.ENABLE_ANSIBLE_LINT_WORKSPACE:
+            role_dir = self.get_workspace().get_dir()
+            try:
+                return self._lint_role(files, role_dir)
+            finally:
+                shutil.rmtree(role_dir, ignore_errors=True)
+        with tempfile.TemporaryDirectory() as role_dir:
+            return self._lint_role(files, role_dir)
+
+    def _lint_role(self, files: dict[str, str], role_dir: str) -> dict[str, str]:
+        """
+        Lints the files of a role with a single Runner. The files are written
+        under their path, from which ansible-lint guesses their kind: tasks,
+        handlers, vars, ...
+        """
+        lintables: dict[str, Lintable] = {}
+        for path, content in files.items():
+            relative_path = os.path.normpath(path)
+            if os.path.isabs(relative_path) or relative_path.split(os.sep)[0] == os.pardir:
+                raise ValueError(f"Invalid path of a role file: {path}")
+            file_path = os.path.join(role_dir, relative_path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, mode="w", encoding="utf-8") as role_file:
+                role_file.write(content)
+            lintables[path] = InMemoryLintable(file_path, content=content)
+
+        result = self.get_lintable_matches(*lintables.values())
+        for match in result.matches:
+            # The tasks notify the handlers by name, renaming them would break the role
+            if match.rule.id == "name" and match.lintable.kind == "handlers":
+                match.ignored = True
+        self.run_transform(result, self.config_options)
+        return {path: lintable.content for path, lintable in lintables.items()}
+
+    def run_linter_in_temporary_directory(self, inline_completion: str) -> str:
         with tempfile.TemporaryDirectory() as tmp_root:
             return self._run_linter(
                 inline_completion,
@@ -55,35 +328,89 @@ class AnsibleLintCaller:
         inline_completion: str,
         tmp_root: str,
     ) -> str:
+        try:
+            return self._lint(inline_completion, tmp_root)
+        except Exception as exc:
+            logger.exception(f"Lint Post-Processing resulted into exception: {exc}")
+        return inline_completion
+
+    def _lint(self, inline_completion: str, tmp_root: str) -> str:
         """Runs the Runner to populate a LintResult for a given snippet."""
-        transformed_completion = inline_completion
+        # Since the suggestions are tasks, for ansible-lint to run in write mode correctly it
+        # needs to identity the temporary file as tasks file, and for that to happen the
+        # temporary file needs to be be under tasks folder. Thus, creating a temporary file
+        # under tasks folder.
+        tmp_dir = os.path.join(tmp_root, TEMP_TASK_FOLDER)
+        if os.path.isdir(tmp_dir):
+            raise RuntimeError("Task directory already exists")
+        os.mkdir(tmp_dir)
+        with tempfile.NamedTemporaryFile(
+            suffix=".yml", dir=tmp_dir, mode="w", delete=False
+        ) as temp_file:
+            # write the YAML string to the file
+            temp_file.write(inline_completion)
+            # get the path to the file
+            temp_completion_path = temp_file.name
+
+        # The options of the caller are shared with the concurrent calls
+        options = copy(self.config_options)
+        options.lintables = [temp_completion_path]
+        result = get_matches(rules=self.rules_collection, options=options)
+        self.run_transform(result, options)
+
+        # read the transformed file
+        with open(temp_completion_path, encoding="utf-8") as yaml_file:
+            return yaml_file.read()
+
+    def get_workspace(self) -> LintWorkspace:
+        with self._workspace_lock:
+            if self._workspace is None or self._workspace.pid != os.getpid():
+                self._workspace = LintWorkspace(settings.ANSIBLE_LINT_WORKSPACE_DIR)
+            return self._workspace
+
+    def run_linter_in_workspace(self, inline_completion: str) -> str:
+        """
+        Lints a snippet in the reused workspace. The snippet is only written
+        for ansible-lint to find it, the transformed text is kept in memory.
+        """
+        try:
+            return self._lint_in_workspace(inline_completion)
+        except Exception as exc:
+            logger.exception(f"Lint Post-Processing resulted into exception: {exc}")
+        return inline_completion
+
+    def _lint_in_workspace(self, inline_completion: str) -> str:
+        temp_completion_path = self.get_workspace().get_path()
         try:
-            # Since the suggestions are tasks, for ansible-lint to run in write mode correctly it
-            # needs to identity the temporary file as tasks file, and for that to happen the
-            # temporary file needs to be be under tasks folder. Thus, creating a temporary file
-            # under tasks folder.
-            tmp_dir = os.path.join(tmp_root, TEMP_TASK_FOLDER)
-            if os.path.isdir(tmp_dir):
-                raise RuntimeError("Task directory already exists")
-            os.mkdir(tmp_dir)
-            with tempfile.NamedTemporaryFile(
-                suffix=".yml", dir=tmp_dir, mode="w", delete=False
-            ) as temp_file:
-                # write the YAML string to the file
+            with open(temp_completion_path, mode="w", encoding="utf-8") as temp_file:
                 temp_file.write(inline_completion)
-                # get the path to the file
-                temp_completion_path = temp_file.name
 
-            self.config_options.lintables = [temp_completion_path]
-            result = get_matches(rules=self.default_rules_collection, options=self.config_options)
+            lintable = InMemoryLintable(temp_completion_path, content=inline_completion)
+            result = self.get_lintable_matches(lintable)
             self.run_transform(result, self.config_options)
+            return lintable.content
+        finally:
+            try:
+                os.unlink(temp_completion_path)
+            except FileNotFoundError:
+                pass
 
-            # read the transformed file
-            with open(temp_completion_path, encoding="utf-8") as yaml_file:
-                transformed_completion = yaml_file.read()
-        except Exception as exc:
-            logger.exception(f"Lint Post-Processing resulted into exception: {exc}")
-        return transformed_completion
+    def get_lintable_matches(self, *lintables: Lintable) -> LintResult:
+        """get_matches() for Lintable instances rather than the paths of the options."""
+        options = self.config_options
+        checked_files: set[Lintable] = set()
+        runner = Runner(
+            *lintables,
+            rules=self.rules_collection,
+            tags=frozenset(options.tags),
+            skip_list=options.skip_list,
+            exclude_paths=options.exclude_paths,
+            verbosity=options.verbosity,
+            checked_files=checked_files,
+            project_dir=options.project_dir,
+            _skip_ansible_syntax_check=options._skip_ansible_syntax_check,
+        )
+        return LintResult(matches=sorted(set(runner.run())), files=checked_files)
 
     def run_transform(self, lint_result: LintResult, config_options: Options):
         transformer = Transformer(result=lint_result, options=config_options)
@@ -0,0 +1,250 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+from typing import Any, Callable
+
+from django.conf import settings
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter, Gauge
+
+from ansible_ai_connect.ansible_lint.lintpostprocessing import (
+    AnsibleLintCaller,
+    BaseLintCaller,
+)
+
+logger = logging.getLogger(__name__)
+
+lint_pool_jobs_counter = Counter(
+    "ansible_lint_pool_jobs",
+    "Counter of the jobs of the ansible-lint worker pool, per result",
+    ["result"],
+    namespace=NAMESPACE,
+)
+lint_pool_queue_depth_gauge = Gauge(
+    "ansible_lint_pool_queue_depth",
+    "Number of jobs waiting for an ansible-lint worker",
+    namespace=NAMESPACE,
+)
+lint_pool_worker_restarts_counter = Counter(
+    "ansible_lint_pool_worker_restarts",
+    "Counter of the restarted ansible-lint workers, per reason",
+    ["reason"],
+    namespace=NAMESPACE,
+)
+
+# Seconds a stopped worker is given to exit before being killed
+WORKER_STOP_TIMEOUT_SEC = 5
+# Interval at which an idle worker checks that its parent is still alive
+WORKER_PARENT_CHECK_INTERVAL_SEC = 1
+# Imported by the forkserver, which the workers are forked from
+FORKSERVER_PRELOAD = ["ansible_ai_connect.ansible_lint.pool_preload"]
+
+
+class LintTimeoutError(Exception):
+    pass
+
+
+class LintQueueFullError(Exception):
+    pass
+
+
+def get_python_executable() -> str:
+    """
+    Returns the Python interpreter the forkserver is started with:
+    sys.executable is the uwsgi binary in the uwsgi workers.
+    """
+    if os.path.basename(sys.executable).startswith("uwsgi"):
+        return os.path.join(sys.exec_prefix, "bin", "python3")
+    return sys.executable
+
+
+def _serve(conn: Connection, caller_factory: Callable[[], BaseLintCaller]):
+    """
+    Main loop of a worker: calls the lint method of the caller built by
+    caller_factory with the argument received, until None is received.
+    """
+    caller = caller_factory()
+    # The parent of the worker is the forkserver, which exits with the uwsgi
+    # worker, even when it was killed by harakiri: the worker exits with it.
+    parent_pid = os.getppid()
+    while os.getppid() == parent_pid:
+        if not conn.poll(WORKER_PARENT_CHECK_INTERVAL_SEC):
+            continue
+        job = conn.recv()
+        if job is None:
+            return
+        method, argument = job
+        try:
+            conn.send((True, getattr(caller, method)(argument)))
+        except Exception as exc:
+            conn.send((False, f"{exc.__class__.__name__}: {exc}"))
+
+
+class LintWorker:
+    def __init__(self, context, caller_factory: Callable[[], BaseLintCaller]):
+        self.conn, worker_conn = context.Pipe()
+        self.process = context.Process(
+            target=_serve,
+            args=(worker_conn, caller_factory),
+            name="ansible-lint-worker",
+            daemon=True,
+        )
+        self.process.start()
+        worker_conn.close()
+        self.jobs = 0
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+            self.process.join(WORKER_STOP_TIMEOUT_SEC)
+        except OSError:
+            pass
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class AnsibleLintPool(BaseLintCaller):
+    """
+    Pool of ANSIBLE_LINT_POOL_WORKERS processes, each linting with the caller
+    built by caller_factory.
+
+    The workers are forked from a forkserver, which has the default rules
+    already loaded, rather than from the uwsgi worker: its other threads may
+    hold locks, e.g. of the logging, that would never be released in the
+    forked worker. Each lint job is given ANSIBLE_LINT_POOL_TIMEOUT_SEC to
+    complete, including the wait for an idle worker, after which the
+    suggestion is returned un-linted and the worker killed and replaced. At
+    most ANSIBLE_LINT_POOL_MAX_QUEUE jobs wait for a worker, the next ones are
+    rejected. The workers are recycled after ANSIBLE_LINT_POOL_MAX_JOBS jobs.
+    The workers are replaced by a background thread, not by the request.
+    """
+
+    def __init__(self, caller_factory: Callable[[], BaseLintCaller] = AnsibleLintCaller):
+        self._context = multiprocessing.get_context("forkserver")
+        self._context.set_executable(get_python_executable())
+        self._context.set_forkserver_preload(FORKSERVER_PRELOAD)
+        self._caller_factory = caller_factory
+        self._closed = False
+        self._slots = threading.BoundedSemaphore(
+            settings.ANSIBLE_LINT_POOL_WORKERS + settings.ANSIBLE_LINT_POOL_MAX_QUEUE
+        )
+        self._workers: queue.LifoQueue[LintWorker] = queue.LifoQueue()
+        for _ in range(settings.ANSIBLE_LINT_POOL_WORKERS):
+            self._workers.put(LintWorker(self._context, self._caller_factory))
+
+    def lint(self, inline_completion: str) -> str:
+        return self._run("lint", inline_completion)
+
+    def lint_role(self, files: dict[str, str]) -> dict[str, str]:
+        return self._run("lint_role", files)
+
+    def _run(self, method: str, argument: Any) -> Any:
+        if not self._slots.acquire(blocking=False):
+            lint_pool_jobs_counter.labels(result="rejected").inc()
+            raise LintQueueFullError("Too many jobs waiting for an ansible-lint worker")
+        try:
+            return self._run_in_worker(method, argument)
+        finally:
+            self._slots.release()
+
+    def _run_in_worker(self, method: str, argument: Any) -> Any:
+        deadline = time.monotonic() + settings.ANSIBLE_LINT_POOL_TIMEOUT_SEC
+        lint_pool_queue_depth_gauge.inc()
+        try:
+            worker = self._workers.get(timeout=settings.ANSIBLE_LINT_POOL_TIMEOUT_SEC)
+        except queue.Empty:
+            lint_pool_jobs_counter.labels(result="timeout").inc()
+            raise LintTimeoutError("No ansible-lint worker available")
+        finally:
+            lint_pool_queue_depth_gauge.dec()
+
+        try:
+            worker.conn.send((method, argument))
+            if not worker.conn.poll(max(0.0, deadline - time.monotonic())):
+                lint_pool_jobs_counter.labels(result="timeout").inc()
+                raise LintTimeoutError(
+                    f"ansible-lint took more than {settings.ANSIBLE_LINT_POOL_TIMEOUT_SEC}s"
+                )
+            succeeded, value = worker.conn.recv()
+        except Exception as exc:
+            worker.kill()
+            reason = "timeout" if isinstance(exc, LintTimeoutError) else "died"
+            if reason == "died":
+                lint_pool_jobs_counter.labels(result="error").inc()
+            logger.warning(f"Restarting the ansible-lint worker {worker.process.pid}: {reason}")
+            self._replace(worker, reason)
+            raise
+
+        worker.jobs += 1
+        if worker.jobs >= settings.ANSIBLE_LINT_POOL_MAX_JOBS:
+            self._replace(worker, "recycled")
+        else:
+            self._workers.put(worker)
+
+        if not succeeded:
+            lint_pool_jobs_counter.labels(result="error").inc()
+            raise RuntimeError(value)
+        lint_pool_jobs_counter.labels(result="ok").inc()
+        return value
+
+    def _replace(self, worker: LintWorker, reason: str):
+        threading.Thread(
+            target=self._restart,
+            args=(worker, reason),
+            name="ansible-lint-pool-restart",
+            daemon=True,
+        ).start()
+
+    def _restart(self, worker: LintWorker, reason: str):
+        """
+        Stops the worker, or kills it unless it is recycled, and starts its
+        replacement.
+        """
+        if reason == "recycled":
+            worker.stop()
+        else:
+            worker.kill()
+        lint_pool_worker_restarts_counter.labels(reason=reason).inc()
+        if self._closed:
+            return
+        try:
+            new_worker = LintWorker(self._context, self._caller_factory)
+        except Exception:
+            logger.exception("Failed to start an ansible-lint worker")
+            return
+        if self._closed:
+            new_worker.stop()
+        else:
+            self._workers.put(new_worker)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._workers.get_nowait().stop()
+            except queue.Empty:
+                return
@@ -0,0 +1,32 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+"""
+Imported by the forkserver of the ansible-lint pool, before it forks any
+worker: the workers inherit the pool module, the Django settings and the
+rules of the AnsibleLintCaller, already loaded.
+"""
+
+import logging
+
+from ansible_ai_connect.ansible_lint import pool  # noqa: F401
+from ansible_ai_connect.ansible_lint.lintpostprocessing import AnsibleLintCaller
+
+logger = logging.getLogger(__name__)
+
+try:
+    AnsibleLintCaller()
+except Exception as exc:
+    # The workers load the rules themselves
+    logger.warning(f"Failed to preload the ansible-lint rules: {exc}")
@@ -12,14 +12,31 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import json
 import os
 import shutil
 import tempfile
 from multiprocessing.pool import ThreadPool
+from unittest.mock import patch
 
+from ansiblelint.runner import Runner
+from django.test import override_settings
+
+from ansible_ai_connect.ai.api.model_pipelines.pipelines import (
+    DUMMY_PLAYBOOK,
+    DUMMY_ROLE_FILES,
+)
 from ansible_ai_connect.ansible_lint.lintpostprocessing import (
+    CORE_RULES_TAG,
     TEMP_TASK_FOLDER,
     AnsibleLintCaller,
+    LintResultCache,
+    LintWorkspace,
+    get_default_rules_collection,
+    get_transform_rules_collection,
+    lint_cache_lookup_counter,
+    lint_cache_saved_bytes_counter,
+    lint_result_cache,
 )
 from ansible_ai_connect.test_utils import WisdomServiceLogAwareTestCase
 
@@ -109,3 +126,365 @@ class TestLintPostprocessing(WisdomServiceLogAwareTestCase):
             task_dir = os.path.join(tempfile.tempdir, TEMP_TASK_FOLDER)
             if os.path.isdir(task_dir):
                 shutil.rmtree(task_dir)
+
+
+@override_settings(ENABLE_ANSIBLE_LINT_WORKSPACE=True)
+class TestLintPostprocessingInWorkspace(WisdomServiceLogAwareTestCase):
+    """Test AnsibleLintCaller with the reused workspace"""
+
+    def setUp(self):
+        super().setUp()
+        self.ansibleLintCaller = AnsibleLintCaller()
+        self.addCleanup(lambda: self.ansibleLintCaller.get_workspace().cleanup())
+
+    def test_ansible_lint_caller(self):
+        result = self.ansibleLintCaller.run_linter(normal_sample_yaml)
+        self.assertEqual(result, normal_fixed_sample_yaml)
+
+    def test_same_result_as_temporary_directory(self):
+        for sample in [
+            normal_sample_yaml,
+            "- name: hello\n  debug: msg=hello\n",
+            "- name: Install nginx\n  package:\n    name: nginx\n    state: present\n",
+            "- name: include\n  include_tasks: other.yml\n",
+        ]:
+            self.assertEqual(
+                self.ansibleLintCaller.run_linter(sample),
+                self.ansibleLintCaller.run_linter_in_temporary_directory(sample),
+            )
+
+    def test_ansible_lint_caller_with_error(self):
+        with self.assertLogs(logger="root", level="ERROR") as log:
+            result = self.ansibleLintCaller.run_linter(error_sample_yaml)
+            self.assertEqual(result, error_sample_yaml)
+            self.assertInLog(
+                "ruamel.yaml.scanner.ScannerError: while scanning a simple key",
+                log,
+            )
+
+    def test_workspace_is_reused(self):
+        workspace = self.ansibleLintCaller.get_workspace()
+        with patch("tempfile.TemporaryDirectory") as temporary_directory:
+            self.ansibleLintCaller.run_linter(normal_sample_yaml)
+            self.ansibleLintCaller.run_linter(normal_sample_yaml)
+        temporary_directory.assert_not_called()
+        self.assertIs(self.ansibleLintCaller.get_workspace(), workspace)
+        self.assertEqual(os.listdir(workspace.tasks_dir), [])
+
+    def test_workspace_is_recreated_after_fork(self):
+        workspace = self.ansibleLintCaller.get_workspace()
+        with patch("os.getpid", return_value=workspace.pid + 1):
+            forked_workspace = self.ansibleLintCaller.get_workspace()
+        self.assertIsNot(forked_workspace, workspace)
+        # Only removed by the process that created it
+        forked_workspace.cleanup()
+        self.assertTrue(os.path.isdir(forked_workspace.root))
+        shutil.rmtree(forked_workspace.root)
+
+    def test_multi_thread(self):
+        with ThreadPool(5) as pool:
+            results = pool.map(self.ansibleLintCaller.run_linter, [normal_sample_yaml] * 10)
+        self.assertEqual(results, [normal_fixed_sample_yaml] * 10)
+
+    def test_workspace_dir(self):
+        with tempfile.TemporaryDirectory() as root:
+            workspace = LintWorkspace(root)
+            self.assertEqual(os.path.dirname(workspace.root), root)
+            self.assertTrue(os.path.isdir(os.path.join(workspace.root, TEMP_TASK_FOLDER)))
+            workspace.cleanup()
+            self.assertFalse(os.path.exists(workspace.root))
+
+
+class TestLintPostprocessingConcurrency(WisdomServiceLogAwareTestCase):
+    """Test a single AnsibleLintCaller shared by concurrent threads"""
+
+    SAMPLES = [
+        (
+            f"- name: Task {i}\n  debug: msg=hello{i}\n"
+            if i % 2
+            else f"- name: Task {i}\n  package:\n     name: package{i}\n     state: present\n"
+        )
+        for i in range(48)
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.ansibleLintCaller = AnsibleLintCaller()
+        # Linted one at a time by another caller
+        caller = AnsibleLintCaller()
+        self.expected = [caller.run_linter(sample) for sample in self.SAMPLES]
+        for i, (sample, expected) in enumerate(zip(self.SAMPLES, self.expected)):
+            self.assertNotEqual(expected, sample)
+            self.assertIn(f"Task {i}\n", expected)
+
+    def assert_parallel_results(self):
+        with self.assertLogs(logger="root", level="DEBUG") as log:
+            with ThreadPool(8) as pool:
+                results = pool.map(self.ansibleLintCaller.run_linter, self.SAMPLES, chunksize=1)
+            self.assertNotInLog("Lint Post-Processing resulted into exception", log)
+        self.assertEqual(results, self.expected)
+        self.assertEqual(self.ansibleLintCaller.config_options.lintables, [])
+
+    def test_stress(self):
+        self.assert_parallel_results()
+
+    @override_settings(ENABLE_ANSIBLE_LINT_WORKSPACE=True)
+    def test_stress_in_workspace(self):
+        self.addCleanup(lambda: self.ansibleLintCaller.get_workspace().cleanup())
+        self.assert_parallel_results()
+
+    def test_rules_collection_is_shared(self):
+        self.assertIs(
+            AnsibleLintCaller().default_rules_collection,
+            self.ansibleLintCaller.default_rules_collection,
+        )
+        self.assertIs(
+            get_default_rules_collection(), self.ansibleLintCaller.default_rules_collection
+        )
+
+
+@override_settings(ENABLE_ANSIBLE_LINT_CACHE=True)
+@override_settings(ANSIBLE_LINT_CACHE_TIMEOUT_SEC=60)
+@override_settings(ANSIBLE_LINT_CACHE_MAX_ENTRIES=2)
+class TestLintResultCache(WisdomServiceLogAwareTestCase):
+    """Test the cache of the ansible-lint transformed snippets"""
+
+    def setUp(self):
+        super().setUp()
+        self.ansibleLintCaller = AnsibleLintCaller()
+        lint_result_cache.clear()
+        self.addCleanup(lint_result_cache.clear)
+
+    def test_hit(self):
+        hits = lint_cache_lookup_counter.labels(result="hit")._value.get()
+        misses = lint_cache_lookup_counter.labels(result="miss")._value.get()
+        saved_bytes = lint_cache_saved_bytes_counter._value.get()
+
+        self.assertEqual(
+            self.ansibleLintCaller.run_linter(normal_sample_yaml), normal_fixed_sample_yaml
+        )
+        with patch.object(self.ansibleLintCaller, "lint") as lint:
+            self.assertEqual(
+                self.ansibleLintCaller.run_linter(normal_sample_yaml), normal_fixed_sample_yaml
+            )
+        lint.assert_not_called()
+
+        self.assertEqual(lint_cache_lookup_counter.labels(result="hit")._value.get(), hits + 1)
+        self.assertEqual(lint_cache_lookup_counter.labels(result="miss")._value.get(), misses + 1)
+        self.assertEqual(
+            lint_cache_saved_bytes_counter._value.get(), saved_bytes + len(normal_sample_yaml)
+        )
+
+    def test_shared_by_the_callers(self):
+        self.ansibleLintCaller.run_linter(normal_sample_yaml)
+        other_caller = AnsibleLintCaller()
+        with patch.object(other_caller, "lint") as lint:
+            self.assertEqual(other_caller.run_linter(normal_sample_yaml), normal_fixed_sample_yaml)
+        lint.assert_not_called()
+
+    def test_failures_are_not_cached(self):
+        with patch.object(self.ansibleLintCaller, "lint", side_effect=RuntimeError("error")):
+            with self.assertLogs(logger="root", level="ERROR") as log:
+                self.assertEqual(
+                    self.ansibleLintCaller.run_linter(normal_sample_yaml), normal_sample_yaml
+                )
+            self.assertInLog("Lint Post-Processing resulted into exception: error", log)
+        self.assertEqual(
+            self.ansibleLintCaller.run_linter(normal_sample_yaml), normal_fixed_sample_yaml
+        )
+
+    def test_expiration(self):
+        with patch("ansible_ai_connect.ansible_lint.lintpostprocessing.time.monotonic") as now:
+            now.return_value = 1000.0
+            lint_result_cache.set(("a",), "a")
+            now.return_value = 1059.0
+            self.assertEqual(lint_result_cache.get(("a",)), "a")
+            now.return_value = 1060.0
+            self.assertIsNone(lint_result_cache.get(("a",)))
+
+    def test_least_recently_used_are_evicted(self):
+        lint_result_cache.set(("a",), "a")
+        lint_result_cache.set(("b",), "b")
+        lint_result_cache.get(("a",))
+        lint_result_cache.set(("c",), "c")
+        self.assertEqual(lint_result_cache.get(("a",)), "a")
+        self.assertIsNone(lint_result_cache.get(("b",)))
+        self.assertEqual(lint_result_cache.get(("c",)), "c")
+
+    def test_key(self):
+        self.assertEqual(
+            LintResultCache.get_key(normal_sample_yaml, ["all"]),
+            LintResultCache.get_key(normal_sample_yaml, ["all"]),
+        )
+        self.assertNotEqual(
+            LintResultCache.get_key(normal_sample_yaml, ["all"]),
+            LintResultCache.get_key(normal_sample_yaml, ["fqcn"]),
+        )
+        self.assertNotEqual(
+            LintResultCache.get_key(normal_sample_yaml, ["all"]),
+            LintResultCache.get_key(normal_fixed_sample_yaml, ["all"]),
+        )
+
+
+# Model responses of the completions, playbook and role generations
+MODEL_RESPONSES = [
+    normal_sample_yaml,
+    error_sample_yaml,
+    DUMMY_PLAYBOOK,
+    *[f["content"] for f in DUMMY_ROLE_FILES],
+    "- name: install nginx\n  yum: name=nginx state=latest\n",
+    "- name: Copy the configuration\n"
+    "  copy:\n"
+    "    src: nginx.conf\n"
+    "    dest: /etc/nginx/nginx.conf\n"
+    "    mode: 0644\n"
+    "  become_user: root\n",
+    "- name: Print the version\n  shell: echo {{version}}\n  when: '{{ version is defined }}'\n",
+    "- name: Run locally\n  local_action: command uptime\n",
+    "- name: Restart the service\n"
+    "  when: restart | bool\n"
+    "  ansible.builtin.service:\n"
+    "    name: httpd\n"
+    "    state: restarted\n"
+    "  become: yes\n",
+    "- hosts: all\n"
+    "  tasks:\n"
+    "    - name: Create a user\n"
+    "      user:\n"
+    "        name: johnd\n"
+    "        password: secret\n"
+    "    - name: Ping\n"
+    "      ping:\n",
+    "install_packages:\n  - nginx\n  - httpd\n",
+]
+
+
+class TestTransformRulesOnly(WisdomServiceLogAwareTestCase):
+    """Test the lint profile with the core and transform rules only"""
+
+    def test_same_result_as_all_rules(self):
+        caller = AnsibleLintCaller(transform_only=False)
+        transform_caller = AnsibleLintCaller(transform_only=True)
+        with self.assertLogs(logger="root", level="DEBUG"):
+            for response in MODEL_RESPONSES:
+                self.assertEqual(transform_caller.run_linter(response), caller.run_linter(response))
+
+    @override_settings(ENABLE_ANSIBLE_LINT_WORKSPACE=True)
+    def test_same_result_as_all_rules_in_workspace(self):
+        caller = AnsibleLintCaller(transform_only=False)
+        transform_caller = AnsibleLintCaller(transform_only=True)
+        self.addCleanup(lambda: caller.get_workspace().cleanup())
+        self.addCleanup(lambda: transform_caller.get_workspace().cleanup())
+        with self.assertLogs(logger="root", level="DEBUG"):
+            for response in MODEL_RESPONSES:
+                self.assertEqual(transform_caller.run_linter(response), caller.run_linter(response))
+
+    @override_settings(ENABLE_ANSIBLE_LINT_TRANSFORM_ONLY=True)
+    def test_enabled_by_settings(self):
+        caller = AnsibleLintCaller()
+        self.assertIs(caller.rules_collection, get_transform_rules_collection(["all"]))
+        self.assertLess(len(caller.rules_collection), len(caller.default_rules_collection))
+        self.assertEqual(caller.run_linter(normal_sample_yaml), normal_fixed_sample_yaml)
+
+    def test_disabled_by_default(self):
+        caller = AnsibleLintCaller()
+        self.assertIs(caller.rules_collection, caller.default_rules_collection)
+
+    def test_rules(self):
+        core_rule_ids = {
+            rule.id for rule in get_default_rules_collection().rules if CORE_RULES_TAG in rule.tags
+        }
+        self.assertIn("syntax-check", core_rule_ids)
+        self.assertEqual(
+            {rule.id for rule in get_transform_rules_collection(["fqcn", "formatting"]).rules},
+            core_rule_ids | {"fqcn", "jinja", "key-order", "yaml"},
+        )
+        self.assertEqual(
+            {rule.id for rule in get_transform_rules_collection(["all", "none"]).rules},
+            core_rule_ids,
+        )
+        self.assertNotIn(
+            "no-changed-when", {rule.id for rule in get_transform_rules_collection(["all"]).rules}
+        )
+
+
+ROLE_FILES = {
+    "roles/foo_bar/tasks/main.yml": "- name: install emacs\n"
+    "  package:\n"
+    "     name: emacs\n"
+    "  notify: restart emacs\n",
+    "roles/foo_bar/handlers/main.yml": "- name: restart emacs\n"
+    "  service:\n"
+    "    name: emacs\n"
+    "    state: restarted\n",
+    "roles/foo_bar/defaults/main.yml": "emacs_packages:\n  - emacs",
+}
+
+FIXED_ROLE_FILES = {
+    "roles/foo_bar/tasks/main.yml": "---\n"
+    "- name: Install emacs\n"
+    "  ansible.builtin.package:\n"
+    "    name: emacs\n"
+    "  notify: restart emacs\n",
+    "roles/foo_bar/handlers/main.yml": "---\n"
+    "- name: restart emacs\n"
+    "  ansible.builtin.service:\n"
+    "    name: emacs\n"
+    "    state: restarted\n",
+    "roles/foo_bar/defaults/main.yml": "---\nemacs_packages:\n  - emacs\n",
+}
+
+
+class TestLintRole(WisdomServiceLogAwareTestCase):
+    """Test the linting of the files of a role at once"""
+
+    def setUp(self):
+        super().setUp()
+        self.ansibleLintCaller = AnsibleLintCaller()
+
+    def test_lint_role(self):
+        self.assertEqual(self.ansibleLintCaller.run_linter_on_role(ROLE_FILES), FIXED_ROLE_FILES)
+
+    def test_single_runner(self):
+        with patch(
+            "ansible_ai_connect.ansible_lint.lintpostprocessing.Runner", wraps=Runner
+        ) as runner:
+            self.ansibleLintCaller.run_linter_on_role(ROLE_FILES)
+        runner.assert_called_once()
+        self.assertEqual(len(runner.call_args.args), len(ROLE_FILES))
+
+    def test_same_result_as_tasks_files(self):
+        path = "roles/foo_bar/tasks/main.yml"
+        self.assertEqual(
+            self.ansibleLintCaller.run_linter_on_role(ROLE_FILES)[path],
+            self.ansibleLintCaller.run_linter(ROLE_FILES[path]),
+        )
+
+    @override_settings(ENABLE_ANSIBLE_LINT_WORKSPACE=True)
+    def test_lint_role_in_workspace(self):
+        workspace = self.ansibleLintCaller.get_workspace()
+        self.addCleanup(workspace.cleanup)
+        self.assertEqual(self.ansibleLintCaller.run_linter_on_role(ROLE_FILES), FIXED_ROLE_FILES)
+        self.assertEqual(os.listdir(workspace.root), [TEMP_TASK_FOLDER])
+
+    def test_invalid_path(self):
+        files = {"../tasks/main.yml": ROLE_FILES["roles/foo_bar/tasks/main.yml"]}
+        with self.assertLogs(logger="root", level="ERROR") as log:
+            self.assertEqual(self.ansibleLintCaller.run_linter_on_role(files), files)
+            self.assertInLog("Invalid path of a role file: ../tasks/main.yml", log)
+
+    @override_settings(ENABLE_ANSIBLE_LINT_CACHE=True)
+    def test_cache(self):
+        lint_result_cache.clear()
+        self.addCleanup(lint_result_cache.clear)
+        self.ansibleLintCaller.run_linter_on_role(ROLE_FILES)
+        with patch.object(self.ansibleLintCaller, "lint_role") as lint_role:
+            self.assertEqual(
+                self.ansibleLintCaller.run_linter_on_role(ROLE_FILES), FIXED_ROLE_FILES
+            )
+        lint_role.assert_not_called()
+        # A snippet and a role are cached separately
+        text = json.dumps(ROLE_FILES, sort_keys=True)
+        with patch.object(self.ansibleLintCaller, "lint", return_value="snippet") as lint:
+            self.assertEqual(self.ansibleLintCaller.run_linter(text), "snippet")
+        lint.assert_called_once()
@@ -0,0 +1,170 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import os
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from ansible_ai_connect.ansible_lint.pool import (
+    AnsibleLintPool,
+    LintQueueFullError,
+    LintTimeoutError,
+    LintWorker,
+    lint_pool_jobs_counter,
+    lint_pool_worker_restarts_counter,
+)
+from ansible_ai_connect.ansible_lint.tests.stub_lint_caller import StubLintCaller
+from ansible_ai_connect.ansible_lint.tests.test_lintpostprocessing import (
+    FIXED_ROLE_FILES,
+    ROLE_FILES,
+    normal_fixed_sample_yaml,
+    normal_sample_yaml,
+)
+from ansible_ai_connect.test_utils import WisdomServiceLogAwareTestCase
+
+
+def get_restarts(reason):
+    return lint_pool_worker_restarts_counter.labels(reason=reason)._value.get()
+
+
+@override_settings(ANSIBLE_LINT_POOL_WORKERS=1)
+@override_settings(ANSIBLE_LINT_POOL_TIMEOUT_SEC=0.5)
+@override_settings(ANSIBLE_LINT_POOL_MAX_QUEUE=1)
+@override_settings(ANSIBLE_LINT_POOL_MAX_JOBS=100)
+class TestAnsibleLintPool(WisdomServiceLogAwareTestCase):
+
+    def get_pool(self):
+        pool = AnsibleLintPool(StubLintCaller)
+        self.addCleanup(pool.close)
+        return pool
+
+    @override_settings(ANSIBLE_LINT_POOL_TIMEOUT_SEC=30)
+    def test_lint(self):
+        pool = AnsibleLintPool()
+        self.addCleanup(pool.close)
+        self.assertEqual(pool.run_linter(normal_sample_yaml), normal_fixed_sample_yaml)
+
+    @override_settings(ANSIBLE_LINT_POOL_TIMEOUT_SEC=30)
+    def test_lint_role(self):
+        pool = AnsibleLintPool()
+        self.addCleanup(pool.close)
+        self.assertEqual(pool.run_linter_on_role(ROLE_FILES), FIXED_ROLE_FILES)
+
+    def test_lint_in_worker_process(self):
+        pool = self.get_pool()
+        pid = pool.run_linter("- name: test")
+        self.assertNotEqual(pid, str(os.getpid()))
+        self.assertEqual(pool.run_linter("- name: test"), pid)
+
+    def test_timeout(self):
+        pool = self.get_pool()
+        pid = pool.run_linter("- name: test")
+        restarts = get_restarts("timeout")
+
+        with self.assertLogs(logger="root", level="ERROR") as log:
+            self.assertEqual(pool.run_linter("sleep"), "sleep")
+            self.assertInLog("LintTimeoutError", log)
+
+        # Waits for the replacement of the worker
+        new_pid = pool.run_linter("- name: test")
+        self.assertTrue(new_pid.isdigit())
+        self.assertNotEqual(new_pid, pid)
+        self.assertEqual(get_restarts("timeout"), restarts + 1)
+
+    def test_worker_died(self):
+        pool = self.get_pool()
+        restarts = get_restarts("died")
+
+        with self.assertLogs(logger="root", level="ERROR"):
+            self.assertEqual(pool.run_linter("exit"), "exit")
+
+        self.assertTrue(pool.run_linter("- name: test").isdigit())
+        self.assertEqual(get_restarts("died"), restarts + 1)
+
+    def test_error(self):
+        pool = self.get_pool()
+        pid = pool.run_linter("- name: test")
+        errors = lint_pool_jobs_counter.labels(result="error")._value.get()
+
+        with self.assertLogs(logger="root", level="ERROR") as log:
+            self.assertEqual(pool.run_linter("error"), "error")
+            self.assertInLog("ValueError: invalid snippet", log)
+
+        self.assertEqual(lint_pool_jobs_counter.labels(result="error")._value.get(), errors + 1)
+        # The worker is reused
+        self.assertEqual(pool.run_linter("- name: test"), pid)
+
+    @override_settings(ANSIBLE_LINT_POOL_MAX_JOBS=2)
+    def test_recycled(self):
+        pool = self.get_pool()
+        restarts = get_restarts("recycled")
+
+        pids = [pool.run_linter("- name: test") for _ in range(3)]
+
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertEqual(get_restarts("recycled"), restarts + 1)
+
+    @override_settings(ANSIBLE_LINT_POOL_MAX_JOBS=1)
+    def test_recycled_in_background(self):
+        pool = self.get_pool()
+        threads = []
+        lint_worker = LintWorker
+
+        def start_worker(*args):
+            threads.append(threading.current_thread())
+            return lint_worker(*args)
+
+        with patch("ansible_ai_connect.ansible_lint.pool.LintWorker", side_effect=start_worker):
+            pool.run_linter("- name: test")
+            # Waits for the replacement of the recycled worker
+            pool.run_linter("- name: test")
+
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def occupy_worker(self, pool):
+        thread = threading.Thread(target=pool.run_linter, args=("sleep",))
+        thread.start()
+        time.sleep(0.1)
+        return thread
+
+    @override_settings(ANSIBLE_LINT_POOL_MAX_QUEUE=0)
+    def test_queue_full(self):
+        pool = self.get_pool()
+        rejected = lint_pool_jobs_counter.labels(result="rejected")._value.get()
+
+        with self.assertLogs(logger="root", level="ERROR"):
+            thread = self.occupy_worker(pool)
+            with self.assertRaises(LintQueueFullError):
+                pool.lint("- name: test")
+            thread.join()
+
+        self.assertEqual(
+            lint_pool_jobs_counter.labels(result="rejected")._value.get(), rejected + 1
+        )
+
+    def test_no_worker_available(self):
+        pool = self.get_pool()
+
+        with self.assertLogs(logger="root", level="ERROR"):
+            thread = self.occupy_worker(pool)
+            # Give up before the job occupying the worker times out
+            with self.settings(ANSIBLE_LINT_POOL_TIMEOUT_SEC=0.1):
+                with self.assertRaisesRegex(LintTimeoutError, "No ansible-lint worker available"):
+                    pool.lint("- name: test")
+            thread.join()
@@ -17,7 +17,6 @@ import logging
 import time
 import uuid
 
-from ansible_anonymizer import anonymizer
 from django.conf import settings
 from django.middleware.csrf import CsrfViewMiddleware, get_token
 from rest_framework.exceptions import ErrorDetail, PermissionDenied
@@ -30,6 +29,7 @@ from ansible_ai_connect.ai.api.telemetry.schema2 import (
     AnalyticsTelemetryEvents,
 )
 from ansible_ai_connect.ai.api.utils import segment_analytics_telemetry
+from ansible_ai_connect.ai.api.utils.anonymization import get_request_anonymizer
 from ansible_ai_connect.ai.api.utils.segment import send_segment_event
 from ansible_ai_connect.ai.api.utils.segment_analytics_telemetry import (
     send_segment_analytics_event,
@@ -226,10 +226,13 @@ class SegmentMiddleware:
 
                 duration = round((time.time() - start_time) * 1000, 2)
                 tasks = getattr(response, "tasks", [])
+                request_anonymizer = get_request_anonymizer(request)
                 event = {
                     "duration": duration,
-                    "request": anonymizer.anonymize_struct({"context": context, "prompt": prompt}),
-                    "response": anonymizer.anonymize_struct(
+                    "request": request_anonymizer.anonymize_struct(
+                        {"context": context, "prompt": prompt}, "segment_completion"
+                    ),
+                    "response": request_anonymizer.anonymize_struct(
                         {
                             "exception": getattr(response, "exception", None),
                             # See main.exception_handler.exception_handler_with_error_type
@@ -240,13 +243,14 @@ class SegmentMiddleware:
                             "predictions": predictions,
                             "status_code": response.status_code,
                             "status_text": getattr(response, "status_text", None),
-                        }
+                        },
+                        "segment_completion",
                     ),
                     "suggestionId": request_suggestion_id,
-                    "metadata": anonymizer.anonymize_struct(metadata),
+                    "metadata": request_anonymizer.anonymize_struct(metadata, "segment_completion"),
                     "modelName": model_name,
                     "imageTags": version_info.image_tags,
-                    "tasks": anonymizer.anonymize_struct(tasks),
+                    "tasks": request_anonymizer.anonymize_struct(tasks, "segment_completion"),
                     "promptType": promptType,
                     "taskCount": len(tasks),
                 }
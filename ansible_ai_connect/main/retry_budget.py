@@ -0,0 +1,150 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from django.conf import settings
+from django_prometheus.conf import NAMESPACE
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+retry_budget_exhausted_counter = Counter(
+    "retry_budget_exhausted",
+    "Counter of retries that were skipped because the retry budget was exhausted",
+    ["backend"],
+    namespace=NAMESPACE,
+)
+retry_budget_tokens_gauge = Gauge(
+    "retry_budget_tokens",
+    "Number of retries currently left in the retry budget",
+    ["backend"],
+    namespace=NAMESPACE,
+)
+
+
+class RetryBudget:
+    """
+    Per-worker retry budget of a backend, shared by all its backoff call sites.
+
+    The budget is a token bucket of at most RETRY_BUDGET_MAX_TOKENS tokens. Each
+    successful call deposits RETRY_BUDGET_PERCENT / 100 tokens, the bucket also
+    refills at RETRY_BUDGET_MIN_RETRIES_PER_SEC so that a quiet backend can still
+    be retried, and each retry withdraws a token. When the bucket is empty the
+    failure is returned to the caller instead of being retried.
+
+    Usage with backoff.on_exception(), built for each call:
+
+        retries = budget.retries(fatal_exception, max_tries)
+        backoff.on_exception(
+            ...,
+            max_tries=max_tries,
+            giveup=retries.giveup,
+            on_backoff=[retries.on_backoff, on_backoff],
+            on_giveup=retries.on_giveup,
+            on_success=retries.on_success,
+        )
+    """
+
+    def __init__(self, backend: str):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._tokens: Optional[float] = None
+        self._updated_at = time.monotonic()
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            return self._refill()
+
+    def _refill(self) -> float:
+        now = time.monotonic()
+        max_tokens = settings.RETRY_BUDGET_MAX_TOKENS
+        if self._tokens is None:
+            self._tokens = float(max_tokens)
+        else:
+            refill = (now - self._updated_at) * settings.RETRY_BUDGET_MIN_RETRIES_PER_SEC
+            self._tokens = min(float(max_tokens), self._tokens + refill)
+        self._updated_at = now
+        retry_budget_tokens_gauge.labels(backend=self.backend).set(self._tokens)
+        return self._tokens
+
+    def _add(self, tokens: float):
+        with self._lock:
+            self._refill()
+            self._tokens = max(
+                0.0, min(float(settings.RETRY_BUDGET_MAX_TOKENS), self._tokens + tokens)
+            )
+            retry_budget_tokens_gauge.labels(backend=self.backend).set(self._tokens)
+
+    def try_withdraw(self) -> bool:
+        """Withdraw the token of a retry, return False if the budget is exhausted."""
+        if not settings.ENABLE_RETRY_BUDGET:
+            return True
+        with self._lock:
+            if self._refill() >= 1:
+                self._tokens -= 1
+                retry_budget_tokens_gauge.labels(backend=self.backend).set(self._tokens)
+                return True
+        logger.warning(f"Retry budget of {self.backend} exhausted, not retrying")
+        retry_budget_exhausted_counter.labels(backend=self.backend).inc()
+        return False
+
+    def deposit(self, tokens: Optional[float] = None):
+        if settings.ENABLE_RETRY_BUDGET:
+            self._add(settings.RETRY_BUDGET_PERCENT / 100 if tokens is None else tokens)
+
+    def retries(self, fatal_exception: Callable[[Exception], bool], max_tries: int) -> "Retries":
+        return Retries(self, fatal_exception, max_tries)
+
+
+class Retries:
+    """
+    The backoff handlers of a single call retried with at most max_tries tries.
+
+    backoff evaluates giveup() before its own max_tries check, so the token of a
+    retry is only withdrawn when the failed try isn't the last one. It is
+    refunded if backoff gives up nevertheless.
+    """
+
+    def __init__(
+        self, budget: RetryBudget, fatal_exception: Callable[[Exception], bool], max_tries: int
+    ):
+        self.budget = budget
+        self.fatal_exception = fatal_exception
+        self.max_tries = max_tries
+        self._tries = 0
+        self._reserved = False
+
+    def giveup(self, e: Exception) -> bool:
+        self._tries += 1
+        if self.fatal_exception(e) or self._tries >= self.max_tries:
+            return True
+        self._reserved = self.budget.try_withdraw()
+        return not self._reserved
+
+    def on_backoff(self, details):
+        # The reserved token is spent by this retry
+        self._reserved = False
+
+    def on_giveup(self, details):
+        if self._reserved:
+            self._reserved = False
+            self.budget.deposit(1)
+
+    def on_success(self, details):
+        self.budget.deposit()
@@ -498,9 +498,94 @@ ENABLE_ANSIBLE_LINT_POSTPROCESS = (
 )
 
 ANSIBLE_LINT_TRANSFORM_RULES = ["all"]
+# Only evaluate the rules that transform the snippets, and the core ones.
+ENABLE_ANSIBLE_LINT_TRANSFORM_ONLY = (
+    os.getenv("ENABLE_ANSIBLE_LINT_TRANSFORM_ONLY", "False").lower() == "true"
+)
+# Lint in a per-worker workspace reused across the calls, under /dev/shm by default.
+ENABLE_ANSIBLE_LINT_WORKSPACE = (
+    os.getenv("ENABLE_ANSIBLE_LINT_WORKSPACE", "False").lower() == "true"
+)
+ANSIBLE_LINT_WORKSPACE_DIR = os.getenv("ANSIBLE_LINT_WORKSPACE_DIR")
+# Per-worker cache of the ansible-lint transformed snippets.
+ENABLE_ANSIBLE_LINT_CACHE = os.getenv("ENABLE_ANSIBLE_LINT_CACHE", "False").lower() == "true"
+ANSIBLE_LINT_CACHE_TIMEOUT_SEC = int(os.getenv("ANSIBLE_LINT_CACHE_TIMEOUT_SEC", 3600))
+ANSIBLE_LINT_CACHE_MAX_ENTRIES = int(os.getenv("ANSIBLE_LINT_CACHE_MAX_ENTRIES", 1000))
+# Lint in a pool of processes, with a timeout per call. Each uwsgi worker starts a forkserver
+# with the rules loaded, and ANSIBLE_LINT_POOL_WORKERS processes forked from it, which are
+# replaced by a background thread. See ansible_lint/pool.py.
+ENABLE_ANSIBLE_LINT_POOL = os.getenv("ENABLE_ANSIBLE_LINT_POOL", "False").lower() == "true"
+ANSIBLE_LINT_POOL_WORKERS = int(os.getenv("ANSIBLE_LINT_POOL_WORKERS", 2))
+ANSIBLE_LINT_POOL_TIMEOUT_SEC = float(os.getenv("ANSIBLE_LINT_POOL_TIMEOUT_SEC", 10))
+ANSIBLE_LINT_POOL_MAX_QUEUE = int(os.getenv("ANSIBLE_LINT_POOL_MAX_QUEUE", 8))
+ANSIBLE_LINT_POOL_MAX_JOBS = int(os.getenv("ANSIBLE_LINT_POOL_MAX_JOBS", 500))
+# Build the heavy objects in each worker before it accepts requests, see ai/warmup.py.
+ENABLE_WORKER_WARM_UP = os.getenv("ENABLE_WORKER_WARM_UP", "False").lower() == "true"
+WORKER_WARM_UP_STEPS = [
+    s.strip()
+    for s in os.getenv(
+        "WORKER_WARM_UP_STEPS", "pipelines,secret_manager,ansible_lint,completion"
+    ).split(",")
+    if s.strip()
+]
 
 ENABLE_ADDITIONAL_CONTEXT = os.getenv("ENABLE_ADDITIONAL_CONTEXT", "False").lower() == "true"
 
+# Per-worker cache of the normalized plays and tasks of the completion contexts.
+ENABLE_NORMALIZED_YAML_CACHE = os.getenv("ENABLE_NORMALIZED_YAML_CACHE", "False").lower() == "true"
+NORMALIZED_YAML_CACHE_MAX_BYTES = int(
+    os.getenv("NORMALIZED_YAML_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+)
+
+# Per-worker cache of the vars parsed from the additional context, scoped per organization.
+ENABLE_PARSED_VARS_CACHE = os.getenv("ENABLE_PARSED_VARS_CACHE", "False").lower() == "true"
+PARSED_VARS_CACHE_MAX_BYTES = int(os.getenv("PARSED_VARS_CACHE_MAX_BYTES", 4 * 1024 * 1024))
+
+# Per-worker cache of post-processed completions, scoped per organization.
+ENABLE_COMPLETION_RESULT_CACHE = (
+    os.getenv("ENABLE_COMPLETION_RESULT_CACHE", "False").lower() == "true"
+)
+COMPLETION_RESULT_CACHE_TIMEOUT_SEC = int(os.getenv("COMPLETION_RESULT_CACHE_TIMEOUT_SEC", 300))
+COMPLETION_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("COMPLETION_RESULT_CACHE_MAX_ENTRIES", 1000))
+
+# Identical in-flight completion requests share a single model server call.
+ENABLE_COMPLETION_COALESCING = os.getenv("ENABLE_COMPLETION_COALESCING", "False").lower() == "true"
+# Also coalesce requests across workers through the shared cache.
+COMPLETION_COALESCING_CROSS_WORKER = (
+    os.getenv("COMPLETION_COALESCING_CROSS_WORKER", "False").lower() == "true"
+)
+COMPLETION_COALESCING_TIMEOUT_SEC = int(os.getenv("COMPLETION_COALESCING_TIMEOUT_SEC", 30))
+
+# Per-worker circuit breakers of the WCA API endpoints.
+ENABLE_WCA_CIRCUIT_BREAKER = os.getenv("ENABLE_WCA_CIRCUIT_BREAKER", "False").lower() == "true"
+WCA_CIRCUIT_BREAKER_WINDOW_SIZE = int(os.getenv("WCA_CIRCUIT_BREAKER_WINDOW_SIZE", 20))
+WCA_CIRCUIT_BREAKER_MINIMUM_CALLS = int(os.getenv("WCA_CIRCUIT_BREAKER_MINIMUM_CALLS", 10))
+WCA_CIRCUIT_BREAKER_FAILURE_RATE_THRESHOLD = float(
+    os.getenv("WCA_CIRCUIT_BREAKER_FAILURE_RATE_THRESHOLD") or "0.5"
+)
+WCA_CIRCUIT_BREAKER_SLOW_CALL_DURATION_SEC = float(
+    os.getenv("WCA_CIRCUIT_BREAKER_SLOW_CALL_DURATION_SEC") or "20.0"
+)
+WCA_CIRCUIT_BREAKER_SLOW_CALL_RATE_THRESHOLD = float(
+    os.getenv("WCA_CIRCUIT_BREAKER_SLOW_CALL_RATE_THRESHOLD") or "0.8"
+)
+WCA_CIRCUIT_BREAKER_OPEN_DURATION_SEC = int(os.getenv("WCA_CIRCUIT_BREAKER_OPEN_DURATION_SEC", 30))
+WCA_CIRCUIT_BREAKER_HALF_OPEN_CALLS = int(os.getenv("WCA_CIRCUIT_BREAKER_HALF_OPEN_CALLS", 3))
+
+# Per-worker retry budgets of the WCA, IBM Cloud IAM, SSO and AMS backends.
+ENABLE_RETRY_BUDGET = os.getenv("ENABLE_RETRY_BUDGET", "False").lower() == "true"
+RETRY_BUDGET_PERCENT = float(os.getenv("RETRY_BUDGET_PERCENT") or "20.0")
+RETRY_BUDGET_MIN_RETRIES_PER_SEC = float(os.getenv("RETRY_BUDGET_MIN_RETRIES_PER_SEC") or "1.0")
+RETRY_BUDGET_MAX_TOKENS = int(os.getenv("RETRY_BUDGET_MAX_TOKENS", 10))
+
+# Hedged WCA codegen requests, limited by a per-organization budget.
+ENABLE_WCA_CODEGEN_HEDGING = os.getenv("ENABLE_WCA_CODEGEN_HEDGING", "False").lower() == "true"
+WCA_CODEGEN_HEDGING_PERCENTILE = float(os.getenv("WCA_CODEGEN_HEDGING_PERCENTILE") or "95.0")
+WCA_CODEGEN_HEDGING_DEFAULT_DELAY_SEC = float(
+    os.getenv("WCA_CODEGEN_HEDGING_DEFAULT_DELAY_SEC") or "3.0"
+)
+WCA_CODEGEN_HEDGING_BUDGET_PERCENT = float(os.getenv("WCA_CODEGEN_HEDGING_BUDGET_PERCENT") or "5.0")
+
 LAUNCHDARKLY_SDK_KEY = os.getenv("LAUNCHDARKLY_SDK_KEY", "")
 LAUNCHDARKLY_SDK_TIMEOUT = os.getenv("LAUNCHDARKLY_SDK_TIMEOUT", 20)
 
@@ -520,6 +605,12 @@ WCA_SECRET_MANAGER_PRIMARY_REGION = os.getenv("WCA_SECRET_MANAGER_PRIMARY_REGION
 WCA_SECRET_MANAGER_REPLICA_REGIONS = [
     c.strip() for c in os.getenv("WCA_SECRET_MANAGER_REPLICA_REGIONS", "").split(",") if c
 ]
+# Per-worker cache of the WCA secrets, 0 disables the cache.
+WCA_SECRET_MANAGER_CACHE_TIMEOUT_SEC = int(os.getenv("WCA_SECRET_MANAGER_CACHE_TIMEOUT_SEC", 0))
+WCA_SECRET_MANAGER_NEGATIVE_CACHE_TIMEOUT_SEC = int(
+    os.getenv("WCA_SECRET_MANAGER_NEGATIVE_CACHE_TIMEOUT_SEC", 0)
+)
+WCA_SECRET_MANAGER_CACHE_MAX_ENTRIES = int(os.getenv("WCA_SECRET_MANAGER_CACHE_MAX_ENTRIES", 10000))
 
 CSP_SELF = "'self'"
 
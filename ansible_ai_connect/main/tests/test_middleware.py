@@ -155,7 +155,8 @@ class TestMiddleware(
 
     @override_settings(SEGMENT_WRITE_KEY="DUMMY_KEY_VALUE")
     @patch(
-        "ansible_ai_connect.ai.api.pipelines.completion_stages.pre_process.fmtr.preprocess",
+        "ansible_ai_connect.ai.api.pipelines.completion_stages.pre_process.fmtr"
+        ".preprocess_document",
         side_effect=Exception,
     )
     def test_preprocess_error(self, preprocess):
@@ -0,0 +1,186 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from unittest.mock import Mock, patch
+
+import backoff
+from django.test import SimpleTestCase, override_settings
+
+from ansible_ai_connect.main.retry_budget import (
+    RetryBudget,
+    retry_budget_exhausted_counter,
+    retry_budget_tokens_gauge,
+)
+
+
+@override_settings(ENABLE_RETRY_BUDGET=True)
+@override_settings(RETRY_BUDGET_PERCENT=50)
+@override_settings(RETRY_BUDGET_MIN_RETRIES_PER_SEC=0.5)
+@override_settings(RETRY_BUDGET_MAX_TOKENS=2)
+class TestRetryBudget(SimpleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        patcher = patch(
+            "ansible_ai_connect.main.retry_budget.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.budget = RetryBudget("test")
+
+    def get_retrying_function(self, side_effect, max_tries=4):
+        target = Mock(side_effect=side_effect)
+
+        def call():
+            retries = self.budget.retries(lambda e: isinstance(e, KeyError), max_tries)
+
+            @backoff.on_exception(
+                backoff.expo,
+                Exception,
+                max_tries=max_tries,
+                jitter=backoff.full_jitter,
+                giveup=retries.giveup,
+                on_backoff=retries.on_backoff,
+                on_giveup=retries.on_giveup,
+                on_success=retries.on_success,
+            )
+            def retried_call():
+                return target()
+
+            return retried_call()
+
+        return call, target
+
+    def get_exhausted(self):
+        return retry_budget_exhausted_counter.labels(backend="test")._value.get()
+
+    def test_starts_full(self):
+        self.assertEqual(self.budget.tokens, 2)
+        self.assertEqual(retry_budget_tokens_gauge.labels(backend="test")._value.get(), 2)
+
+    def test_withdraw_and_deposit(self):
+        self.assertTrue(self.budget.try_withdraw())
+        self.assertTrue(self.budget.try_withdraw())
+        self.assertFalse(self.budget.try_withdraw())
+        self.assertEqual(self.budget.tokens, 0)
+
+        self.budget.deposit()
+        self.assertEqual(self.budget.tokens, 0.5)
+        self.budget.deposit()
+        self.assertTrue(self.budget.try_withdraw())
+
+    def test_refills_over_time(self):
+        self.budget.try_withdraw()
+        self.budget.try_withdraw()
+
+        self.now += 1
+        self.assertEqual(self.budget.tokens, 0.5)
+        self.now += 10
+        self.assertEqual(self.budget.tokens, 2)
+
+    def test_deposit_is_capped(self):
+        for _ in range(10):
+            self.budget.deposit()
+        self.assertEqual(self.budget.tokens, 2)
+
+    @patch("backoff._sync.time.sleep")
+    def test_retries_are_limited_by_the_budget(self, _):
+        before = self.get_exhausted()
+        call, target = self.get_retrying_function(ValueError())
+
+        with self.assertRaises(ValueError):
+            call()
+
+        # The first try and the two retries left in the budget
+        self.assertEqual(target.call_count, 3)
+        self.assertEqual(self.budget.tokens, 0)
+        self.assertEqual(self.get_exhausted(), before + 1)
+
+    @patch("backoff._sync.time.sleep")
+    def test_last_try_does_not_use_the_budget(self, _):
+        self.budget.try_withdraw()
+        before = self.get_exhausted()
+        call, target = self.get_retrying_function(ValueError(), max_tries=2)
+
+        with self.assertRaises(ValueError):
+            call()
+
+        # The only retry wanted withdrew the last token
+        self.assertEqual(target.call_count, 2)
+        self.assertEqual(self.budget.tokens, 0)
+        self.assertEqual(self.get_exhausted(), before)
+
+    @patch("backoff._sync.time.sleep")
+    def test_no_retry_wanted_is_not_exhausted(self, _):
+        self.budget.try_withdraw()
+        self.budget.try_withdraw()
+        before = self.get_exhausted()
+        call, target = self.get_retrying_function(ValueError(), max_tries=1)
+
+        with self.assertRaises(ValueError):
+            call()
+
+        self.assertEqual(target.call_count, 1)
+        self.assertEqual(self.get_exhausted(), before)
+
+    def test_reserved_token_is_refunded_on_giveup(self):
+        retries = self.budget.retries(lambda e: False, max_tries=4)
+        self.assertFalse(retries.giveup(ValueError()))
+        self.assertEqual(self.budget.tokens, 1)
+
+        # e.g. backoff gave up on max_time
+        retries.on_giveup({})
+        self.assertEqual(self.budget.tokens, 2)
+        retries.on_giveup({})
+        self.assertEqual(self.budget.tokens, 2)
+
+    def test_retry_spends_the_reserved_token(self):
+        retries = self.budget.retries(lambda e: False, max_tries=4)
+        self.assertFalse(retries.giveup(ValueError()))
+        retries.on_backoff({})
+        retries.on_giveup({})
+        self.assertEqual(self.budget.tokens, 1)
+
+    @patch("backoff._sync.time.sleep")
+    def test_successful_calls_fund_retries(self, _):
+        self.budget.try_withdraw()
+        self.budget.try_withdraw()
+        call, target = self.get_retrying_function(None)
+        call()
+        call()
+
+        target.side_effect = [ValueError(), "ok"]
+        self.assertEqual(call(), "ok")
+        self.assertEqual(target.call_count, 4)
+
+    @patch("backoff._sync.time.sleep")
+    def test_fatal_exceptions_do_not_use_the_budget(self, _):
+        call, target = self.get_retrying_function(KeyError())
+
+        with self.assertRaises(KeyError):
+            call()
+
+        self.assertEqual(target.call_count, 1)
+        self.assertEqual(self.budget.tokens, 2)
+
+    @override_settings(ENABLE_RETRY_BUDGET=False)
+    @patch("backoff._sync.time.sleep")
+    def test_disabled(self, _):
+        call, target = self.get_retrying_function(ValueError())
+
+        with self.assertRaises(ValueError):
+            call()
+
+        self.assertEqual(target.call_count, 4)
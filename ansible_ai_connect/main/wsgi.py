@@ -40,3 +40,12 @@ except ImportError:
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ansible_ai_connect.main.settings.development")
 
 application = get_wsgi_application()
+
+# With lazy-apps, each uwsgi worker loads the application after the fork, the
+# warm-up completes before it accepts requests.
+from django.conf import settings  # noqa: E402
+
+if settings.ENABLE_WORKER_WARM_UP:
+    from ansible_ai_connect.ai.warmup import warm_up
+
+    warm_up()
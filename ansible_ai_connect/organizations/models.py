@@ -19,7 +19,7 @@ from django.conf import settings
 from django.db import models
 from django.utils.functional import cached_property
 
-from ansible_ai_connect.ai.api.aws.wca_secret_manager import Suffixes
+from ansible_ai_connect.ai.api.aws.wca_secret_manager import OrgCredentials, Suffixes
 
 logger = logging.getLogger(__name__)
 
@@ -64,10 +64,14 @@ class Organization(models.Model):
             return True
 
     @cached_property
-    def has_api_key(self) -> bool:
+    def wca_credentials(self) -> OrgCredentials:
+        # Snapshot of the API Key and Model ID shared by everything served for this instance
         secret_manager = apps.get_app_config("ai").get_wca_secret_manager()
-        org_has_api_key = secret_manager.secret_exists(self.id, Suffixes.API_KEY)
-        return org_has_api_key
+        return secret_manager.get_org_credentials(self.id)
+
+    @cached_property
+    def has_api_key(self) -> bool:
+        return self.wca_credentials.get(Suffixes.API_KEY) is not None
 
     def __make_organization_request_to_launchdarkly(self, flag: str) -> bool:
         if not settings.LAUNCHDARKLY_SDK_KEY:
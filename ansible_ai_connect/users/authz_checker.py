@@ -28,6 +28,8 @@ from django_prometheus.conf import NAMESPACE
 from prometheus_client import Counter, Histogram
 from requests.exceptions import HTTPError
 
+from ansible_ai_connect.main.retry_budget import RetryBudget
+
 logger = logging.getLogger(__name__)
 
 # from django_prometheus.middleware.DEFAULT_LATENCY_BUCKETS
@@ -109,6 +111,9 @@ authz_ams_account_cache_hit_counter = Counter(
     namespace=NAMESPACE,
 )
 
+sso_retry_budget = RetryBudget("sso")
+ams_retry_budget = RetryBudget("ams")
+
 
 class BaseCheck:
     @abstractmethod
@@ -164,14 +169,18 @@ class Token:
             "client_secret": self._client_secret,
             "scope": "api.iam.access",
         }
+        retries = sso_retry_budget.retries(fatal_exception, self.retries + 1)
         try:
 
             @backoff.on_exception(
                 backoff.expo,
                 Exception,
                 max_tries=self.retries + 1,
-                giveup=fatal_exception,
-                on_backoff=self.on_backoff,
+                jitter=backoff.full_jitter,
+                giveup=retries.giveup,
+                on_backoff=[retries.on_backoff, self.on_backoff],
+                on_giveup=retries.on_giveup,
+                on_success=retries.on_success,
             )
             @authz_token_service_hist.time()
             def post_request():
@@ -246,14 +255,18 @@ class AMSCheck(BaseCheck):
         params = {"search": f"external_id='{rh_org_id}'"}
         self.update_bearer_token()
 
+        retries = ams_retry_budget.retries(fatal_exception, self.retries + 1)
         try:
 
             @backoff.on_exception(
                 backoff.expo,
                 Exception,
                 max_tries=self.retries + 1,
-                giveup=fatal_exception,
-                on_backoff=self.on_backoff,
+                jitter=backoff.full_jitter,
+                giveup=retries.giveup,
+                on_backoff=[retries.on_backoff, self.on_backoff],
+                on_giveup=retries.on_giveup,
+                on_success=retries.on_success,
             )
             @authz_ams_get_organization_hist.time()
             def get_request():
@@ -386,14 +399,18 @@ class AMSCheck(BaseCheck):
         params = {"search": "quota_id LIKE 'seat|ansible.wisdom%'"}
         self.update_bearer_token()
 
+        retries = ams_retry_budget.retries(fatal_exception, self.retries + 1)
         try:
 
             @backoff.on_exception(
                 backoff.expo,
                 Exception,
                 max_tries=self.retries + 1,
-                giveup=fatal_exception,
-                on_backoff=self.on_backoff,
+                jitter=backoff.full_jitter,
+                giveup=retries.giveup,
+                on_backoff=[retries.on_backoff, self.on_backoff],
+                on_giveup=retries.on_giveup,
+                on_success=retries.on_success,
             )
             @authz_ams_get_organization_quota_cost_hist.time()
             def get_request():
@@ -81,15 +81,17 @@ class User(ExportModelOperationsMixin("user"), AbstractUser):
             return self.organization.id
         return None
 
+    def _get_social_auth(self):
+        # all() reuses the social_auth prefetched by the UserProfile of the request
+        return next(iter(self.social_auth.all()), None)
+
     def is_oidc_user(self) -> bool:
-        if not self.social_auth.values():
-            return False
-        return self.social_auth.values()[0]["provider"] == USER_SOCIAL_AUTH_PROVIDER_OIDC
+        social_auth = self._get_social_auth()
+        return social_auth is not None and social_auth.provider == USER_SOCIAL_AUTH_PROVIDER_OIDC
 
     def is_aap_user(self) -> bool:
-        if not self.social_auth.values():
-            return False
-        return self.social_auth.values()[0]["provider"] == USER_SOCIAL_AUTH_PROVIDER_AAP
+        social_auth = self._get_social_auth()
+        return social_auth is not None and social_auth.provider == USER_SOCIAL_AUTH_PROVIDER_AAP
 
     @cached_property
     def rh_user_has_seat(self) -> bool:
@@ -138,17 +140,15 @@ class User(ExportModelOperationsMixin("user"), AbstractUser):
 
     @cached_property
     def rh_aap_licensed(self) -> bool:
-        return self.is_aap_user() and self.social_auth.values()[0]["extra_data"]["aap_licensed"]
+        return self.is_aap_user() and self._get_social_auth().extra_data["aap_licensed"]
 
     @cached_property
     def rh_aap_system_auditor(self) -> bool:
-        return (
-            self.is_aap_user() and self.social_auth.values()[0]["extra_data"]["aap_system_auditor"]
-        )
+        return self.is_aap_user() and self._get_social_auth().extra_data["aap_system_auditor"]
 
     @cached_property
     def rh_aap_superuser(self) -> bool:
-        return self.is_aap_user() and self.social_auth.values()[0]["extra_data"]["aap_superuser"]
+        return self.is_aap_user() and self._get_social_auth().extra_data["aap_superuser"]
 
     plans = models.ManyToManyField(
         Plan,
@@ -0,0 +1,91 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from typing import Optional
+
+from django.db.models import Prefetch, prefetch_related_objects
+from rest_framework.request import Request
+from social_django.models import UserSocialAuth
+
+from ansible_ai_connect.organizations.models import Organization
+from ansible_ai_connect.users.models import User, UserPlan
+
+# The relations of the user read by the telemetry, the throttling, the
+# feature flags and the permissions
+PREFETCHED_RELATIONS = ("groups", "userplan_set", "social_auth")
+
+
+class UserProfile:
+    """
+    The groups, plans, organization and social auth of a user, loaded once
+    with prefetch_related(). They are prefetched on the User instance itself,
+    so that its related managers and methods, e.g. user.userplan_set.all()
+    or user.is_oidc_user(), reuse them too.
+    """
+
+    def __init__(self, user, refresh: bool = False):
+        self.user = user
+        if not isinstance(user, User):
+            # e.g. AnonymousUser, which has no relation to load
+            return
+        if refresh:
+            prefetched = getattr(user, "_prefetched_objects_cache", {})
+            for relation in PREFETCHED_RELATIONS:
+                prefetched.pop(relation, None)
+        prefetch_related_objects(
+            [user],
+            "organization",
+            "groups",
+            Prefetch("userplan_set", queryset=UserPlan.objects.select_related("plan")),
+            "social_auth",
+        )
+
+    @property
+    def groups(self) -> list[str]:
+        return [group.name for group in self.user.groups.all()]
+
+    @property
+    def plans(self) -> list[UserPlan]:
+        if not hasattr(self.user, "userplan_set"):
+            return []
+        return list(self.user.userplan_set.all())
+
+    def has_active_plan(self) -> bool:
+        return any(up.is_active for up in self.plans)
+
+    @property
+    def organization(self) -> Optional[Organization]:
+        return getattr(self.user, "organization", None)
+
+    @property
+    def social_auth(self) -> Optional[UserSocialAuth]:
+        if not hasattr(self.user, "social_auth"):
+            return None
+        return next(iter(self.user.social_auth.all()), None)
+
+
+def get_user_profile(request) -> UserProfile:
+    """
+    Return the UserProfile of the user of the request, loaded on first use.
+    It is stored on the Django request, so that the DRF request wrapping it
+    and the middlewares share it. The relations prefetched by an earlier
+    request on the same User instance are reloaded.
+    """
+    http_request = request._request if isinstance(request, Request) else request
+    user = request.user
+    user_profile = getattr(http_request, "_user_profile", None)
+    if not isinstance(user_profile, UserProfile) or user_profile.user is not user:
+        user_profile = UserProfile(user, refresh=True)
+        http_request._user_profile = user_profile
+    return user_profile
@@ -206,6 +206,24 @@ class TestToken(WisdomServiceLogAwareTestCase):
             self.assertEqual(checker.get_ams_org(123), "qwe")
             self.assertInLog("Caught retryable error after 1 tries.", log)
 
+    @override_settings(ENABLE_RETRY_BUDGET=True)
+    @override_settings(RETRY_BUDGET_MAX_TOKENS=0)
+    @override_settings(RETRY_BUDGET_MIN_RETRIES_PER_SEC=0)
+    def test_ams_get_ams_org_retry_budget_exhausted(self):
+        fail_side_effect = HTTPError(
+            "Internal Server Error", response=Mock(status_code=500, text="Internal Server Error")
+        )
+        checker = self.get_default_ams_checker()
+        checker._token = Mock()
+        checker._session = Mock()
+        checker._session.get.side_effect = [fail_side_effect, Mock()]
+
+        with self.assertLogs(logger="ansible_ai_connect.main.retry_budget", level="WARN") as log:
+            with self.assertRaises(HTTPError):
+                checker.get_ams_org(123)
+            self.assertInLog("Retry budget of ams exhausted", log)
+        self.assertEqual(checker._session.get.call_count, 1)
+
     def test_ams_get_ams_org_with_empty_data(self):
         m_r = Mock()
         m_r.json.return_value = {"items": []}
@@ -0,0 +1,82 @@
+#  Copyright Red Hat
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from django.contrib.auth.models import AnonymousUser, Group
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from ansible_ai_connect.test_utils import WisdomServiceAPITestCaseBaseOIDC
+from ansible_ai_connect.users.constants import USER_SOCIAL_AUTH_PROVIDER_OIDC
+from ansible_ai_connect.users.profile import UserProfile, get_user_profile
+
+
+class TestUserProfile(WisdomServiceAPITestCaseBaseOIDC):
+    def get_request(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        return request
+
+    def test_profile(self):
+        self.start_user_plan()
+
+        # groups, plans with their plan and social_auth
+        with self.assertNumQueries(3):
+            user_profile = UserProfile(self.user)
+
+        with self.assertNumQueries(0):
+            self.assertCountEqual(user_profile.groups, ["Group 1", "Group 2"])
+            self.assertEqual([up.plan.name for up in user_profile.plans], ["Some plan"])
+            self.assertTrue(user_profile.has_active_plan())
+            self.assertEqual(user_profile.organization.id, 1981)
+            self.assertEqual(user_profile.social_auth.provider, USER_SOCIAL_AUTH_PROVIDER_OIDC)
+            self.assertTrue(self.user.is_oidc_user())
+            self.assertEqual(len(self.user.userplan_set.all()), 1)
+            # Reuses the relations prefetched on the user
+            self.assertCountEqual(UserProfile(self.user).groups, ["Group 1", "Group 2"])
+
+    def test_anonymous_user(self):
+        with self.assertNumQueries(0):
+            user_profile = UserProfile(AnonymousUser())
+            self.assertEqual(user_profile.groups, [])
+            self.assertEqual(user_profile.plans, [])
+            self.assertFalse(user_profile.has_active_plan())
+            self.assertIsNone(user_profile.organization)
+            self.assertIsNone(user_profile.social_auth)
+
+    def test_get_user_profile(self):
+        request = self.get_request(self.user)
+        user_profile = get_user_profile(request)
+        self.assertIs(user_profile.user, self.user)
+        drf_request = Request(request)
+        drf_request.user = self.user
+        with self.assertNumQueries(0):
+            self.assertIs(get_user_profile(request), user_profile)
+            # Shared with the DRF request wrapping it
+            self.assertIs(get_user_profile(drf_request), user_profile)
+
+    def test_get_user_profile_per_request(self):
+        get_user_profile(self.get_request(self.user))
+        group, _ = Group.objects.get_or_create(name="Group 3")
+        group.user_set.add(self.user)
+        self.start_user_plan()
+
+        user_profile = get_user_profile(self.get_request(self.user))
+        self.assertCountEqual(user_profile.groups, ["Group 1", "Group 2", "Group 3"])
+        self.assertEqual(len(user_profile.plans), 1)
+
+    def test_get_user_profile_user_changed(self):
+        request = self.get_request(AnonymousUser())
+        self.assertEqual(get_user_profile(request).groups, [])
+        request.user = self.user
+        self.assertCountEqual(get_user_profile(request).groups, ["Group 1", "Group 2"])
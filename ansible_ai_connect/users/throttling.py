@@ -15,6 +15,8 @@
 from django.conf import settings
 from rest_framework.throttling import UserRateThrottle
 
+from ansible_ai_connect.users.profile import get_user_profile
+
 
 class GroupSpecificThrottle(UserRateThrottle):
     """
@@ -39,7 +41,7 @@ class GroupSpecificThrottle(UserRateThrottle):
         pass
 
     def get_scope(self, request, view):
-        user_groups = set(request.user.groups.values_list("name", flat=True))
+        user_groups = set(get_user_profile(request).groups)
         return next((group for group in self.GROUPS if group in user_groups), "user")
 
     def allow_request(self, request, view):